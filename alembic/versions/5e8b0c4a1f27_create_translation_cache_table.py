@@ -0,0 +1,38 @@
+"""create translation_cache table
+
+Revision ID: 5e8b0c4a1f27
+Revises: 3c1f2a9d7b40
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8b0c4a1f27'
+down_revision = '3c1f2a9d7b40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'translation_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('source_lang', sa.String(), nullable=False),
+        sa.Column('target_lang', sa.String(), nullable=False),
+        sa.Column('source_text', sa.Text(), nullable=False),
+        sa.Column('translated_text', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_translation_cache_id'), 'translation_cache', ['id'], unique=False)
+    op.create_index(op.f('ix_translation_cache_cache_key'), 'translation_cache', ['cache_key'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_translation_cache_cache_key'), table_name='translation_cache')
+    op.drop_index(op.f('ix_translation_cache_id'), table_name='translation_cache')
+    op.drop_table('translation_cache')
@@ -0,0 +1,26 @@
+"""add media_hash to messages
+
+Revision ID: 7a2d9e6c3b15
+Revises: 5e8b0c4a1f27
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a2d9e6c3b15'
+down_revision = '5e8b0c4a1f27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('messages', sa.Column('media_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_messages_media_hash'), 'messages', ['media_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_messages_media_hash'), table_name='messages')
+    op.drop_column('messages', 'media_hash')
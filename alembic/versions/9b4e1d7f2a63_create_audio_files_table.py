@@ -0,0 +1,30 @@
+"""create audio_files table
+
+Revision ID: 9b4e1d7f2a63
+Revises: 7a2d9e6c3b15
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4e1d7f2a63'
+down_revision = '7a2d9e6c3b15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'audio_files',
+        sa.Column('filename', sa.String(), nullable=False),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('filename')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('audio_files')
@@ -0,0 +1,27 @@
+"""add messages (conversation_id, created_at, id) index
+
+Revision ID: b1f5c8e2d904
+Revises: 9b4e1d7f2a63
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b1f5c8e2d904'
+down_revision = '9b4e1d7f2a63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_messages_conversation_created_id', 'messages',
+        ['conversation_id', 'created_at', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_conversation_created_id', table_name='messages')
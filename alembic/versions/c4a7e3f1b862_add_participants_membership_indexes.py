@@ -0,0 +1,39 @@
+"""add participants membership indexes
+
+Revision ID: c4a7e3f1b862
+Revises: b1f5c8e2d904
+Create Date: 2026-10-17 14:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a7e3f1b862'
+down_revision = 'b1f5c8e2d904'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Eliminar participaciones duplicadas antes de crear el índice único
+    # (se conserva la más antigua de cada par)
+    op.execute(
+        """
+        DELETE FROM participants
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM participants GROUP BY conversation_id, user_id
+        )
+        """
+    )
+    op.create_index(
+        'ux_participants_conversation_user', 'participants',
+        ['conversation_id', 'user_id'], unique=True
+    )
+    op.create_index(op.f('ix_participants_user_id'), 'participants', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_participants_user_id'), table_name='participants')
+    op.drop_index('ux_participants_conversation_user', table_name='participants')
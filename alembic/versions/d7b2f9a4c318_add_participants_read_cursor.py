@@ -0,0 +1,40 @@
+"""add participants read cursor
+
+Revision ID: d7b2f9a4c318
+Revises: c4a7e3f1b862
+Create Date: 2026-10-17 14:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7b2f9a4c318'
+down_revision = 'c4a7e3f1b862'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('participants', sa.Column('last_read_message_id', sa.Integer(), nullable=True))
+    # Inicializar el cursor con el último mensaje propio o ya marcado como leído
+    op.execute(
+        """
+        UPDATE participants
+        SET last_read_message_id = (
+            SELECT MAX(m.id) FROM messages m
+            WHERE m.conversation_id = participants.conversation_id
+              AND (m.is_read = true OR m.sender_id = participants.user_id)
+        )
+        """
+    )
+    op.create_index(
+        'ix_messages_conversation_id_id', 'messages',
+        ['conversation_id', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_conversation_id_id', table_name='messages')
+    op.drop_column('participants', 'last_read_message_id')
@@ -0,0 +1,78 @@
+"""add conversation event sequence
+
+Revision ID: e5c9a2d8f471
+Revises: d7b2f9a4c318
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5c9a2d8f471'
+down_revision = 'd7b2f9a4c318'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('conversations', sa.Column('last_seq', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('messages', sa.Column('seq', sa.Integer(), nullable=True))
+    op.add_column('translated_messages', sa.Column('seq', sa.Integer(), nullable=True))
+    # Numerar los mensajes existentes por conversación en orden de id (una sola
+    # pasada con ROW_NUMBER, no una subconsulta por fila)
+    op.execute(
+        """
+        UPDATE messages
+        SET seq = numbered.seq
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY conversation_id ORDER BY id) AS seq
+            FROM messages
+        ) AS numbered
+        WHERE messages.id = numbered.id
+        """
+    )
+    # Las traducciones existentes van detrás de todos los mensajes de su conversación
+    op.execute(
+        """
+        UPDATE translated_messages
+        SET seq = numbered.seq
+        FROM (
+            SELECT t.id,
+                   counts.message_count
+                   + ROW_NUMBER() OVER (PARTITION BY m.conversation_id ORDER BY t.id) AS seq
+            FROM translated_messages t
+            JOIN messages m ON m.id = t.original_message_id
+            JOIN (
+                SELECT conversation_id, COUNT(*) AS message_count FROM messages GROUP BY conversation_id
+            ) AS counts ON counts.conversation_id = m.conversation_id
+        ) AS numbered
+        WHERE translated_messages.id = numbered.id
+        """
+    )
+    op.execute(
+        """
+        UPDATE conversations
+        SET last_seq = latest.seq
+        FROM (
+            SELECT conversation_id, MAX(seq) AS seq
+            FROM (
+                SELECT conversation_id, seq FROM messages
+                UNION ALL
+                SELECT m.conversation_id, t.seq
+                FROM translated_messages t JOIN messages m ON m.id = t.original_message_id
+            ) AS events
+            GROUP BY conversation_id
+        ) AS latest
+        WHERE conversations.id = latest.conversation_id
+        """
+    )
+    op.create_index('ix_messages_conversation_seq', 'messages', ['conversation_id', 'seq'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_conversation_seq', table_name='messages')
+    op.drop_column('translated_messages', 'seq')
+    op.drop_column('messages', 'seq')
+    op.drop_column('conversations', 'last_seq')
@@ -1,6 +1,7 @@
+import hmac
 from typing import Generator, Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 from pydantic import ValidationError
@@ -9,9 +10,10 @@ from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.core.config import settings
 from app.core.security import verify_password
+from app.core.auth_cache import principal_cache
 from app.models.user import User
 from app.schemas.user import UserInDB
-from app.crud.user import get_user_by_username
+from app.crud.user import get_user, get_user_by_username
 
 
 security = HTTPBearer()
@@ -39,7 +41,7 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = get_user_by_username(db, username=username)
+    user = get_user_from_token_payload(db, payload)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -51,6 +53,33 @@ def get_current_user(
     return user
 
 
+def get_user_from_token_payload(db: Session, payload: dict) -> Optional[User]:
+    """
+    Resolve the user of a decoded JWT, going through the principal cache.
+    Tokens carrying the user id ("uid") are resolved by primary key on a cache miss.
+    The returned instance is detached from the session so it can be shared.
+    """
+    username = payload.get("sub")
+    if username is None:
+        return None
+    user_id = payload.get("uid")
+    
+    user = principal_cache.get(user_id=user_id, username=username)
+    if user is not None and user.username == username:
+        return user
+    
+    if user_id is not None:
+        user = get_user(db, user_id=user_id)
+    else:
+        user = get_user_by_username(db, username=username)
+    if not user or user.username != username:
+        return None
+    
+    db.expunge(user)
+    principal_cache.set(user)
+    return user
+
+
 def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
     user = get_user_by_username(db, username=username)
     if not user:
@@ -63,3 +92,9 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
 def get_db_dependency():
     """Get database session without FastAPI dependency injection"""
     return get_db()
+
+
+def require_ops_token(x_ops_token: Optional[str] = Header(None)) -> None:
+    """Operational endpoints (metrics) are only served with the X-Ops-Token header matching OPS_TOKEN"""
+    if not settings.OPS_TOKEN or not x_ops_token or not hmac.compare_digest(x_ops_token, settings.OPS_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed")
@@ -1,13 +1,19 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Form
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Form, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
 
 from app.api.dependencies import get_current_user, get_db
+from app.api.file_responses import audio_file_response
 from app.services.file_storage import FileStorageService
 from app.crud import user as crud_user, message as crud_message, conversation as crud_conversation
+from app.crud import aio as crud_aio
+from app.db.database import get_async_db
+from app.core.membership_cache import membership_cache
 from app.models.user import User
 from app.websockets.manager import manager
+from app.websockets.events import new_message_event
 
 router = APIRouter()
 
@@ -46,7 +52,7 @@ async def upload_reference_audio(
 
 
 @router.get("/audio/{filename}")
-async def get_audio_file(filename: str):
+async def get_audio_file(filename: str, request: Request):
     """Servir archivos de audio de usuarios (audio de referencia)"""
     file_service = FileStorageService()
     file_path = os.path.join(file_service.user_audio_path, filename)
@@ -54,15 +60,11 @@ async def get_audio_file(filename: str):
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Archivo no encontrado")
     
-    return FileResponse(
-        file_path,
-        media_type="audio/mpeg",
-        filename=filename
-    )
+    return audio_file_response(request, file_path, media_type="audio/mpeg", filename=filename)
 
 
 @router.get("/user/{filename}")
-async def get_user_audio_file(filename: str):
+async def get_user_audio_file(filename: str, request: Request):
     """Servir archivos de audio de referencia de usuarios"""
     file_service = FileStorageService()
     file_path = os.path.join(file_service.user_audio_path, filename)
@@ -70,15 +72,7 @@ async def get_user_audio_file(filename: str):
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Archivo de audio no encontrado")
     
-    return FileResponse(
-        file_path,
-        media_type="audio/mpeg",
-        headers={
-            "Accept-Ranges": "bytes",
-            "Cache-Control": "public, max-age=3600"
-        },
-        filename=filename
-    )
+    return audio_file_response(request, file_path, media_type="audio/mpeg", filename=filename)
 
 
 @router.delete("/delete-reference-audio")
@@ -118,24 +112,20 @@ async def upload_message_audio(
     conversation_id: int = Form(...),
     content: str = Form(None),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Subir audio para un mensaje en una conversación específica"""
     try:
-        # Verificar que la conversación existe
-        conversation = crud_conversation.get_conversation(db, conversation_id)
-        if not conversation:
-            raise HTTPException(status_code=404, detail="Conversación no encontrada")
-        
-        # Verificar que el usuario es participante de la conversación
-        user_is_participant = any(p.user_id == current_user.id for p in conversation.participants)
-        if not user_is_participant:
+        # Verificar que el usuario es participante (y, si no lo es, que la conversación existe)
+        if not await membership_cache.is_member_async(db, current_user.id, conversation_id):
+            if not await crud_aio.get_conversation(db, conversation_id):
+                raise HTTPException(status_code=404, detail="Conversación no encontrada")
             raise HTTPException(status_code=403, detail="No tienes acceso a esta conversación")
         
         file_service = FileStorageService()
         
         # Guardar el archivo de audio del mensaje
-        file_path = await file_service.save_message_audio_file(
+        file_path, media_hash = await file_service.save_message_audio_file(
             audio_file, 
             current_user.id, 
             conversation_id
@@ -145,32 +135,17 @@ async def upload_message_audio(
         audio_url = file_service.get_message_file_url(file_path)
         
         # Crear el mensaje de audio en la base de datos
-        audio_message = crud_message.create_audio_message(
+        audio_message = await crud_aio.create_audio_message(
             db=db,
             conversation_id=conversation_id,
             sender_id=current_user.id,
             media_url=audio_url,
-            content=content
+            content=content,
+            media_hash=media_hash
         )
         
         # Notificar via WebSocket a todos los participantes de la conversación
-        await manager.send_to_conversation({
-            "type": "new_message",
-            "message": {
-                "id": audio_message.id,
-                "conversation_id": conversation_id,
-                "sender_id": current_user.id,
-                "content_type": "audio",
-                "content": content or "",
-                "media_url": audio_url,
-                "created_at": audio_message.created_at.isoformat(),
-                "is_read": False,
-                "sender": {
-                    "id": current_user.id,
-                    "username": current_user.username
-                }
-            }
-        }, str(conversation_id))
+        await manager.send_to_conversation(new_message_event(audio_message, current_user), str(conversation_id))
         
         return {
             "message": "Audio de mensaje subido exitosamente",
@@ -186,25 +161,17 @@ async def upload_message_audio(
 
 
 @router.get("/message/{filename}")
-async def get_message_audio_file(filename: str):
+async def get_message_audio_file(filename: str, request: Request):
     """Servir archivos de audio de mensajes"""
     file_service = FileStorageService()
     
-    # Buscar el archivo en todos los subdirectorios de mensajes
-    file_path = None
-    for root, dirs, files in os.walk(file_service.message_audio_path):
-        if filename in files:
-            file_path = os.path.join(root, filename)
-            break
+    # Resolver la ruta con el índice de archivos de mensajes
+    file_path = await file_service.find_message_audio_file_async(filename)
     
     if not file_path or not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Archivo de audio no encontrado")
     
-    return FileResponse(
-        file_path,
-        media_type="audio/mpeg",
-        filename=filename
-    )
+    return audio_file_response(request, file_path, media_type="audio/mpeg", filename=filename)
 
 
 @router.delete("/delete-message-audio/{message_id}")
@@ -227,7 +194,8 @@ async def delete_message_audio(
             raise HTTPException(status_code=400, detail="El mensaje no es de tipo audio")
         
         # Eliminar el mensaje y su archivo
-        success = crud_message.delete_audio_message(db, message_id)
+        # Borra el archivo y su entrada del índice (consultas síncronas)
+        success = await run_in_threadpool(crud_message.delete_audio_message, db, message_id)
         if not success:
             raise HTTPException(status_code=500, detail="Error al eliminar el mensaje de audio")
         
@@ -240,7 +208,7 @@ async def delete_message_audio(
 
 
 @router.get("/translated/{filename}")
-async def get_translated_audio_file(filename: str):
+async def get_translated_audio_file(filename: str, request: Request):
     """Servir archivos de audio traducidos"""
     # Los archivos traducidos se almacenan en uploads/audio/message_clon/
     translated_audio_dir = "uploads/audio/message_clon"
@@ -249,8 +217,4 @@ async def get_translated_audio_file(filename: str):
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Archivo de audio traducido no encontrado")
     
-    return FileResponse(
-        file_path,
-        media_type="audio/wav",
-        filename=filename
-    )
+    return audio_file_response(request, file_path, media_type="audio/wav", filename=filename)
@@ -7,7 +7,7 @@ from app.crud import conversation as crud_conversation
 from app.services.conversations_service import ConversationsService
 from app.schemas import (
     Conversation, ConversationCreate, ConversationDetail,
-    ParticipantCreate, User as UserSchema
+    ParticipantCreate, User as UserSchema, InboxEntry
 )
 from app.schemas.conversation import ConversationSummary
 
@@ -48,32 +48,13 @@ def get_all_conversations(
     Requiere autenticación. Solo usuarios autenticados pueden acceder.
     """
     try:
-        # Obtener todas las conversaciones
-        conversations = crud_conversation.get_all_conversations(
+        # Conteos agregados en una sola consulta, sin cargar participantes ni mensajes
+        summaries = crud_conversation.get_conversation_summaries(
             db=db, 
             skip=skip, 
             limit=limit
         )
-        
-        # Crear respuesta con información adicional
-        result = []
-        for conv in conversations:
-            # Contar participantes
-            participant_count = len(conv.participants) if conv.participants else 0
-            
-            # Contar mensajes
-            message_count = len(conv.messages) if conv.messages else 0
-            
-            conv_summary = ConversationSummary(
-                id=conv.id,
-                created_at=conv.created_at,
-                updated_at=conv.updated_at,
-                participant_count=participant_count,
-                message_count=message_count
-            )
-            result.append(conv_summary)
-        
-        return result
+        return [ConversationSummary(**summary) for summary in summaries]
         
     except Exception as e:
         raise HTTPException(
@@ -82,6 +63,32 @@ def get_all_conversations(
         )
 
 
+@router.get("/summaries", response_model=List[ConversationSummary])
+def get_my_conversation_summaries(
+    skip: int = Query(0, ge=0, description="Número de conversaciones a omitir"),
+    limit: int = Query(100, ge=1, le=1000, description="Límite de conversaciones a retornar"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Conversaciones del usuario actual con número de participantes y de mensajes"""
+    summaries = ConversationsService.read_conversation_summaries(db, current_user.id, skip, limit)
+    return [ConversationSummary(**summary) for summary in summaries]
+
+
+@router.get("/inbox", response_model=List[InboxEntry])
+def read_inbox(
+    skip: int = Query(0, ge=0, description="Número de conversaciones a omitir"),
+    limit: int = Query(50, ge=1, le=200, description="Límite de conversaciones a retornar"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Bandeja de entrada del usuario actual, ordenada por última actividad: último
+    mensaje, si está traducido, número de mensajes sin leer y demás participantes
+    """
+    return ConversationsService.read_inbox(db, current_user.id, skip, limit)
+
+
 @router.get("/{conversation_id}", response_model=ConversationDetail)
 def read_conversation(
     conversation_id: int,
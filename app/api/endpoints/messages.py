@@ -1,15 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Response, BackgroundTasks
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import os
 from app.api.dependencies import get_current_user, get_db
+from app.db.database import get_async_db
 from app.models.user import User
 from app.models.message import ContentType
 from app.schemas import (
     Message, MessageWithSender
 )
 from app.services.messages_service import MessagesService
+from app.crud import encode_message_cursor
 from app.websockets.manager import manager
+from app.websockets.events import messages_read_event, new_message_event
 from fastapi import Form
 router = APIRouter()
 
@@ -24,25 +28,14 @@ async def create_new_message(
     content_type: ContentType = Form(...),
     content: Optional[str] = Form(None),
     audio_file: Optional[UploadFile] = File(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Create a new message in a conversation"""
     message = await MessagesService.create_new_message(db, conversation_id, content_type, content, audio_file, current_user.id)
     
     # Notify all connected clients in the conversation via WebSocket
-    await manager.send_to_conversation({
-        "type": "new_message",
-        "data": {
-            "id": message.id,
-            "conversation_id": message.conversation_id,
-            "sender_id": message.sender_id,
-            "content_type": message.content_type,
-            "content": message.content,
-            "media_url": message.media_url,
-            "created_at": message.created_at.isoformat() if message.created_at else None
-        }
-    }, str(conversation_id))
+    await manager.send_to_conversation(new_message_event(message, current_user), str(conversation_id))
     
     return message
 
@@ -50,16 +43,78 @@ async def create_new_message(
 @router.get("/conversation/{conversation_id}", response_model=List[MessageWithSender])
 def read_messages(
     conversation_id: int,
+    response: Response,
+    background_tasks: BackgroundTasks,
     skip: int = 0,
     limit: int = 100,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    latest: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all messages in a conversation"""
-    messages = MessagesService.read_messages(db, conversation_id, skip, limit, current_user.id)
+    """
+    Get messages in a conversation.
+
+    Cursor pagination: `latest=true` returns the newest `limit` messages,
+    `before=<cursor>` older ones and `after=<cursor>` newer ones. The cursors for
+    the previous/next page are returned in the X-Prev-Cursor / X-Next-Cursor headers.
+    Without cursor parameters the legacy skip/limit pagination is used.
+    """
+    if latest or before or after:
+        messages, read_cursor = MessagesService.read_messages_page(db, conversation_id, limit, before, after, current_user.id)
+        if messages:
+            response.headers["X-Prev-Cursor"] = encode_message_cursor(messages[0])
+            response.headers["X-Next-Cursor"] = encode_message_cursor(messages[-1])
+    else:
+        messages, read_cursor = MessagesService.read_messages(db, conversation_id, skip, limit, current_user.id)
+    
+    # Notificar el recibo de lectura después de responder
+    if read_cursor is not None:
+        background_tasks.add_task(
+            manager.send_to_conversation,
+            messages_read_event(conversation_id, current_user.id, read_cursor),
+            str(conversation_id)
+        )
     return messages
 
 
+@router.post("/conversation/{conversation_id}/read")
+def mark_conversation_as_read(
+    conversation_id: int,
+    background_tasks: BackgroundTasks,
+    message_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Advance the current user's read cursor (to message_id, or to the latest message)"""
+    read_cursor = MessagesService.mark_as_read(db, conversation_id, message_id, current_user.id)
+    if read_cursor is not None:
+        background_tasks.add_task(
+            manager.send_to_conversation,
+            messages_read_event(conversation_id, current_user.id, read_cursor),
+            str(conversation_id)
+        )
+    return {
+        "conversation_id": conversation_id,
+        "last_read_message_id": read_cursor,
+        "unread_count": MessagesService.get_unread_count(db, conversation_id, current_user.id)
+    }
+
+
+@router.get("/conversation/{conversation_id}/unread")
+def get_unread_count(
+    conversation_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Number of messages from other participants above the current user's read cursor"""
+    return {
+        "conversation_id": conversation_id,
+        "unread_count": MessagesService.get_unread_count(db, conversation_id, current_user.id)
+    }
+
+
 @router.delete("/{message_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_message_endpoint(
     message_id: int,
@@ -8,7 +8,6 @@ from app.schemas import (
     ParticipantCreate, ParticipantWithUser,
     User as UserSchema
 )
-from app.crud import get_user
 
 router = APIRouter()
 
@@ -34,13 +33,8 @@ def get_participants(
 ):
     """Get all participants in a conversation"""
     participants = ParticipantsService.get_participants(db, conversation_id, current_user.id)
-    result = []
-    for p in participants:
-        user = get_user(db, p.user_id)
-        participant_with_user = ParticipantWithUser.from_orm(p)
-        participant_with_user.user = UserSchema.from_orm(user)
-        result.append(participant_with_user)
-    return result
+    # El usuario de cada participante ya viene cargado (loader_options(ParticipantWithUser))
+    return [ParticipantWithUser.from_orm(p) for p in participants]
 
 
 @router.delete("/{participant_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import Optional
-from app.api.dependencies import get_current_user, get_db
+from app.api.dependencies import get_current_user, get_db, require_ops_token
 from app.models.user import User
 from app.schemas import TranslatedMessage
 from app.crud.translated_message import translated_message_crud
 from app.crud.message import get_message
-from app.crud.participant import get_participant_by_user_and_conversation
+from app.core.membership_cache import membership_cache
+from app.services.translation_queue import translation_queue
+from app.services.translation_cache import translation_cache
 
 router = APIRouter()
 
@@ -24,8 +26,7 @@ def get_translated_message(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
     
     # Check if user is participant in the conversation
-    participant = get_participant_by_user_and_conversation(db, current_user.id, message.conversation_id)
-    if not participant:
+    if not membership_cache.is_member(db, current_user.id, message.conversation_id):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not a participant in this conversation")
     
     # Get the translated message
@@ -49,8 +50,7 @@ def get_translated_message_optional(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
     
     # Check if user is participant in the conversation
-    participant = get_participant_by_user_and_conversation(db, current_user.id, message.conversation_id)
-    if not participant:
+    if not membership_cache.is_member(db, current_user.id, message.conversation_id):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not a participant in this conversation")
     
     # Get the translated message
@@ -67,3 +67,30 @@ def get_translated_message_optional(
         "media_url": translated_message.media_url,
         "created_at": translated_message.created_at.isoformat() if translated_message.created_at else None
     }
+
+
+@router.get("/message/{message_id}/status")
+def get_translation_status(
+    message_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the status of the background translation job for a message"""
+    message = get_message(db, message_id)
+    if not message:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
+    
+    if not membership_cache.is_member(db, current_user.id, message.conversation_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not a participant in this conversation")
+    
+    job_status = translation_queue.store.get_status(message_id)
+    if not job_status:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No translation job found for this message")
+    
+    return job_status
+
+
+@router.get("/cache/stats", dependencies=[Depends(require_ops_token)])
+def get_translation_cache_stats():
+    """Get hit/miss counters and size of the translation cache (X-Ops-Token)"""
+    return translation_cache.stats()
@@ -49,7 +49,7 @@ def login_with_credentials(
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     return {
         "access_token": create_access_token(
-            user.username, expires_delta=access_token_expires
+            user.username, expires_delta=access_token_expires, user_id=user.id
         ),
         "token_type": "bearer",
         "user_id": user.id,
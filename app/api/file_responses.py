@@ -0,0 +1,148 @@
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+
+import aiofiles
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+# Los audios se guardan con nombres uuid/hash que nunca se reutilizan
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "public, max-age=3600"
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _make_etag(stat_result: os.stat_result) -> str:
+    return f'"{int(stat_result.st_mtime):x}-{stat_result.st_size:x}"'
+
+
+def _etag_matches(header_value: str, etag: str) -> bool:
+    """Comparación débil de ETags (If-None-Match)"""
+    if header_value.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header_value.split(",")]
+    return any(tag[2:] == etag if tag.startswith("W/") else tag == etag for tag in candidates)
+
+
+def _if_range_matches(header_value: str, etag: str, stat_result: os.stat_result) -> bool:
+    """
+    If-Range solo acepta validadores fuertes: el ETag exacto (nunca uno W/)
+    o la misma fecha que Last-Modified
+    """
+    value = header_value.strip()
+    if value.startswith('"') or value.startswith("W/"):
+        return value == etag
+    try:
+        return int(parsedate_to_datetime(value).timestamp()) == int(stat_result.st_mtime)
+    except (TypeError, ValueError):
+        return False
+
+
+def _not_modified_since(header_value: str, stat_result: os.stat_result) -> bool:
+    try:
+        since = parsedate_to_datetime(header_value).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(stat_result.st_mtime) <= since
+
+
+def _parse_range(header_value: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Interpretar un único rango de bytes. Retorna (inicio, fin) inclusivos,
+    None si la cabecera no es válida o pide varios rangos (se sirve completo),
+    o lanza ValueError si el rango no es satisfacible.
+    """
+    match = _RANGE_RE.match(header_value.strip())
+    if not match:
+        return None
+    start_str, end_str = match.groups()
+    if not start_str and not end_str:
+        return None
+    if not start_str:
+        # bytes=-N: los últimos N bytes
+        suffix = int(end_str)
+        if suffix == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - suffix, 0), size - 1
+    start = int(start_str)
+    end = int(end_str) if end_str else size - 1
+    if start >= size or end < start:
+        raise ValueError("Unsatisfiable range")
+    return start, min(end, size - 1)
+
+
+async def _iter_file_range(file_path: str, start: int, length: int):
+    async with aiofiles.open(file_path, "rb") as f:
+        await f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = await f.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def audio_file_response(
+    request: Request,
+    file_path: str,
+    media_type: str,
+    filename: Optional[str] = None,
+    immutable: bool = True
+) -> Response:
+    """
+    Servir un archivo de audio con soporte de peticiones parciales (Range -> 206)
+    y condicionales (If-None-Match / If-Modified-Since -> 304)
+    """
+    stat_result = os.stat(file_path)
+    size = stat_result.st_size
+    etag = _make_etag(stat_result)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else DEFAULT_CACHE_CONTROL,
+    }
+
+    # Peticiones condicionales
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and _not_modified_since(if_modified_since, stat_result):
+            return Response(status_code=304, headers=headers)
+
+    # Peticiones parciales
+    range_header = request.headers.get("range")
+    if range_header:
+        if_range = request.headers.get("if-range")
+        if if_range is None or _if_range_matches(if_range, etag, stat_result):
+            try:
+                byte_range = _parse_range(range_header, size)
+            except ValueError:
+                headers["Content-Range"] = f"bytes */{size}"
+                return Response(status_code=416, headers=headers)
+            if byte_range is not None:
+                start, end = byte_range
+                length = end - start + 1
+                headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+                headers["Content-Length"] = str(length)
+                return StreamingResponse(
+                    _iter_file_range(file_path, start, length),
+                    status_code=206,
+                    media_type=media_type,
+                    headers=headers
+                )
+
+    return FileResponse(
+        file_path,
+        media_type=media_type,
+        headers=headers,
+        filename=filename,
+        stat_result=stat_result
+    )
@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+
+
+class PrincipalCache:
+    """
+    Caché de usuarios autenticados con TTL corto, para no consultar la tabla
+    users en cada petición autenticada.
+
+    Guarda instancias de User desconectadas de la sesión (expunge); se invalida
+    desde crud/user.py cuando el usuario se actualiza o se elimina.
+    """
+
+    def __init__(self, ttl_seconds: float = 30, max_size: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._by_id: "OrderedDict[int, Tuple[object, float]]" = OrderedDict()
+        self._ids_by_username: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: Optional[int] = None, username: Optional[str] = None):
+        with self._lock:
+            if user_id is None and username is not None:
+                user_id = self._ids_by_username.get(username)
+            entry = self._by_id.get(user_id) if user_id is not None else None
+            if entry is None:
+                self.misses += 1
+                return None
+            user, expires_at = entry
+            if expires_at < time.monotonic():
+                self._remove(user_id)
+                self.misses += 1
+                return None
+            self._by_id.move_to_end(user_id)
+            self.hits += 1
+            return user
+
+    def set(self, user):
+        with self._lock:
+            self._remove(user.id)
+            self._by_id[user.id] = (user, time.monotonic() + self.ttl_seconds)
+            self._ids_by_username[user.username] = user.id
+            while len(self._by_id) > self.max_size:
+                oldest_id = next(iter(self._by_id))
+                self._remove(oldest_id)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._remove(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._by_id.clear()
+            self._ids_by_username.clear()
+
+    def _remove(self, user_id: int):
+        entry = self._by_id.pop(user_id, None)
+        if entry is not None:
+            username = entry[0].username
+            if self._ids_by_username.get(username) == user_id:
+                del self._ids_by_username[username]
+
+
+# Global instance
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+    max_size=settings.AUTH_CACHE_MAX_SIZE
+)
@@ -9,16 +9,78 @@ load_dotenv()
 class Settings(BaseSettings):
     # Database settings
     DATABASE_URL: str = os.getenv("DATABASE_URL")
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # segundos esperando una conexión libre
+    DB_POOL_RECYCLE: int = 1800  # segundos
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: Optional[int] = None
+    DB_PGBOUNCER_MODE: bool = False  # Sin pool propio ni prepared statements (PgBouncer en modo transaction)
     
     # Security settings
     SECRET_KEY: str = os.getenv("SECRET_KEY")
     ALGORITHM: str = os.getenv("ALGORITHM")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    AUTH_CACHE_TTL_SECONDS: int = 30
+    AUTH_CACHE_MAX_SIZE: int = 10000
+    MEMBERSHIP_CACHE_TTL_SECONDS: int = 60
+    MEMBERSHIP_CACHE_MAX_SIZE: int = 10000
+    MEMBERSHIP_CACHE_INVALIDATION: str = "none"  # "none" o "postgres" (LISTEN/NOTIFY entre procesos)
+    
+    # Endpoints de métricas internas (header X-Ops-Token); sin token quedan deshabilitados
+    OPS_TOKEN: Optional[str] = None
     
     # API settings
     API_V1_STR: str = "/api/v1"
     PROJECT_NAME: str = "MyVoiceChat API"
-    
+
+    # Audio storage settings
+    AUDIO_FILE_INDEX_PERSIST: bool = False  # Guardar el índice de audios en la tabla audio_files (multi-proceso)
+
+    # Translation backend settings
+    TRANSLATION_API_URL: str = "http://127.0.0.1:8000/translate/"
+    AUDIO_TRANSLATION_API_URL: str = "http://localhost:8000/translate-audio/"
+    TRANSLATION_TIMEOUT: float = 30.0  # segundos
+    AUDIO_TRANSLATION_TIMEOUT: float = 60.0  # segundos (F5-TTS es lento)
+    TRANSLATION_CONNECT_TIMEOUT: float = 5.0  # segundos
+    TRANSLATION_HTTP_MAX_CONNECTIONS: int = 100
+    TRANSLATION_HTTP_MAX_KEEPALIVE: int = 20
+    TRANSLATION_HTTP_KEEPALIVE_EXPIRY: float = 30.0  # segundos
+
+    # Micro-batching of text translations (disabled if no batch URL)
+    TRANSLATION_BATCH_API_URL: Optional[str] = None  # p.ej. "http://127.0.0.1:8000/translate-batch/"
+    TRANSLATION_BATCH_MAX_SIZE: int = 32
+    TRANSLATION_BATCH_MAX_WAIT_MS: float = 10.0
+
+    # Translation cache settings
+    TRANSLATION_CACHE_ENABLED: bool = True
+    TRANSLATION_CACHE_MAX_SIZE: int = 10000
+    TRANSLATION_CACHE_TTL: int = 86400  # segundos
+    TRANSLATION_CACHE_SHARED: bool = False  # Segundo nivel en la tabla translation_cache
+
+    # Translation queue settings
+    TRANSLATION_QUEUE_BACKEND: str = "database"  # "database" o "memory"
+    TRANSLATION_WORKERS: int = 4
+    TRANSLATION_MAX_ATTEMPTS: int = 5
+    TRANSLATION_RETRY_BASE_DELAY: float = 2.0  # segundos
+    TRANSLATION_RETRY_MAX_DELAY: float = 300.0  # segundos
+    TRANSLATION_JOB_LEASE_SECONDS: int = 600
+    TRANSLATION_QUEUE_POLL_INTERVAL: float = 5.0  # segundos
+
+    # WebSocket settings
+    WS_BACKPLANE: str = "memory"  # "memory" (un solo worker), "redis" o "postgres"
+    WS_BACKPLANE_URL: Optional[str] = None  # URL de Redis; para postgres, por defecto DATABASE_URL
+    WS_SEND_QUEUE_SIZE: int = 256  # frames pendientes por conexión
+    WS_SLOW_CONSUMER_POLICY: str = "coalesce"  # "drop", "coalesce" o "disconnect"
+    WS_SEND_TIMEOUT: float = 10.0  # segundos; un envío más lento cierra la conexión
+    WS_MAX_SUBSCRIPTIONS: int = 200  # conversaciones por socket en /ws
+    WS_TYPING_TIMEOUT: float = 6.0  # segundos sin frames de escritura hasta emitir is_typing=false
+    WS_INBOUND_RATE: float = 10.0  # frames entrantes por segundo y conexión
+    WS_INBOUND_BURST: int = 20  # ráfaga máxima de frames entrantes
+    WS_REPLAY_BUFFER_SIZE: int = 200  # eventos recientes por conversación para reanudar con since_seq
+    WS_REPLAY_MAX_CONVERSATIONS: int = 1000  # conversaciones con anillo de reenvío (LRU)
+    WS_REPLAY_DB_LIMIT: int = 500  # eventos reenviados desde la base de datos; más allá, resync
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,222 @@
+import logging
+import select
+import threading
+import time
+from collections import OrderedDict
+from typing import FrozenSet, Optional, Tuple
+
+from sqlalchemy import select as sa_select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import engine
+from app.models.participant import Participant
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "membership_invalidated"
+
+
+class MembershipCache:
+    """
+    Caché de los miembros de cada conversación, para autorizar REST y WebSocket
+    sin consultar la tabla participants en cada llamada.
+
+    Cada invalidación toma un valor de un reloj global y lo guarda como versión de
+    la conversación; una carga desde la base de datos solo se guarda si la versión
+    no cambió mientras se consultaba, así un alta/baja concurrente nunca deja un
+    conjunto obsoleto. Las versiones de conversaciones fuera de la caché se
+    descartan (como mucho max_size): al descartar una se sube `_floor`, la versión
+    de las que no tienen entrada, de modo que una carga en curso que la hubiera
+    visto antes tampoco se guarda.
+    Se invalida desde crud/participant.py y crud/conversation.py.
+    """
+
+    def __init__(self, ttl_seconds: float = 300, max_size: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._members: "OrderedDict[int, Tuple[FrozenSet[int], float]]" = OrderedDict()
+        self._versions: "OrderedDict[int, int]" = OrderedDict()
+        self._clock = 0
+        self._floor = 0
+        self._lock = threading.Lock()
+        self._channel: Optional["PostgresInvalidationChannel"] = None
+        self.hits = 0
+        self.misses = 0
+
+    def is_member(self, db: Session, user_id: int, conversation_id: int) -> bool:
+        members = self._get(conversation_id)
+        if members is None:
+            version = self.version(conversation_id)
+            rows = db.query(Participant.user_id).filter(Participant.conversation_id == conversation_id).all()
+            members = frozenset(row[0] for row in rows)
+            self._store(conversation_id, members, version)
+        return user_id in members
+
+    async def is_member_async(self, db, user_id: int, conversation_id: int) -> bool:
+        """Igual que is_member, con una AsyncSession"""
+        members = self._get(conversation_id)
+        if members is None:
+            version = self.version(conversation_id)
+            result = await db.execute(
+                sa_select(Participant.user_id).filter(Participant.conversation_id == conversation_id)
+            )
+            members = frozenset(result.scalars().all())
+            self._store(conversation_id, members, version)
+        return user_id in members
+
+    def version(self, conversation_id: int) -> int:
+        with self._lock:
+            return self._versions.get(conversation_id, self._floor)
+
+    def invalidate(self, conversation_id: int, publish: bool = True):
+        with self._lock:
+            self._clock += 1
+            self._versions[conversation_id] = self._clock
+            self._versions.move_to_end(conversation_id)
+            self._members.pop(conversation_id, None)
+            while len(self._versions) > self.max_size:
+                self._forget_version(next(iter(self._versions)))
+        if publish and self._channel is not None:
+            self._channel.publish(conversation_id)
+
+    def clear(self):
+        with self._lock:
+            # Invalida también las cargas en curso de cualquier conversación
+            self._clock += 1
+            self._floor = self._clock
+            self._versions.clear()
+            self._members.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._members),
+            "versions": len(self._versions),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "cross_process": self._channel is not None,
+        }
+
+    def start_invalidation_channel(self):
+        """Escuchar invalidaciones de otros procesos (MEMBERSHIP_CACHE_INVALIDATION=postgres)"""
+        if settings.MEMBERSHIP_CACHE_INVALIDATION != "postgres" or self._channel is not None:
+            return
+        if engine.dialect.name != "postgresql":
+            logger.warning("Membership cache invalidation channel requires PostgreSQL; running process-local")
+            return
+        self._channel = PostgresInvalidationChannel(self)
+        self._channel.start()
+
+    def stop_invalidation_channel(self):
+        if self._channel is not None:
+            self._channel.stop()
+            self._channel = None
+
+    def _get(self, conversation_id: int) -> Optional[FrozenSet[int]]:
+        with self._lock:
+            entry = self._members.get(conversation_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            members, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._members[conversation_id]
+                self._forget_version(conversation_id)
+                self.misses += 1
+                return None
+            self._members.move_to_end(conversation_id)
+            self.hits += 1
+            return members
+
+    def _store(self, conversation_id: int, members: FrozenSet[int], version: int):
+        with self._lock:
+            if self._versions.get(conversation_id, self._floor) != version:
+                # Se invalidó mientras se consultaba: no guardar un resultado obsoleto
+                return
+            self._members[conversation_id] = (members, time.monotonic() + self.ttl_seconds)
+            self._members.move_to_end(conversation_id)
+            while len(self._members) > self.max_size:
+                evicted, _ = self._members.popitem(last=False)
+                self._forget_version(evicted)
+
+    def _forget_version(self, conversation_id: int):
+        """Descartar la versión de una conversación (con el lock tomado)"""
+        version = self._versions.pop(conversation_id, None)
+        if version is not None:
+            self._floor = max(self._floor, version)
+
+
+class PostgresInvalidationChannel:
+    """Propaga las invalidaciones entre procesos con LISTEN/NOTIFY de PostgreSQL"""
+
+    def __init__(self, cache: MembershipCache, poll_interval: float = 1.0):
+        self.cache = cache
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name="membership-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval * 2)
+            self._thread = None
+
+    def publish(self, conversation_id: int):
+        try:
+            with engine.connect() as conn:
+                conn.execution_options(isolation_level="AUTOCOMMIT").execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": INVALIDATION_CHANNEL, "payload": str(conversation_id)}
+                )
+        except Exception as e:
+            logger.error(f"Failed to publish membership invalidation for conversation {conversation_id}: {e}")
+
+    def handle_notify(self, payload: str):
+        """Aplicar una invalidación publicada por otro proceso"""
+        try:
+            conversation_id = int(payload)
+        except ValueError:
+            logger.warning(f"Ignoring invalid membership invalidation payload: {payload}")
+            return
+        self.cache.invalidate(conversation_id, publish=False)
+
+    def _listen(self):
+        while not self._stop.is_set():
+            connection = None
+            try:
+                # Conexión dedicada, fuera del pool
+                fairy = engine.raw_connection()
+                fairy.detach()
+                connection = fairy.connection
+                connection.autocommit = True
+                connection.cursor().execute(f"LISTEN {INVALIDATION_CHANNEL}")
+                # Lo ocurrido mientras no se escuchaba se desconoce
+                self.cache.clear()
+                while not self._stop.is_set():
+                    if select.select([connection], [], [], self.poll_interval) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        self.handle_notify(connection.notifies.pop(0).payload)
+            except Exception as e:
+                logger.error(f"Membership invalidation listener error: {e}")
+                self._stop.wait(self.poll_interval)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+
+# Global instance
+membership_cache = MembershipCache(
+    ttl_seconds=settings.MEMBERSHIP_CACHE_TTL_SECONDS,
+    max_size=settings.MEMBERSHIP_CACHE_MAX_SIZE
+)
@@ -13,12 +13,16 @@ from app.crud.conversation import (
     create_conversation,
     update_conversation,
     delete_conversation,
-    get_conversations_by_user_id
+    get_conversations_by_user_id,
+    get_conversation_summaries,
+    get_inbox,
+    next_event_seq
 )
 from app.crud.participant import (
     get_participant,
     get_participants,
     create_participant,
+    create_participant_if_absent,
     update_participant,
     delete_participant,
     get_participants_by_conversation_id,
@@ -33,5 +37,11 @@ from app.crud.message import (
     delete_message,
     get_messages_by_conversation_id,
     mark_messages_as_read,
-    count_unread_messages
+    count_unread_messages,
+    get_latest_message_id,
+    get_read_cursors,
+    get_messages_page,
+    get_messages_since_seq,
+    encode_message_cursor,
+    decode_message_cursor
 )
\ No newline at end of file
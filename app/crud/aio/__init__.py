@@ -0,0 +1,17 @@
+"""Async versions of the crud functions used on the hot request paths (AsyncSession)"""
+from app.crud.aio.user import (
+    get_user,
+    get_user_by_username
+)
+from app.crud.aio.conversation import (
+    get_conversation,
+    next_event_seq
+)
+from app.crud.aio.participant import (
+    get_participant_by_user_and_conversation
+)
+from app.crud.aio.message import (
+    get_message,
+    create_message,
+    create_audio_message
+)
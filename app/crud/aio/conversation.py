@@ -0,0 +1,23 @@
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.conversation import Conversation
+
+
+async def get_conversation(db: AsyncSession, conversation_id: int) -> Optional[Conversation]:
+    result = await db.execute(select(Conversation).filter(Conversation.id == conversation_id))
+    return result.scalars().first()
+
+
+async def next_event_seq(db: AsyncSession, conversation_id: int) -> int:
+    """Versión async de app.crud.conversation.next_event_seq"""
+    await db.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(last_seq=Conversation.last_seq + 1)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(select(Conversation.last_seq).filter(Conversation.id == conversation_id))
+    return result.scalar()
@@ -0,0 +1,51 @@
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.aio.conversation import next_event_seq
+from app.models.message import Message, ContentType
+from app.schemas.message import MessageCreate
+
+
+async def get_message(db: AsyncSession, message_id: int) -> Optional[Message]:
+    result = await db.execute(select(Message).filter(Message.id == message_id))
+    return result.scalars().first()
+
+
+async def create_message(db: AsyncSession, message: MessageCreate, sender_id: int) -> Message:
+    db_message = Message(
+        **message.dict(),
+        sender_id=sender_id,
+        seq=await next_event_seq(db, message.conversation_id)
+    )
+    db.add(db_message)
+    await db.commit()
+    await db.refresh(db_message)
+    return db_message
+
+
+async def create_audio_message(
+    db: AsyncSession,
+    conversation_id: int,
+    sender_id: int,
+    media_url: str,
+    content: Optional[str] = None,
+    media_hash: Optional[str] = None
+) -> Message:
+    """Create a new audio message"""
+    db_message = Message(
+        conversation_id=conversation_id,
+        sender_id=sender_id,
+        content_type=ContentType.AUDIO,
+        content=content or "",  # Puede estar vacío para mensajes de solo audio
+        media_url=media_url,
+        media_hash=media_hash,
+        is_read=False,
+        seq=await next_event_seq(db, conversation_id)
+    )
+    db.add(db_message)
+    await db.commit()
+    await db.refresh(db_message)
+    return db_message
+
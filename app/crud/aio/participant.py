@@ -0,0 +1,20 @@
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.participant import Participant
+
+
+async def get_participant_by_user_and_conversation(
+    db: AsyncSession, user_id: int, conversation_id: int
+) -> Optional[Participant]:
+    result = await db.execute(
+        select(Participant)
+        .filter(
+            Participant.user_id == user_id,
+            Participant.conversation_id == conversation_id
+        )
+        .limit(1)
+    )
+    return result.scalars().first()
@@ -1,13 +1,33 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List, Optional
+from sqlalchemy import desc, func
+from sqlalchemy.orm import load_only
+from typing import List, Optional, Sequence
 from fastapi.encoders import jsonable_encoder
 from app.models.conversation import Conversation
+from app.models.participant import Participant
+from app.models.message import Message
+from app.models.translated_message import TranslatedMessage
+from app.models.user import User
+from app.core.membership_cache import membership_cache
 from app.schemas.conversation import ConversationCreate, ConversationUpdate
 
 
-def get_conversation(db: Session, conversation_id: int) -> Optional[Conversation]:
-    return db.query(Conversation).filter(Conversation.id == conversation_id).first()
+def get_conversation(db: Session, conversation_id: int, options: Sequence = ()) -> Optional[Conversation]:
+    return db.query(Conversation).options(*options).filter(Conversation.id == conversation_id).first()
+
+
+def next_event_seq(db: Session, conversation_id: int) -> int:
+    """Reservar el siguiente número de secuencia de eventos de la conversación.
+
+    El UPDATE bloquea la fila de la conversación hasta el commit del mensaje, así
+    que dos workers nunca asignan el mismo número y los seq se confirman en orden
+    (un rollback devuelve el número). Los frames sí pueden publicarse o llegar
+    desordenados: la reanudación detecta los huecos (ver ReplayBuffer.covers).
+    """
+    db.query(Conversation).filter(Conversation.id == conversation_id).update(
+        {Conversation.last_seq: Conversation.last_seq + 1}, synchronize_session=False
+    )
+    return db.query(Conversation.last_seq).filter(Conversation.id == conversation_id).scalar()
 
 
 def get_conversations(db: Session, skip: int = 0, limit: int = 100) -> List[Conversation]:
@@ -43,6 +63,7 @@ def delete_conversation(db: Session, conversation_id: int) -> bool:
     if conversation:
         db.delete(conversation)
         db.commit()
+        membership_cache.invalidate(conversation_id)
         return True
     return False
 
@@ -65,3 +86,188 @@ def get_all_conversations(db: Session, skip: int = 0, limit: int = 100) -> List[
         .limit(limit)
         .all()
     )
+
+
+def get_conversation_summaries(
+    db: Session, skip: int = 0, limit: int = 100, user_id: Optional[int] = None
+) -> List[dict]:
+    """
+    Conversaciones ordenadas por fecha de actualización con participant_count,
+    message_count y el último mensaje calculados en la base de datos (COUNT ...
+    GROUP BY), sin cargar las relaciones. Si se indica user_id, solo las
+    conversaciones de ese usuario y sus mensajes sin leer (unread_count).
+    """
+    page_query = db.query(Conversation.id, Conversation.created_at, Conversation.updated_at)
+    if user_id is not None:
+        page_query = page_query.join(
+            Participant,
+            (Participant.conversation_id == Conversation.id) & (Participant.user_id == user_id)
+        )
+    page = (
+        page_query
+        .order_by(desc(Conversation.updated_at), desc(Conversation.id))
+        .offset(skip)
+        .limit(limit)
+        .subquery()
+    )
+    page_ids = db.query(page.c.id)
+
+    # Los conteos se limitan a la página para no recorrer todas las conversaciones
+    participant_counts = (
+        db.query(Participant.conversation_id, func.count(Participant.id).label("participant_count"))
+        .filter(Participant.conversation_id.in_(page_ids))
+        .group_by(Participant.conversation_id)
+        .subquery()
+    )
+    message_counts = (
+        db.query(Message.conversation_id, func.count(Message.id).label("message_count"))
+        .filter(Message.conversation_id.in_(page_ids))
+        .group_by(Message.conversation_id)
+        .subquery()
+    )
+
+    # Último mensaje: subconsulta correlacionada sobre el índice (conversation_id, created_at, id)
+    last_message = (
+        db.query(Message.id)
+        .filter(Message.conversation_id == page.c.id)
+        .order_by(desc(Message.created_at), desc(Message.id))
+        .limit(1)
+        .correlate(page)
+        .scalar_subquery()
+    )
+    columns = [
+        page.c.id,
+        page.c.created_at,
+        page.c.updated_at,
+        func.coalesce(participant_counts.c.participant_count, 0).label("participant_count"),
+        func.coalesce(message_counts.c.message_count, 0).label("message_count"),
+        last_message.label("last_message_id"),
+    ]
+    unread_counts = None
+    if user_id is not None:
+        # Mensajes de los demás por encima del cursor de lectura del usuario
+        unread_counts = (
+            db.query(Message.conversation_id, func.count(Message.id).label("unread_count"))
+            .join(
+                Participant,
+                (Participant.conversation_id == Message.conversation_id) & (Participant.user_id == user_id)
+            )
+            .filter(
+                Message.conversation_id.in_(page_ids),
+                Message.id > func.coalesce(Participant.last_read_message_id, 0),
+                Message.sender_id != user_id
+            )
+            .group_by(Message.conversation_id)
+            .subquery()
+        )
+        columns.append(func.coalesce(unread_counts.c.unread_count, 0).label("unread_count"))
+
+    query = (
+        db.query(*columns)
+        .outerjoin(participant_counts, participant_counts.c.conversation_id == page.c.id)
+        .outerjoin(message_counts, message_counts.c.conversation_id == page.c.id)
+    )
+    if unread_counts is not None:
+        query = query.outerjoin(unread_counts, unread_counts.c.conversation_id == page.c.id)
+    rows = query.order_by(desc(page.c.updated_at), desc(page.c.id)).all()
+    return [dict(row._mapping) for row in rows]
+
+
+def get_inbox(db: Session, user_id: int, skip: int = 0, limit: int = 50) -> List[dict]:
+    """
+    Bandeja de entrada del usuario ordenada por última actividad: último mensaje,
+    si tiene traducción, mensajes sin leer y los demás participantes de cada
+    conversación. Usa un número fijo de consultas (4) independiente del tamaño de
+    la página.
+    """
+    # 1. Página de conversaciones. El último mensaje se obtiene con subconsultas
+    #    correlacionadas que recorren el índice (conversation_id, created_at, id)
+    last_message_id = (
+        db.query(Message.id)
+        .filter(Message.conversation_id == Conversation.id)
+        .order_by(desc(Message.created_at), desc(Message.id))
+        .limit(1)
+        .correlate(Conversation)
+        .scalar_subquery()
+    )
+    last_message_at = (
+        db.query(func.max(Message.created_at))
+        .filter(Message.conversation_id == Conversation.id)
+        .correlate(Conversation)
+        .scalar_subquery()
+    )
+    last_activity = func.coalesce(last_message_at, Conversation.created_at)
+    page = (
+        db.query(
+            Conversation.id,
+            Conversation.created_at,
+            last_activity.label("last_activity"),
+            last_message_id.label("last_message_id")
+        )
+        .join(
+            Participant,
+            (Participant.conversation_id == Conversation.id) & (Participant.user_id == user_id)
+        )
+        .order_by(desc(last_activity), desc(Conversation.id))
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+    if not page:
+        return []
+    conversation_ids = [row.id for row in page]
+
+    # 2. Últimos mensajes y si existe su traducción
+    last_message_ids = [row.last_message_id for row in page if row.last_message_id is not None]
+    last_messages = {}
+    if last_message_ids:
+        rows = (
+            db.query(Message, TranslatedMessage.id.isnot(None).label("has_translation"))
+            .outerjoin(TranslatedMessage, TranslatedMessage.original_message_id == Message.id)
+            .filter(Message.id.in_(last_message_ids))
+            .all()
+        )
+        last_messages = {message.id: (message, has_translation) for message, has_translation in rows}
+
+    # 3. Mensajes sin leer por conversación (por encima del cursor de lectura)
+    unread_counts = dict(
+        db.query(Message.conversation_id, func.count(Message.id))
+        .join(
+            Participant,
+            (Participant.conversation_id == Message.conversation_id) & (Participant.user_id == user_id)
+        )
+        .filter(
+            Message.conversation_id.in_(conversation_ids),
+            Message.id > func.coalesce(Participant.last_read_message_id, 0),
+            Message.sender_id != user_id
+        )
+        .group_by(Message.conversation_id)
+        .all()
+    )
+
+    # 4. Los demás participantes (datos básicos)
+    participants = {conversation_id: [] for conversation_id in conversation_ids}
+    rows = (
+        db.query(Participant.conversation_id, User)
+        .join(User, User.id == Participant.user_id)
+        .options(load_only(User.id, User.username))
+        .filter(Participant.conversation_id.in_(conversation_ids), Participant.user_id != user_id)
+        .order_by(Participant.conversation_id, Participant.id)
+        .all()
+    )
+    for conversation_id, user in rows:
+        participants[conversation_id].append(user)
+
+    inbox = []
+    for row in page:
+        message, has_translation = last_messages.get(row.last_message_id, (None, False))
+        inbox.append({
+            "conversation_id": row.id,
+            "created_at": row.created_at,
+            "last_activity": row.last_activity,
+            "last_message": message,
+            "has_translation": bool(has_translation),
+            "unread_count": unread_counts.get(row.id, 0),
+            "participants": participants[row.id],
+        })
+    return inbox
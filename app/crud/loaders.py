@@ -0,0 +1,28 @@
+from typing import Callable, Dict, List
+
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.models.participant import Participant
+from app import schemas
+
+# Estrategias de carga por schema de respuesta: las relaciones que el schema
+# serializa se cargan en la misma consulta (joinedload, muchos-a-uno) o en una
+# consulta adicional por relación (selectinload, uno-a-muchos), nunca fila a fila
+LOADER_PROFILES: Dict[type, Callable[[], List]] = {
+    schemas.MessageWithSender: lambda: [joinedload(Message.sender)],
+    schemas.ParticipantWithUser: lambda: [joinedload(Participant.user)],
+    schemas.ConversationWithParticipants: lambda: [selectinload(Conversation.participants)],
+    schemas.ConversationWithMessages: lambda: [selectinload(Conversation.messages)],
+    schemas.ConversationDetail: lambda: [
+        selectinload(Conversation.participants),
+        selectinload(Conversation.messages),
+    ],
+}
+
+
+def loader_options(schema: type) -> List:
+    """Opciones de carga (query.options) para serializar con el schema dado"""
+    profile = LOADER_PROFILES.get(schema)
+    return profile() if profile is not None else []
@@ -1,7 +1,12 @@
+import base64
+from datetime import datetime
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import and_, or_, func
+from typing import Dict, List, Optional, Sequence, Tuple
 from fastapi.encoders import jsonable_encoder
+from app.crud.conversation import next_event_seq
 from app.models.message import Message, ContentType
+from app.models.participant import Participant
 from app.schemas.message import MessageCreate, MessageUpdate
 from app.services.file_storage import FileStorageService
 
@@ -17,7 +22,8 @@ def get_messages(db: Session, skip: int = 0, limit: int = 100) -> List[Message]:
 def create_message(db: Session, message: MessageCreate, sender_id: int) -> Message:
     db_message = Message(
         **message.dict(),
-        sender_id=sender_id
+        sender_id=sender_id,
+        seq=next_event_seq(db, message.conversation_id)
     )
     db.add(db_message)
     db.commit()
@@ -51,10 +57,11 @@ def delete_message(db: Session, message_id: int) -> bool:
 
 
 def get_messages_by_conversation_id(
-    db: Session, conversation_id: int, skip: int = 0, limit: int = 100
+    db: Session, conversation_id: int, skip: int = 0, limit: int = 100, options: Sequence = ()
 ) -> List[Message]:
     return (
         db.query(Message)
+        .options(*options)
         .filter(Message.conversation_id == conversation_id)
         .order_by(Message.created_at)
         .offset(skip)
@@ -63,31 +70,135 @@ def get_messages_by_conversation_id(
     )
 
 
-def mark_messages_as_read(db: Session, conversation_id: int, user_id: int) -> int:
-    """Mark all messages in a conversation as read for a specific user"""
-    result = (
-        db.query(Message)
+def encode_message_cursor(message: Message) -> str:
+    """Opaque cursor for keyset pagination on (created_at, id)"""
+    raw = f"{message.created_at.isoformat()}|{message.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_message_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by encode_message_cursor; raises ValueError if invalid"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, message_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(message_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def get_messages_page(
+    db: Session,
+    conversation_id: int,
+    limit: int = 50,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    options: Sequence = ()
+) -> List[Message]:
+    """
+    Keyset pagination over (created_at, id), always returned in chronological order.
+    - before: messages older than the cursor (the newest `limit` of them)
+    - after: messages newer than the cursor (the oldest `limit` of them)
+    - neither: the newest `limit` messages of the conversation
+    """
+    query = db.query(Message).options(*options).filter(Message.conversation_id == conversation_id)
+    
+    if after:
+        created_at, message_id = decode_message_cursor(after)
+        query = query.filter(
+            or_(
+                Message.created_at > created_at,
+                and_(Message.created_at == created_at, Message.id > message_id)
+            )
+        )
+        return query.order_by(Message.created_at, Message.id).limit(limit).all()
+    
+    if before:
+        created_at, message_id = decode_message_cursor(before)
+        query = query.filter(
+            or_(
+                Message.created_at < created_at,
+                and_(Message.created_at == created_at, Message.id < message_id)
+            )
+        )
+    messages = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit).all()
+    messages.reverse()
+    return messages
+
+
+def get_latest_message_id(db: Session, conversation_id: int) -> Optional[int]:
+    return (
+        db.query(func.max(Message.id))
+        .filter(Message.conversation_id == conversation_id)
+        .scalar()
+    )
+
+
+def mark_messages_as_read(
+    db: Session, conversation_id: int, user_id: int, up_to_message_id: Optional[int] = None
+) -> Optional[int]:
+    """
+    Advance the participant's read cursor to up_to_message_id (by default the latest
+    message in the conversation). The cursor never moves backwards; returns the new
+    cursor, or None when it did not change.
+    """
+    if up_to_message_id is None:
+        up_to_message_id = get_latest_message_id(db, conversation_id)
+        if up_to_message_id is None:
+            return None
+    updated = (
+        db.query(Participant)
         .filter(
-            Message.conversation_id == conversation_id,
-            Message.sender_id != user_id,
-            Message.is_read == False
+            Participant.conversation_id == conversation_id,
+            Participant.user_id == user_id,
+            or_(
+                Participant.last_read_message_id.is_(None),
+                Participant.last_read_message_id < up_to_message_id
+            )
         )
-        .update({"is_read": True})
+        .update({"last_read_message_id": up_to_message_id}, synchronize_session=False)
     )
     db.commit()
-    return result
+    return up_to_message_id if updated else None
+
+
+def get_read_cursors(db: Session, conversation_id: int) -> Dict[int, Optional[int]]:
+    """Read cursor (last read message id) of every participant, keyed by user id"""
+    return dict(
+        db.query(Participant.user_id, Participant.last_read_message_id)
+        .filter(Participant.conversation_id == conversation_id)
+        .all()
+    )
 
 
 def count_unread_messages(db: Session, conversation_id: int, user_id: int) -> int:
-    """Count unread messages in a conversation for a specific user"""
+    """Count messages from other users above the user's read cursor"""
+    read_cursor = (
+        db.query(Participant.last_read_message_id)
+        .filter(Participant.conversation_id == conversation_id, Participant.user_id == user_id)
+        .scalar_subquery()
+    )
     return (
-        db.query(Message)
+        db.query(func.count(Message.id))
         .filter(
             Message.conversation_id == conversation_id,
-            Message.sender_id != user_id,
-            Message.is_read == False
+            Message.id > func.coalesce(read_cursor, 0),
+            Message.sender_id != user_id
         )
-        .count()
+        .scalar()
+    )
+
+
+def get_messages_since_seq(
+    db: Session, conversation_id: int, since_seq: int, limit: int, options: Sequence = ()
+) -> List[Message]:
+    """Mensajes con seq > since_seq (reenvío tras una reconexión), en orden de secuencia"""
+    return (
+        db.query(Message)
+        .options(*options)
+        .filter(Message.conversation_id == conversation_id, Message.seq > since_seq)
+        .order_by(Message.seq)
+        .limit(limit)
+        .all()
     )
 
 
@@ -96,7 +207,8 @@ def create_audio_message(
     conversation_id: int, 
     sender_id: int, 
     media_url: str,
-    content: Optional[str] = None
+    content: Optional[str] = None,
+    media_hash: Optional[str] = None
 ) -> Message:
     """Create a new audio message"""
     db_message = Message(
@@ -105,7 +217,9 @@ def create_audio_message(
         content_type=ContentType.AUDIO,
         content=content or "",  # Puede estar vacío para mensajes de solo audio
         media_url=media_url,
-        is_read=False
+        media_hash=media_hash,
+        is_read=False,
+        seq=next_event_seq(db, conversation_id)
     )
     db.add(db_message)
     db.commit()
@@ -120,7 +234,7 @@ def delete_audio_message(db: Session, message_id: int) -> bool:
         # Eliminar el archivo físico
         file_storage = FileStorageService()
         file_path = file_storage.get_full_path_from_url(message.media_url)
-        file_storage.delete_audio_file(file_path)
+        file_storage.delete_audio_file(file_path, content_hash=message.media_hash)
         
         # Eliminar el mensaje de la base de datos
         db.delete(message)
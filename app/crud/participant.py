@@ -1,7 +1,9 @@
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional, Sequence
 from fastapi.encoders import jsonable_encoder
 from app.models.participant import Participant
+from app.core.membership_cache import membership_cache
 from app.schemas.participant import ParticipantCreate, ParticipantUpdate
 
 
@@ -17,6 +19,46 @@ def create_participant(db: Session, participant: ParticipantCreate) -> Participa
     db_participant = Participant(**participant.dict())
     db.add(db_participant)
     db.commit()
+    membership_cache.invalidate(participant.conversation_id)
+    db.refresh(db_participant)
+    return db_participant
+
+
+def create_participant_if_absent(db: Session, participant: ParticipantCreate) -> Optional[Participant]:
+    """
+    Insert the participant unless (conversation_id, user_id) already exists.
+    Returns None when the user was already a participant. Relies on the unique
+    index instead of a check-then-insert, so concurrent adds cannot duplicate rows.
+    Any other IntegrityError (unknown user or conversation) is re-raised.
+    """
+    values = participant.dict()
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+
+        stmt = (
+            insert(Participant)
+            .values(**values)
+            .on_conflict_do_nothing(index_elements=["conversation_id", "user_id"])
+            .returning(Participant.id)
+        )
+        participant_id = db.execute(stmt).scalar()
+        db.commit()
+        membership_cache.invalidate(participant.conversation_id)
+        if participant_id is None:
+            return None
+        return get_participant(db, participant_id)
+
+    db_participant = Participant(**values)
+    db.add(db_participant)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        # Solo un duplicado significa "ya es participante": una FK rota se propaga
+        if get_participant_by_user_and_conversation(db, participant.user_id, participant.conversation_id):
+            return None
+        raise
+    membership_cache.invalidate(participant.conversation_id)
     db.refresh(db_participant)
     return db_participant
 
@@ -40,14 +82,18 @@ def update_participant(
 def delete_participant(db: Session, participant_id: int) -> bool:
     participant = get_participant(db, participant_id)
     if participant:
+        conversation_id = participant.conversation_id
         db.delete(participant)
         db.commit()
+        membership_cache.invalidate(conversation_id)
         return True
     return False
 
 
-def get_participants_by_conversation_id(db: Session, conversation_id: int) -> List[Participant]:
-    return db.query(Participant).filter(Participant.conversation_id == conversation_id).all()
+def get_participants_by_conversation_id(
+    db: Session, conversation_id: int, options: Sequence = ()
+) -> List[Participant]:
+    return db.query(Participant).options(*options).filter(Participant.conversation_id == conversation_id).all()
 
 
 def get_participants_by_user_id(db: Session, user_id: int) -> List[Participant]:
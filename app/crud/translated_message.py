@@ -1,14 +1,22 @@
 from sqlalchemy.orm import Session
 from app.models.translated_message import TranslatedMessage
+from app.models.message import Message
+from app.crud.conversation import next_event_seq
 from app.schemas.translated_message import TranslatedMessageCreate
-from typing import Optional
+from typing import List, Optional
 
 
 class TranslatedMessageCRUD:
     @staticmethod
     def create(db: Session, translated_message: TranslatedMessageCreate) -> TranslatedMessage:
         """Create a new translated message"""
-        db_translated_message = TranslatedMessage(**translated_message.dict())
+        conversation_id = db.query(Message.conversation_id).filter(
+            Message.id == translated_message.original_message_id
+        ).scalar()
+        db_translated_message = TranslatedMessage(
+            **translated_message.dict(),
+            seq=next_event_seq(db, conversation_id) if conversation_id is not None else None
+        )
         db.add(db_translated_message)
         db.commit()
         db.refresh(db_translated_message)
@@ -28,6 +36,29 @@ class TranslatedMessageCRUD:
             TranslatedMessage.id == translated_message_id
         ).first()
     
+    @staticmethod
+    def get_by_conversation_since_seq(
+        db: Session, conversation_id: int, since_seq: int, limit: int
+    ) -> List[TranslatedMessage]:
+        """Translations with seq > since_seq in a conversation, in sequence order"""
+        return db.query(TranslatedMessage).join(Message, TranslatedMessage.original_message).filter(
+            Message.conversation_id == conversation_id,
+            TranslatedMessage.seq > since_seq
+        ).order_by(TranslatedMessage.seq).limit(limit).all()
+    
+    @staticmethod
+    def get_audio_by_source_hash(
+        db: Session, media_hash: str, target_language: str, sender_id: int
+    ) -> Optional[TranslatedMessage]:
+        """Get an existing audio translation of the same source audio, language and voice"""
+        return db.query(TranslatedMessage).join(Message, TranslatedMessage.original_message).filter(
+            Message.media_hash == media_hash,
+            Message.sender_id == sender_id,
+            TranslatedMessage.target_language == target_language,
+            TranslatedMessage.content_type == "AUDIO",
+            TranslatedMessage.media_url.isnot(None)
+        ).first()
+    
     @staticmethod
     def delete(db: Session, translated_message_id: int) -> bool:
         """Delete a translated message"""
@@ -3,6 +3,7 @@ from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
 
 from app.core.security import get_password_hash, verify_password
+from app.core.auth_cache import principal_cache
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 from app.services.file_storage import FileStorageService
@@ -53,6 +54,7 @@ def update_user(
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    principal_cache.invalidate(db_user.id)
     return db_user
 
 
@@ -73,6 +75,7 @@ def update_user_audio(
         user.ref_audio_url = audio_url
         db.commit()
         db.refresh(user)
+        principal_cache.invalidate(user.id)
     return user
 
 
@@ -87,4 +90,5 @@ def delete_user(db: Session, user_id: int) -> Optional[User]:
         
         db.delete(user)
         db.commit()
+        principal_cache.invalidate(user_id)
     return user
@@ -1,12 +1,19 @@
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse, HTMLResponse
 from fastapi.staticfiles import StaticFiles
+from fastapi.concurrency import run_in_threadpool
 import os
 
+from app.api.dependencies import require_ops_token
 from app.api.endpoints import api_router
 from app.core.config import settings
-from app.db.database import create_tables
+from app.db.database import create_tables, get_pool_status
+from app.services.translation_queue import translation_queue
+from app.services.translation_service import TranslationService
+from app.services.file_storage import FileStorageService, audio_file_index
+from app.core.membership_cache import membership_cache
+from app.websockets.manager import manager
 
 
 # Crear las tablas si no existen
@@ -28,8 +35,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cursores de paginación de GET /messages/conversation/{id}
+    expose_headers=["X-Prev-Cursor", "X-Next-Cursor"],
 )
 
+@app.on_event("startup")
+async def startup():
+    await run_in_threadpool(audio_file_index.build, FileStorageService().message_audio_path)
+    await TranslationService.start_http_client()
+    await translation_queue.start()
+    membership_cache.start_invalidation_channel()
+    await manager.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await manager.stop()
+    membership_cache.stop_invalidation_channel()
+    await translation_queue.stop()
+    await TranslationService.close_http_client()
+
 # Include routers
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -59,3 +84,8 @@ def conversation_ws():
     with open(html_path, "r", encoding="utf-8") as f:
         html_content = f.read()
     return HTMLResponse(content=html_content)
+
+@app.get("/health/db", dependencies=[Depends(require_ops_token)])
+def health_db():
+    """Métricas del pool de conexiones a la base de datos"""
+    return get_pool_status()
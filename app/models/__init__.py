@@ -2,4 +2,7 @@ from app.models.user import User
 from app.models.conversation import Conversation
 from app.models.participant import Participant
 from app.models.message import Message
-from app.models.translated_message import TranslatedMessage
\ No newline at end of file
+from app.models.translated_message import TranslatedMessage
+from app.models.translation_job import TranslationJob
+from app.models.translation_cache import TranslationCacheEntry
+from app.models.audio_file import AudioFile
\ No newline at end of file
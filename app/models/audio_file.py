@@ -0,0 +1,11 @@
+from sqlalchemy import Column, String, DateTime, func
+from app.db.database import Base
+
+
+class AudioFile(Base):
+    """Índice persistente nombre de archivo -> ruta de los audios de mensajes"""
+    __tablename__ = "audio_files"
+
+    filename = Column(String, primary_key=True)
+    path = Column(String, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
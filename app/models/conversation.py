@@ -9,6 +9,8 @@ class Conversation(Base):
     id = Column(Integer, primary_key=True, index=True)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    # Último número de secuencia de eventos (mensajes y traducciones) de la conversación
+    last_seq = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relationships
     participants = relationship("Participant", back_populates="conversation", cascade="all, delete-orphan")
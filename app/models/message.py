@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func, Boolean, Enum
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func, Boolean, Enum, Index
 from sqlalchemy.orm import relationship
 import enum
 from app.db.database import Base
@@ -18,10 +18,21 @@ class Message(Base):
     content_type = Column(Enum(ContentType), nullable=False)
     content = Column(String)
     media_url = Column(String)
+    media_hash = Column(String(64), nullable=True, index=True)  # SHA-256 del audio (almacén deduplicado)
     created_at = Column(DateTime, server_default=func.now())
-    is_read = Column(Boolean, default=False)
+    seq = Column(Integer, nullable=True)  # Secuencia del evento new_message en la conversación
+    is_read = Column(Boolean, default=False)  # Obsoleto: el estado de lectura sale de participants.last_read_message_id
     
     # Relationships
     conversation = relationship("Conversation", back_populates="messages")
     sender = relationship("User", back_populates="sent_messages")
     translated_message = relationship("TranslatedMessage", back_populates="original_message", uselist=False)
+    
+    __table_args__ = (
+        # Paginación por cursor (keyset) del historial de una conversación
+        Index("ix_messages_conversation_created_id", "conversation_id", "created_at", "id"),
+        # Conteo de no leídos: rango de ids por encima del cursor de lectura
+        Index("ix_messages_conversation_id_id", "conversation_id", "id"),
+        # Reenvío de eventos perdidos tras una reconexión (seq > since_seq)
+        Index("ix_messages_conversation_seq", "conversation_id", "seq"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, func, Index
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 
@@ -7,10 +7,18 @@ class Participant(Base):
     __tablename__ = "participants"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
     joined_at = Column(DateTime, server_default=func.now())
+    # Cursor de lectura: id del último mensaje leído por este participante
+    last_read_message_id = Column(Integer, nullable=True)
     
     # Relationships
     user = relationship("User", back_populates="participations")
     conversation = relationship("Conversation", back_populates="participants")
+    
+    __table_args__ = (
+        # Un usuario participa una sola vez por conversación; también sirve
+        # para las comprobaciones de pertenencia (conversation_id, user_id)
+        Index("ux_participants_conversation_user", "conversation_id", "user_id", unique=True),
+    )
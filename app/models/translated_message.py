@@ -13,6 +13,7 @@ class TranslatedMessage(Base):
     media_url = Column(String, nullable=True)  # For TTS audio
     content_type = Column(String, nullable=False, default="TEXT")  # "TEXT" or "AUDIO"
     created_at = Column(DateTime, server_default=func.now())
+    seq = Column(Integer, nullable=True)  # Secuencia del evento translation_ready en la conversación
     
     # Relationships
     original_message = relationship("Message", back_populates="translated_message")
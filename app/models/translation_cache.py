@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, DateTime, func, Text
+from app.db.database import Base
+
+
+class TranslationCacheEntry(Base):
+    __tablename__ = "translation_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), nullable=False, unique=True, index=True)  # sha256 de (texto, origen, destino)
+    source_lang = Column(String, nullable=False)
+    target_lang = Column(String, nullable=False)
+    source_text = Column(Text, nullable=False)
+    translated_text = Column(Text, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func, Text, Index
+from app.db.database import Base
+
+
+class TranslationJob(Base):
+    __tablename__ = "translation_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    message_id = Column(Integer, ForeignKey("messages.id", ondelete="CASCADE"), nullable=False, unique=True)
+    status = Column(String, nullable=False, default="pending")  # pending, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    available_at = Column(DateTime, nullable=False, server_default=func.now())  # Próximo intento
+    locked_until = Column(DateTime, nullable=True)  # Lease del worker que lo está procesando
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_translation_jobs_status_available_at", "status", "available_at"),
+    )
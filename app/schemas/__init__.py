@@ -1,11 +1,15 @@
-from app.schemas.user import User, UserCreate, UserUpdate, UserInDB
+from app.schemas.user import User, UserBasic, UserCreate, UserUpdate, UserInDB
 from app.schemas.conversation import Conversation, ConversationCreate, ConversationUpdate, ConversationInDBBase
 from app.schemas.participant import Participant, ParticipantCreate
 from app.schemas.message import Message, MessageCreate, MessageUpdate
-from app.schemas.translated_message import TranslatedMessage, TranslatedMessageCreate, TranslateRequest, TranslateResponse
+from app.schemas.translated_message import (
+    TranslatedMessage, TranslatedMessageCreate, TranslateRequest, TranslateResponse,
+    TranslateBatchRequest, TranslateBatchResponse
+)
 
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
 # Define the complex types with forward references here to avoid circular imports
 class ParticipantWithUser(Participant):
@@ -41,4 +45,15 @@ class ConversationDetail(Conversation):
     messages: List[Message] = []
     
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+
+class InboxEntry(BaseModel):
+    """Conversación de la bandeja de entrada con su último mensaje y mensajes sin leer"""
+    conversation_id: int
+    created_at: datetime
+    last_activity: datetime
+    last_message: Optional[Message] = None
+    has_translation: bool = False
+    unread_count: int = 0
+    participants: List[UserBasic] = []
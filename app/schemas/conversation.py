@@ -35,6 +35,8 @@ class ConversationSummary(BaseModel):
     updated_at: datetime
     participant_count: int = 0
     message_count: int = 0
+    last_message_id: Optional[int] = None
+    unread_count: Optional[int] = None  # solo en las conversaciones del usuario actual
     
     class Config:
         orm_mode = True
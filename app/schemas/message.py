@@ -18,6 +18,7 @@ class MessageCreate(BaseModel):
     content_type: ContentType
     content: Optional[str] = None
     media_url: Optional[str] = None
+    media_hash: Optional[str] = None
 
 
 class MessageUpdate(BaseModel):
@@ -27,6 +28,7 @@ class MessageUpdate(BaseModel):
 class MessageInDBBase(MessageBase):
     id: int
     created_at: datetime
+    seq: Optional[int] = None
 
     class Config:
         orm_mode = True
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -18,6 +19,7 @@ class ParticipantUpdate(BaseModel):
 class ParticipantInDBBase(ParticipantBase):
     id: int
     joined_at: datetime
+    last_read_message_id: Optional[int] = None
 
     class Config:
         orm_mode = True
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 
 class TranslatedMessageBase(BaseModel):
@@ -33,3 +33,15 @@ class TranslateResponse(BaseModel):
     translated_text: str
     source_lang: str
     target_lang: str
+
+
+class TranslateBatchRequest(BaseModel):
+    texts: List[str]
+    source_lang: str
+    target_lang: str
+
+
+class TranslateBatchResponse(BaseModel):
+    translated_texts: List[str]
+    source_lang: str
+    target_lang: str
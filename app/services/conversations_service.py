@@ -3,10 +3,12 @@ from fastapi import HTTPException, status
 from typing import List
 from app.crud import (
     create_conversation, get_conversation, get_conversations_by_user_id,
-    delete_conversation, create_participant, get_participant_by_user_and_conversation,
+    delete_conversation, create_participant, get_conversation_summaries, get_inbox,
     get_participants_by_conversation_id
 )
-from app.schemas import ConversationCreate, ParticipantCreate
+from app.schemas import ConversationCreate, ParticipantCreate, ConversationDetail
+from app.crud.loaders import loader_options
+from app.core.membership_cache import membership_cache
 
 class ConversationsService:
     @staticmethod
@@ -21,22 +23,29 @@ class ConversationsService:
         conversations = get_conversations_by_user_id(db, current_user_id)
         return conversations
 
+    @staticmethod
+    def read_conversation_summaries(db: Session, current_user_id: int, skip: int, limit: int):
+        return get_conversation_summaries(db, skip=skip, limit=limit, user_id=current_user_id)
+
+    @staticmethod
+    def read_inbox(db: Session, current_user_id: int, skip: int, limit: int):
+        return get_inbox(db, current_user_id, skip=skip, limit=limit)
+
     @staticmethod
     def read_conversation(db: Session, conversation_id: int, current_user_id: int):
-        conversation = get_conversation(db, conversation_id)
+        if not membership_cache.is_member(db, current_user_id, conversation_id):
+            if not get_conversation(db, conversation_id):
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not a participant in this conversation")
+        conversation = get_conversation(db, conversation_id, options=loader_options(ConversationDetail))
         if not conversation:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
-        participant = get_participant_by_user_and_conversation(db, current_user_id, conversation_id)
-        if not participant:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not a participant in this conversation")
         return conversation
 
     @staticmethod
     def delete_conversation(db: Session, conversation_id: int, current_user_id: int):
-        conversation = get_conversation(db, conversation_id)
-        if not conversation:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
-        participant = get_participant_by_user_and_conversation(db, current_user_id, conversation_id)
-        if not participant:
+        if not membership_cache.is_member(db, current_user_id, conversation_id):
+            if not get_conversation(db, conversation_id):
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not a participant in this conversation")
         delete_conversation(db, conversation_id)
@@ -1,19 +1,164 @@
 import os
 import uuid
-from typing import Optional, Tuple
+import hashlib
+import shutil
+import threading
+import logging
+from typing import Dict, Optional, Tuple
 from fastapi import UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
 import aiofiles
 
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models.audio_file import AudioFile
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de bloque para copiar los uploads a disco sin cargarlos enteros en memoria
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# Locks por hash (repartidos en franjas) para enlazar y liberar blobs: el contador
+# de hard links hace de refcount y no puede cambiar entre la comprobación y el cambio
+_BLOB_LOCKS = [threading.Lock() for _ in range(64)]
+
+
+def _blob_lock(content_hash: str) -> threading.Lock:
+    return _BLOB_LOCKS[int(content_hash[:2], 16) % len(_BLOB_LOCKS)]
+
+
+class AudioFileIndex:
+    """
+    Índice nombre de archivo -> ruta de los audios de mensajes, para resolver
+    las URLs antiguas (/audio/message/{filename}) sin recorrer el árbol de directorios.
+
+    Se construye una vez al arrancar (startup de la aplicación) y se actualiza
+    al guardar y borrar. Con persist=True también se guarda en la tabla
+    audio_files, para que otros procesos encuentren los archivos que no han
+    visto. Si aun así no se encuentra (otro worker lo guardó después del
+    arranque y no se persiste), se busca en los directorios conv_* y se añade
+    al índice. Desde código async se usan las variantes *_async, que hacen esas
+    consultas y búsquedas en el threadpool.
+    """
+
+    def __init__(self, persist: bool = False):
+        self.persist = persist
+        self._paths: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._root: Optional[str] = None
+
+    def build(self, message_audio_path: str):
+        """Recorrer el directorio de mensajes una sola vez (conv_*/archivo)"""
+        paths = {}
+        if os.path.isdir(message_audio_path):
+            for entry in os.scandir(message_audio_path):
+                if entry.is_file():
+                    paths[entry.name] = entry.path
+                elif entry.is_dir():
+                    for file_entry in os.scandir(entry.path):
+                        if file_entry.is_file():
+                            paths[file_entry.name] = file_entry.path
+        with self._lock:
+            self._paths = paths
+            self._root = message_audio_path
+        logger.info(f"Audio file index built with {len(paths)} entries")
+
+    def add(self, filename: str, path: str):
+        with self._lock:
+            self._paths[filename] = path
+        if self.persist:
+            db = SessionLocal()
+            try:
+                db.merge(AudioFile(filename=filename, path=path))
+                db.commit()
+            except Exception as e:
+                logger.error(f"Could not persist audio file index entry {filename}: {e}")
+            finally:
+                db.close()
+
+    def remove(self, filename: str):
+        with self._lock:
+            self._paths.pop(filename, None)
+        if self.persist:
+            db = SessionLocal()
+            try:
+                db.query(AudioFile).filter(AudioFile.filename == filename).delete()
+                db.commit()
+            except Exception as e:
+                logger.error(f"Could not remove audio file index entry {filename}: {e}")
+            finally:
+                db.close()
+
+    def get(self, filename: str) -> Optional[str]:
+        path = self._paths.get(filename)
+        if path is None and self.persist:
+            db = SessionLocal()
+            try:
+                entry = db.query(AudioFile).filter(AudioFile.filename == filename).first()
+                if entry:
+                    path = entry.path
+                    with self._lock:
+                        self._paths[filename] = path
+            finally:
+                db.close()
+        if path is None:
+            path = self._find_on_disk(filename)
+            if path is not None:
+                self.add(filename, path)
+        return path
+
+    def _find_on_disk(self, filename: str) -> Optional[str]:
+        """Buscar el archivo en los directorios de conversación (un stat por directorio)"""
+        if self._root is None or os.path.basename(filename) != filename or not os.path.isdir(self._root):
+            return None
+        candidates = [os.path.join(self._root, filename)]
+        candidates.extend(
+            os.path.join(entry.path, filename) for entry in os.scandir(self._root) if entry.is_dir()
+        )
+        for candidate in candidates:
+            if os.path.isfile(candidate):
+                return candidate
+        return None
+
+    async def add_async(self, filename: str, path: str):
+        if self.persist:
+            await run_in_threadpool(self.add, filename, path)
+        else:
+            self.add(filename, path)
+
+    async def remove_async(self, filename: str):
+        if self.persist:
+            await run_in_threadpool(self.remove, filename)
+        else:
+            self.remove(filename)
+
+    async def get_async(self, filename: str) -> Optional[str]:
+        path = self._paths.get(filename)
+        if path is None and (self.persist or self._root is not None):
+            path = await run_in_threadpool(self.get, filename)
+        return path
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+
+# Global instance
+audio_file_index = AudioFileIndex(persist=settings.AUDIO_FILE_INDEX_PERSIST)
+
 
 class FileStorageService:
     def __init__(self, base_path: str = "uploads/audio"):
         self.base_path = base_path
         self.user_audio_path = os.path.join(base_path, "users")
         self.message_audio_path = os.path.join(base_path, "messages")
+        # Almacén direccionado por contenido: un único blob por hash, enlazado
+        # (hard link) desde la ruta de cada mensaje
+        self.blob_path = os.path.join(base_path, "blobs")
         
         # Crear directorios si no existen
         os.makedirs(self.user_audio_path, exist_ok=True)
         os.makedirs(self.message_audio_path, exist_ok=True)
+        os.makedirs(self.blob_path, exist_ok=True)
     
     async def save_audio_file(self, file: UploadFile, user_id: int) -> str:
         """
@@ -23,39 +168,28 @@ class FileStorageService:
         if not file.content_type or not file.content_type.startswith('audio/'):
             raise HTTPException(status_code=400, detail="El archivo debe ser de audio")
         
-        # Validar tamaño del archivo (max 10MB)
-        max_size = 10 * 1024 * 1024  # 10MB
-        file_content = await file.read()
-        if len(file_content) > max_size:
-            raise HTTPException(status_code=400, detail="El archivo es demasiado grande (máximo 10MB)")
-        
         # Generar nombre único para audio de usuario
         file_extension = file.filename.split('.')[-1] if file.filename and '.' in file.filename else 'wav'
         unique_filename = f"user_{user_id}_{uuid.uuid4().hex}.{file_extension}"
         file_path = os.path.join(self.user_audio_path, unique_filename)
         
-        # Guardar archivo
-        async with aiofiles.open(file_path, 'wb') as f:
-            await f.write(file_content)
+        # Guardar archivo por bloques validando el tamaño (max 10MB)
+        max_size = 10 * 1024 * 1024  # 10MB
+        await self._stream_to_disk(file, file_path, max_size, "El archivo es demasiado grande (máximo 10MB)")
         
         # Retornar la URL que se guardará en ref_audio_url
         return f"/api/uploads/audio/users/{unique_filename}"
     
-    async def save_message_audio_file(self, file: UploadFile, user_id: int, conversation_id: int) -> str:
+    async def save_message_audio_file(self, file: UploadFile, user_id: int, conversation_id: int) -> Tuple[str, str]:
         """
-        Guarda el archivo de audio de un mensaje y retorna la ruta completa del archivo en el sistema
+        Guarda el archivo de audio de un mensaje y retorna la ruta completa del archivo
+        en el sistema junto con el hash SHA-256 de su contenido
         """
         print(f"Guardando archivo de audio para usuario {user_id} en conversación {conversation_id}")
         # Validar tipo de archivo
         if not file.content_type or not file.content_type.startswith('audio/'):
             raise HTTPException(status_code=400, detail="El archivo debe ser de audio")
         
-        # Validar tamaño del archivo (max 25MB para mensajes de audio)
-        max_size = 25 * 1024 * 1024  # 25MB
-        file_content = await file.read()
-        if len(file_content) > max_size:
-            raise HTTPException(status_code=400, detail="El archivo de audio es demasiado grande (máximo 25MB)")
-        
         # Crear subdirectorio por conversación para mejor organización
         conversation_dir = os.path.join(self.message_audio_path, f"conv_{conversation_id}")
         os.makedirs(conversation_dir, exist_ok=True)
@@ -65,23 +199,129 @@ class FileStorageService:
         unique_filename = f"usr_{user_id}_{uuid.uuid4().hex}.{file_extension}"
         file_path = os.path.join(conversation_dir, unique_filename)
         
-        # Guardar archivo
-        async with aiofiles.open(file_path, 'wb') as f:
-            await f.write(file_content)
+        # Guardar archivo por bloques validando el tamaño (max 25MB para mensajes de audio)
+        max_size = 25 * 1024 * 1024  # 25MB
+        staging_path = os.path.join(self.blob_path, f"upload_{uuid.uuid4().hex}")
+        _, content_hash = await self._stream_to_disk(
+            file, staging_path, max_size, "El archivo de audio es demasiado grande (máximo 25MB)"
+        )
+        
+        # Deduplicar: los audios idénticos comparten el mismo blob en disco. Toma un
+        # lock de hilo y hace E/S de disco: en el threadpool, fuera del event loop
+        await run_in_threadpool(self._store_blob, staging_path, content_hash, file_path)
+        await audio_file_index.add_async(unique_filename, file_path)
         
         # Retornar la ruta completa del archivo en el sistema de archivos
-        return file_path
+        return file_path, content_hash
+    
+    def get_blob_file_path(self, content_hash: str) -> str:
+        """Ruta del blob para un hash de contenido (repartido en subdirectorios por prefijo)"""
+        return os.path.join(self.blob_path, content_hash[:2], content_hash)
+    
+    def get_blob_ref_count(self, content_hash: str) -> int:
+        """Número de archivos de mensaje que referencian el blob"""
+        try:
+            # El propio blob cuenta como un enlace
+            return os.stat(self.get_blob_file_path(content_hash)).st_nlink - 1
+        except FileNotFoundError:
+            return 0
+    
+    def _store_blob(self, staging_path: str, content_hash: str, file_path: str):
+        """
+        Guarda el upload en el almacén de blobs (o reutiliza el blob si el contenido
+        ya existía) y crea la ruta del mensaje como hard link al blob.
+        """
+        blob_file = self.get_blob_file_path(content_hash)
+        os.makedirs(os.path.dirname(blob_file), exist_ok=True)
+        with _blob_lock(content_hash):
+            try:
+                if os.path.exists(blob_file):
+                    try:
+                        self._link_blob(blob_file, file_path)
+                        return
+                    except FileNotFoundError:
+                        # Otro proceso liberó el blob entre la comprobación y el enlace:
+                        # volver a crearlo con este upload
+                        pass
+                os.replace(staging_path, blob_file)
+                self._link_blob(blob_file, file_path)
+            finally:
+                if os.path.exists(staging_path):
+                    os.remove(staging_path)
     
-    def delete_audio_file(self, file_path: str) -> bool:
-        """Elimina un archivo de audio dado su ruta completa"""
+    def _link_blob(self, blob_file: str, file_path: str):
+        """Crea la ruta del mensaje como hard link al blob (el contador de enlaces hace de refcount)"""
+        try:
+            os.link(blob_file, file_path)
+        except FileNotFoundError:
+            raise
+        except OSError:
+            # Sistemas de archivos sin hard links: copia independiente, sin deduplicar
+            shutil.copyfile(blob_file, file_path)
+    
+    async def _stream_to_disk(self, file: UploadFile, file_path: str, max_size: int, too_large_detail: str) -> Tuple[int, str]:
+        """
+        Copia el upload a disco por bloques, abortando en cuanto supera max_size.
+        Retorna el tamaño en bytes y el hash SHA-256 del contenido.
+        """
+        hasher = hashlib.sha256()
+        size = 0
+        # Escribir a un archivo temporal para no dejar archivos a medias en la ruta final
+        tmp_path = f"{file_path}.part"
+        try:
+            async with aiofiles.open(tmp_path, 'wb') as f:
+                while True:
+                    chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_size:
+                        raise HTTPException(status_code=413, detail=too_large_detail)
+                    hasher.update(chunk)
+                    await f.write(chunk)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return size, hasher.hexdigest()
+    
+    def delete_audio_file(self, file_path: str, content_hash: Optional[str] = None) -> bool:
+        """
+        Elimina un archivo de audio dado su ruta completa. Si el archivo es una
+        referencia a un blob deduplicado, el blob solo se borra al eliminar la última referencia.
+        """
         try:
             if os.path.exists(file_path):
+                if content_hash is None and os.stat(file_path).st_nlink > 1:
+                    content_hash = self._hash_file(file_path)
                 os.remove(file_path)
+                if os.path.abspath(file_path).startswith(os.path.abspath(self.message_audio_path) + os.sep):
+                    audio_file_index.remove(os.path.basename(file_path))
+                if content_hash:
+                    self._release_blob(content_hash)
                 return True
         except Exception:
             pass
         return False
     
+    def _release_blob(self, content_hash: str):
+        """Borra el blob si ya no queda ningún mensaje que lo referencie"""
+        blob_file = self.get_blob_file_path(content_hash)
+        with _blob_lock(content_hash):
+            try:
+                if os.stat(blob_file).st_nlink <= 1:
+                    os.remove(blob_file)
+            except FileNotFoundError:
+                pass
+    
+    def _hash_file(self, file_path: str) -> str:
+        hasher = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+    
     def get_file_url(self, file_path: str) -> str:
         """Convierte la ruta del archivo a URL para el API"""
         # Extraer el nombre del archivo y determinar el tipo
@@ -115,6 +355,14 @@ class FileStorageService:
             # Fallback al formato anterior
             return f"/api/v1/audio/message/{filename}"  
     
+    def find_message_audio_file(self, filename: str) -> Optional[str]:
+        """Busca la ruta de un audio de mensaje por su nombre (en tiempo constante)"""
+        return audio_file_index.get(filename)
+    
+    async def find_message_audio_file_async(self, filename: str) -> Optional[str]:
+        """Igual que find_message_audio_file, sin bloquear el event loop"""
+        return await audio_file_index.get_async(filename)
+    
     def get_full_path_from_url(self, audio_url: str) -> str:
         """Convierte una URL de audio de vuelta a la ruta completa del archivo"""
         # Extraer el nombre del archivo
@@ -149,10 +397,10 @@ class FileStorageService:
             # Si no encontramos el ID de conversación, usar el comportamiento anterior
             return os.path.join(self.message_audio_path, filename)
         elif "/message/" in audio_url:
-            # Para mensajes sin subdirectorio específico, buscar en todos los subdirectorios
-            for root, dirs, files in os.walk(self.message_audio_path):
-                if filename in files:
-                    return os.path.join(root, filename)
+            # Para mensajes sin subdirectorio específico, resolver con el índice de archivos
+            file_path = self.find_message_audio_file(filename)
+            if file_path:
+                return file_path
             return os.path.join(self.message_audio_path, filename)
         elif "/user/" in audio_url:
             # Para usuarios, buscar en el directorio de usuarios
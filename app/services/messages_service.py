@@ -1,16 +1,21 @@
 import os
 import uuid
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status, UploadFile
-from typing import Optional
+from typing import List, Optional
+from app.core.membership_cache import membership_cache
 from app.crud import (
-    get_conversation, get_participant_by_user_and_conversation,
-    create_message, get_messages_by_conversation_id, 
-    get_message, delete_message, mark_messages_as_read
+    get_conversation,
+    get_messages_by_conversation_id, get_messages_page,
+    get_message, delete_message, mark_messages_as_read,
+    get_read_cursors, count_unread_messages
 )
+from app.crud import aio as crud_aio
+from app.crud.loaders import loader_options
 from app.models.message import ContentType
-from app.schemas import MessageCreate
-from app.services.translation_service import TranslationService
+from app.schemas import MessageCreate, MessageWithSender
+from app.services.translation_queue import translation_queue
 from app.services.file_storage import FileStorageService
 import logging
 
@@ -18,12 +23,10 @@ logger = logging.getLogger(__name__)
 
 class MessagesService:
     @staticmethod
-    async def create_new_message(db: Session, conversation_id: int, content_type: ContentType, content: Optional[str], audio_file: Optional[UploadFile], current_user_id: int):
-        conversation = get_conversation(db, conversation_id)
-        if not conversation:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
-        participant = get_participant_by_user_and_conversation(db, current_user_id, conversation_id)
-        if not participant:
+    async def create_new_message(db: AsyncSession, conversation_id: int, content_type: ContentType, content: Optional[str], audio_file: Optional[UploadFile], current_user_id: int):
+        if not await membership_cache.is_member_async(db, current_user_id, conversation_id):
+            if not await crud_aio.get_conversation(db, conversation_id):
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not a participant in this conversation")
         message_data = MessageCreate(conversation_id=conversation_id, content_type=content_type)
         if content_type == ContentType.TEXT:
@@ -36,53 +39,106 @@ class MessagesService:
             
             # Usar FileStorageService para guardar el archivo de audio
             file_service = FileStorageService()
-            file_path = await file_service.save_message_audio_file(audio_file, current_user_id, conversation_id)
+            file_path, media_hash = await file_service.save_message_audio_file(audio_file, current_user_id, conversation_id)
             
             # Generar URL para el archivo
             media_url = file_service.get_message_file_url(file_path)
             print(f"Audio file saved to {file_path} with URL {media_url}")
             message_data.media_url = media_url
-        message = create_message(db, message_data, current_user_id)
+            message_data.media_hash = media_hash
+        message = await crud_aio.create_message(db, message_data, current_user_id)
         
-        # Create translated message automatically for both text and audio messages
-        if content_type == ContentType.TEXT and content:
+        # Encolar la traducción; los workers la procesan en segundo plano y
+        # notifican con un evento "translation_ready" cuando está lista
+        if (content_type == ContentType.TEXT and content) or content_type == ContentType.AUDIO:
             try:
-                translated_message_id = await TranslationService.create_translated_message(db, message)
-                if translated_message_id:
-                    logger.info(f"Successfully created translated message {translated_message_id} for message {message.id}")
+                job_id = await translation_queue.enqueue(message.id)
+                logger.info(f"Enqueued translation job {job_id} for message {message.id}")
             except Exception as e:
-                logger.error(f"Failed to create translated message for message {message.id}: {e}")
-                # Don't fail the original message creation if translation fails
-        elif content_type == ContentType.AUDIO:
-            try:
-                translated_message_id = await TranslationService.create_translated_message(db, message)
-                if translated_message_id:
-                    logger.info(f"Successfully created translated audio message {translated_message_id} for message {message.id}")
-            except Exception as e:
-                logger.error(f"Failed to create translated audio message for message {message.id}: {e}")
+                logger.error(f"Failed to enqueue translation for message {message.id}: {e}")
                 # Don't fail the original message creation if translation fails
         
         return message
 
     @staticmethod
     def read_messages(db: Session, conversation_id: int, skip: int, limit: int, current_user_id: int):
-        conversation = get_conversation(db, conversation_id)
-        if not conversation:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
-        participant = get_participant_by_user_and_conversation(db, current_user_id, conversation_id)
-        if not participant:
+        if not membership_cache.is_member(db, current_user_id, conversation_id):
+            if not get_conversation(db, conversation_id):
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not a participant in this conversation")
-        messages = get_messages_by_conversation_id(db, conversation_id, skip, limit)
-        mark_messages_as_read(db, conversation_id, current_user_id)
-        return messages
+        # Avanzar el cursor antes de leer: el commit no expira los mensajes cargados
+        read_cursor = mark_messages_as_read(db, conversation_id, current_user_id)
+        messages = get_messages_by_conversation_id(
+            db, conversation_id, skip, limit, options=loader_options(MessageWithSender)
+        )
+        return MessagesService._with_read_state(db, messages, conversation_id, current_user_id), read_cursor
+
+    @staticmethod
+    def read_messages_page(db: Session, conversation_id: int, limit: int, before: Optional[str], after: Optional[str], current_user_id: int):
+        if not membership_cache.is_member(db, current_user_id, conversation_id):
+            if not get_conversation(db, conversation_id):
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not a participant in this conversation")
+        if before and after:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Use either 'before' or 'after', not both")
+        read_cursor = mark_messages_as_read(db, conversation_id, current_user_id)
+        try:
+            messages = get_messages_page(
+                db, conversation_id, limit, before=before, after=after,
+                options=loader_options(MessageWithSender)
+            )
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        return MessagesService._with_read_state(db, messages, conversation_id, current_user_id), read_cursor
+
+    @staticmethod
+    def mark_as_read(db: Session, conversation_id: int, message_id: Optional[int], current_user_id: int):
+        if not membership_cache.is_member(db, current_user_id, conversation_id):
+            if not get_conversation(db, conversation_id):
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not a participant in this conversation")
+        if message_id is not None:
+            message = get_message(db, message_id)
+            if not message or message.conversation_id != conversation_id:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
+        read_cursor = mark_messages_as_read(db, conversation_id, current_user_id, up_to_message_id=message_id)
+        return read_cursor
+
+    @staticmethod
+    def get_unread_count(db: Session, conversation_id: int, current_user_id: int) -> int:
+        if not membership_cache.is_member(db, current_user_id, conversation_id):
+            if not get_conversation(db, conversation_id):
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not a participant in this conversation")
+        return count_unread_messages(db, conversation_id, current_user_id)
+
+    @staticmethod
+    def _with_read_state(db: Session, messages: list, conversation_id: int, current_user_id: int) -> List[MessageWithSender]:
+        """
+        Calcular is_read desde los cursores de lectura: un mensaje recibido está leído
+        si el cursor del usuario lo alcanza; uno enviado, si lo alcanzan los cursores
+        de todos los demás participantes
+        """
+        cursors = get_read_cursors(db, conversation_id)
+        own_cursor = cursors.get(current_user_id) or 0
+        other_cursors = [cursor or 0 for user_id, cursor in cursors.items() if user_id != current_user_id]
+        others_cursor = min(other_cursors) if other_cursors else 0
+        result = []
+        for message in messages:
+            item = MessageWithSender.from_orm(message)
+            if message.sender_id == current_user_id:
+                item.is_read = others_cursor >= message.id
+            else:
+                item.is_read = own_cursor >= message.id
+            result.append(item)
+        return result
 
     @staticmethod
     def delete_message(db: Session, message_id: int, current_user_id: int):
         message = get_message(db, message_id)
         if not message:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
-        participant = get_participant_by_user_and_conversation(db, current_user_id, message.conversation_id)
-        if not participant:
+        if not membership_cache.is_member(db, current_user_id, message.conversation_id):
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not a participant in this conversation")
         if message.sender_id != current_user_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You can only delete your own messages")
@@ -92,6 +148,6 @@ class MessagesService:
             file_service = FileStorageService()
             # Convertir la URL del audio a la ruta completa del archivo
             file_path = file_service.get_full_path_from_url(message.media_url)
-            file_service.delete_audio_file(file_path)
+            file_service.delete_audio_file(file_path, content_hash=message.media_hash)
             
         delete_message(db, message_id)
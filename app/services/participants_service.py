@@ -1,12 +1,15 @@
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from typing import List
 from app.crud import (
     get_conversation, get_participant_by_user_and_conversation,
-    create_participant, delete_participant, get_participants_by_conversation_id,
+    create_participant_if_absent, delete_participant, get_participants_by_conversation_id,
     get_user, get_participant
 )
-from app.schemas import ParticipantCreate
+from app.schemas import ParticipantCreate, ParticipantWithUser
+from app.crud.loaders import loader_options
+from app.core.membership_cache import membership_cache
 
 class ParticipantsService:
     @staticmethod
@@ -14,27 +17,31 @@ class ParticipantsService:
         conversation = get_conversation(db, participant_data.conversation_id)
         if not conversation:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
-        current_participant = get_participant_by_user_and_conversation(db, current_user_id, participant_data.conversation_id)
-        if not current_participant and current_user_id != participant_data.user_id:
+        is_member = membership_cache.is_member(db, current_user_id, participant_data.conversation_id)
+        if not is_member and current_user_id != participant_data.user_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not a participant in this conversation")
         user_to_add = get_user(db, participant_data.user_id)
         if not user_to_add:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User with ID {participant_data.user_id} not found")
-        existing_participant = get_participant_by_user_and_conversation(db, participant_data.user_id, participant_data.conversation_id)
-        if existing_participant:
+        # Insert-on-conflict: el índice único resuelve las altas concurrentes
+        try:
+            new_participant = create_participant_if_absent(db, participant_data)
+        except IntegrityError:
+            # La conversación o el usuario se borraron después de comprobarlos
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation or user not found")
+        if new_participant is None:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User is already a participant in this conversation")
-        new_participant = create_participant(db, participant_data)
         return new_participant, user_to_add
 
     @staticmethod
     def get_participants(db: Session, conversation_id: int, current_user_id: int):
-        conversation = get_conversation(db, conversation_id)
-        if not conversation:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
-        participant = get_participant_by_user_and_conversation(db, current_user_id, conversation_id)
-        if not participant:
+        if not membership_cache.is_member(db, current_user_id, conversation_id):
+            if not get_conversation(db, conversation_id):
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not a participant in this conversation")
-        participants = get_participants_by_conversation_id(db, conversation_id)
+        participants = get_participants_by_conversation_id(
+            db, conversation_id, options=loader_options(ParticipantWithUser)
+        )
         return participants
 
     @staticmethod
@@ -55,7 +62,6 @@ class ParticipantsService:
     def user_has_access_to_conversation(db: Session, user_id: int, conversation_id: int) -> bool:
         """Check if user has access to a conversation"""
         try:
-            participant = get_participant_by_user_and_conversation(db, user_id, conversation_id)
-            return participant is not None
+            return membership_cache.is_member(db, user_id, conversation_id)
         except Exception:
             return False
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (textos, idioma origen, idioma destino) -> traducciones en el mismo orden
+BatchSender = Callable[[List[str], str, str], Awaitable[List[Optional[str]]]]
+
+
+class _PendingBatch:
+    def __init__(self):
+        self.items: List[Tuple[str, asyncio.Future]] = []
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+
+
+class TranslationBatcher:
+    """Agrupa las llamadas concurrentes a translate_text del mismo par de idiomas.
+
+    Cada petición espera como máximo max_wait_ms; el lote se envía antes si llega a
+    max_batch_size. Los resultados se reparten a cada llamador en orden.
+    """
+
+    def __init__(self, send_batch: BatchSender, max_batch_size: int = 32, max_wait_ms: float = 10.0):
+        self.send_batch = send_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending: Dict[Tuple[str, str], _PendingBatch] = {}
+        # Referencias a los envíos en curso: el loop solo guarda referencias débiles
+        self._sending: Set[asyncio.Task] = set()
+        self.batches_sent = 0
+        self.items_sent = 0
+
+    async def translate(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        loop = asyncio.get_event_loop()
+        pair = (source_lang, target_lang)
+        batch = self._pending.get(pair)
+        if batch is None:
+            batch = _PendingBatch()
+            self._pending[pair] = batch
+            batch.flush_handle = loop.call_later(self.max_wait, self._flush, pair)
+
+        future = loop.create_future()
+        batch.items.append((text, future))
+        if len(batch.items) >= self.max_batch_size:
+            self._flush(pair)
+
+        return await future
+
+    def _flush(self, pair: Tuple[str, str]):
+        batch = self._pending.pop(pair, None)
+        if batch is None:
+            return
+        if batch.flush_handle is not None:
+            batch.flush_handle.cancel()
+        task = asyncio.ensure_future(self._send(pair, batch.items))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, pair: Tuple[str, str], items: List[Tuple[str, asyncio.Future]]):
+        source_lang, target_lang = pair
+        # Textos repetidos dentro del mismo lote se envían una sola vez
+        unique_texts = list(dict.fromkeys(text for text, _ in items))
+        self.batches_sent += 1
+        self.items_sent += len(unique_texts)
+        try:
+            translations = await self.send_batch(unique_texts, source_lang, target_lang)
+            if len(translations) != len(unique_texts):
+                raise ValueError(
+                    f"Batch translation returned {len(translations)} results for {len(unique_texts)} texts"
+                )
+            results = dict(zip(unique_texts, translations))
+        except Exception as e:
+            logger.error(f"Batch translation of {len(unique_texts)} texts failed: {e}")
+            results = {}
+
+        for text, future in items:
+            if not future.done():
+                future.set_result(results.get(text))
+
+    def stats(self) -> dict:
+        return {
+            "batches_sent": self.batches_sent,
+            "items_sent": self.items_sent,
+            "pending_pairs": len(self._pending),
+        }
@@ -0,0 +1,208 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models.translation_cache import TranslationCacheEntry
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str, str]
+
+
+def make_cache_key(text: str, source_lang: str, target_lang: str) -> CacheKey:
+    """Normalizar la clave de caché (texto, idioma origen, idioma destino)"""
+    return (text.strip(), source_lang.lower(), target_lang.lower())
+
+
+def hash_cache_key(key: CacheKey) -> str:
+    return hashlib.sha256("\x1f".join(key).encode("utf-8")).hexdigest()
+
+
+class LRUTTLCache:
+    """Caché LRU en proceso con expiración por TTL y límite de tamaño"""
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 86400):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[CacheKey, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: CacheKey, value: str):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DatabaseTranslationCacheTier:
+    """Segundo nivel compartido entre procesos, en la tabla translation_cache"""
+
+    def __init__(self, ttl_seconds: float = 86400):
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        db = SessionLocal()
+        try:
+            entry = (
+                db.query(TranslationCacheEntry)
+                .filter(TranslationCacheEntry.cache_key == hash_cache_key(key))
+                .first()
+            )
+            if entry is None or (
+                entry.created_at and entry.created_at < datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+            ):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry.translated_text
+        finally:
+            db.close()
+
+    def set(self, key: CacheKey, value: str):
+        db = SessionLocal()
+        try:
+            text, source_lang, target_lang = key
+            cache_key = hash_cache_key(key)
+            # Reemplazar entradas caducadas con el mismo hash
+            db.query(TranslationCacheEntry).filter(TranslationCacheEntry.cache_key == cache_key).delete()
+            db.add(TranslationCacheEntry(
+                cache_key=cache_key,
+                source_lang=source_lang,
+                target_lang=target_lang,
+                source_text=text,
+                translated_text=value,
+                created_at=datetime.utcnow()
+            ))
+            db.commit()
+        except IntegrityError:
+            # Otro proceso la insertó al mismo tiempo
+            db.rollback()
+        finally:
+            db.close()
+
+
+class TranslationCache:
+    """Caché de traducciones de dos niveles: LRU en memoria + tabla compartida opcional.
+
+    Las peticiones concurrentes con la misma clave comparten una única llamada al
+    backend, así que una frase repetida nunca llega dos veces al servicio de traducción.
+    """
+
+    def __init__(self, local: LRUTTLCache, shared: Optional[DatabaseTranslationCacheTier] = None):
+        self.local = local
+        self.shared = shared
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+        self.backend_calls = 0
+
+    async def get_or_translate(
+        self,
+        text: str,
+        source_lang: str,
+        target_lang: str,
+        translate: Callable[[], Awaitable[Optional[str]]]
+    ) -> Optional[str]:
+        key = make_cache_key(text, source_lang, target_lang)
+
+        cached = self.local.get(key)
+        if cached is not None:
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            # La llamada al backend corre en su propia tarea: si el primer llamador se
+            # cancela, los demás que esperan la misma clave siguen recibiendo el resultado
+            task = asyncio.ensure_future(self._produce(key, translate))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    async def _produce(self, key: CacheKey, translate: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        result = None
+        if self.shared is not None:
+            try:
+                result = await run_in_threadpool(self.shared.get, key)
+            except Exception as e:
+                logger.error(f"Shared translation cache lookup failed: {e}")
+        if result is None:
+            self.backend_calls += 1
+            result = await translate()
+            # No se guardan los fallos (None) para poder reintentar
+            if result is not None and self.shared is not None:
+                try:
+                    await run_in_threadpool(self.shared.set, key, result)
+                except Exception as e:
+                    logger.error(f"Shared translation cache store failed: {e}")
+        if result is not None:
+            self.local.set(key, result)
+        return result
+
+    def _finish(self, key: CacheKey, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Evitar el aviso de "exception never retrieved" si todos los llamadores se cancelaron
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        stats = {
+            "size": len(self.local),
+            "max_size": self.local.max_size,
+            "hits": self.local.hits,
+            "misses": self.local.misses,
+            "evictions": self.local.evictions,
+            "backend_calls": self.backend_calls,
+        }
+        if self.shared is not None:
+            stats["shared_hits"] = self.shared.hits
+            stats["shared_misses"] = self.shared.misses
+        return stats
+
+
+# Global instance
+translation_cache = TranslationCache(
+    local=LRUTTLCache(
+        max_size=settings.TRANSLATION_CACHE_MAX_SIZE,
+        ttl_seconds=settings.TRANSLATION_CACHE_TTL
+    ),
+    shared=DatabaseTranslationCacheTier(ttl_seconds=settings.TRANSLATION_CACHE_TTL)
+    if settings.TRANSLATION_CACHE_SHARED else None
+)
@@ -0,0 +1,434 @@
+import abc
+import asyncio
+import itertools
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+
+from app.core.config import settings
+from app.crud.translated_message import translated_message_crud
+from app.db.database import SessionLocal
+from app.models.message import Message
+from app.models.translation_job import TranslationJob
+from app.services.translation_service import TranslationService
+from app.websockets.manager import manager
+from app.websockets.events import translation_ready_event
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus:
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class ClaimedJob(NamedTuple):
+    id: int
+    message_id: int
+    attempts: int
+
+
+class TranslationJobStore(abc.ABC):
+    """Interfaz del almacenamiento de trabajos de traducción.
+
+    Los métodos son síncronos; el pool de workers los ejecuta en el threadpool
+    para no bloquear el event loop.
+    """
+
+    @abc.abstractmethod
+    def enqueue(self, message_id: int) -> int:
+        """Crea el trabajo del mensaje si no existe y retorna su id"""
+
+    @abc.abstractmethod
+    def claim(self, lease_seconds: int) -> Optional[ClaimedJob]:
+        """Toma el siguiente trabajo disponible y lo marca como 'running'"""
+
+    @abc.abstractmethod
+    def mark_done(self, job_id: int) -> None:
+        pass
+
+    @abc.abstractmethod
+    def mark_retry(self, job_id: int, error: str, delay_seconds: float) -> None:
+        pass
+
+    @abc.abstractmethod
+    def mark_failed(self, job_id: int, error: str) -> None:
+        pass
+
+    @abc.abstractmethod
+    def get_status(self, message_id: int) -> Optional[dict]:
+        pass
+
+
+class InMemoryTranslationJobStore(TranslationJobStore):
+    """Cola en proceso; el estado se pierde al reiniciar (útil para tests y desarrollo)"""
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self._jobs: Dict[int, dict] = {}
+        self._by_message: Dict[int, int] = {}
+        # Los workers llaman a la store desde el threadpool
+        self._lock = threading.Lock()
+
+    def enqueue(self, message_id: int) -> int:
+        with self._lock:
+            return self._enqueue(message_id)
+
+    def _enqueue(self, message_id: int) -> int:
+        if message_id in self._by_message:
+            return self._by_message[message_id]
+        job_id = next(self._ids)
+        self._jobs[job_id] = {
+            "id": job_id,
+            "message_id": message_id,
+            "status": JobStatus.PENDING,
+            "attempts": 0,
+            "last_error": None,
+            "available_at": datetime.utcnow(),
+            "locked_until": None,
+        }
+        self._by_message[message_id] = job_id
+        return job_id
+
+    def claim(self, lease_seconds: int) -> Optional[ClaimedJob]:
+        with self._lock:
+            return self._claim(lease_seconds)
+
+    def _claim(self, lease_seconds: int) -> Optional[ClaimedJob]:
+        now = datetime.utcnow()
+        candidates = [
+            job for job in self._jobs.values()
+            if (job["status"] == JobStatus.PENDING and job["available_at"] <= now)
+            or (job["status"] == JobStatus.RUNNING and job["locked_until"] < now)
+        ]
+        if not candidates:
+            return None
+        job = min(candidates, key=lambda j: (j["available_at"], j["id"]))
+        job["status"] = JobStatus.RUNNING
+        job["attempts"] += 1
+        job["locked_until"] = now + timedelta(seconds=lease_seconds)
+        return ClaimedJob(job["id"], job["message_id"], job["attempts"])
+
+    def mark_done(self, job_id: int) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job["status"] = JobStatus.DONE
+            job["locked_until"] = None
+
+    def mark_retry(self, job_id: int, error: str, delay_seconds: float) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job["status"] = JobStatus.PENDING
+            job["last_error"] = error
+            job["available_at"] = datetime.utcnow() + timedelta(seconds=delay_seconds)
+            job["locked_until"] = None
+
+    def mark_failed(self, job_id: int, error: str) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job["status"] = JobStatus.FAILED
+            job["last_error"] = error
+            job["locked_until"] = None
+
+    def get_status(self, message_id: int) -> Optional[dict]:
+        with self._lock:
+            job_id = self._by_message.get(message_id)
+            if job_id is None:
+                return None
+            job = self._jobs[job_id]
+            return {
+                "message_id": message_id,
+                "status": job["status"],
+                "attempts": job["attempts"],
+                "last_error": job["last_error"],
+            }
+
+
+class DatabaseTranslationJobStore(TranslationJobStore):
+    """Cola persistente en la tabla translation_jobs; sobrevive a reinicios.
+
+    Los trabajos que quedaron en 'running' cuando el proceso murió se vuelven a
+    tomar cuando expira su lease (locked_until).
+    """
+
+    def enqueue(self, message_id: int) -> int:
+        """Insertar el trabajo salvo que ya exista uno para el mensaje.
+
+        Se apoya en el índice único de message_id en lugar de consultar antes de
+        insertar, así dos encolados concurrentes no chocan.
+        """
+        values = dict(
+            message_id=message_id,
+            status=JobStatus.PENDING,
+            attempts=0,
+            available_at=datetime.utcnow()
+        )
+        db = SessionLocal()
+        try:
+            if db.bind.dialect.name == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+
+                stmt = (
+                    insert(TranslationJob)
+                    .values(**values)
+                    .on_conflict_do_nothing(index_elements=["message_id"])
+                    .returning(TranslationJob.id)
+                )
+                job_id = db.execute(stmt).scalar()
+                db.commit()
+            else:
+                job = TranslationJob(**values)
+                db.add(job)
+                try:
+                    db.commit()
+                    job_id = job.id
+                except IntegrityError:
+                    db.rollback()
+                    job_id = None
+            if job_id is None:
+                job_id = db.query(TranslationJob.id).filter(TranslationJob.message_id == message_id).scalar()
+            return job_id
+        finally:
+            db.close()
+
+    def claim(self, lease_seconds: int) -> Optional[ClaimedJob]:
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            job = (
+                db.query(TranslationJob)
+                .filter(
+                    or_(
+                        and_(TranslationJob.status == JobStatus.PENDING, TranslationJob.available_at <= now),
+                        and_(TranslationJob.status == JobStatus.RUNNING, TranslationJob.locked_until < now)
+                    )
+                )
+                .order_by(TranslationJob.available_at, TranslationJob.id)
+                .with_for_update(skip_locked=True)
+                .first()
+            )
+            if not job:
+                db.rollback()
+                return None
+            job.status = JobStatus.RUNNING
+            job.attempts += 1
+            job.locked_until = now + timedelta(seconds=lease_seconds)
+            db.commit()
+            return ClaimedJob(job.id, job.message_id, job.attempts)
+        finally:
+            db.close()
+
+    def _update(self, job_id: int, **fields) -> None:
+        db = SessionLocal()
+        try:
+            db.query(TranslationJob).filter(TranslationJob.id == job_id).update(fields)
+            db.commit()
+        finally:
+            db.close()
+
+    def mark_done(self, job_id: int) -> None:
+        self._update(job_id, status=JobStatus.DONE, locked_until=None)
+
+    def mark_retry(self, job_id: int, error: str, delay_seconds: float) -> None:
+        self._update(
+            job_id,
+            status=JobStatus.PENDING,
+            last_error=error,
+            available_at=datetime.utcnow() + timedelta(seconds=delay_seconds),
+            locked_until=None
+        )
+
+    def mark_failed(self, job_id: int, error: str) -> None:
+        self._update(job_id, status=JobStatus.FAILED, last_error=error, locked_until=None)
+
+    def get_status(self, message_id: int) -> Optional[dict]:
+        db = SessionLocal()
+        try:
+            job = db.query(TranslationJob).filter(TranslationJob.message_id == message_id).first()
+            if not job:
+                return None
+            return {
+                "message_id": message_id,
+                "status": job.status,
+                "attempts": job.attempts,
+                "last_error": job.last_error,
+            }
+        finally:
+            db.close()
+
+
+class TranslationQueue:
+    """Pool de workers asíncronos que procesa los trabajos de traducción.
+
+    La concurrencia está acotada por el número de workers. Los fallos se
+    reintentan con backoff exponencial hasta max_attempts.
+    """
+
+    def __init__(
+        self,
+        store: TranslationJobStore,
+        workers: int = 4,
+        max_attempts: int = 5,
+        retry_base_delay: float = 2.0,
+        retry_max_delay: float = 300.0,
+        lease_seconds: int = 600,
+        poll_interval: float = 5.0
+    ):
+        self.store = store
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    async def start(self):
+        """Arrancar los workers (se llama en el startup de la aplicación)"""
+        if self._tasks:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+        logger.info(f"Translation queue started with {self.workers} workers")
+
+    async def stop(self):
+        """Detener los workers; los trabajos en curso se liberan para que otro worker los retome"""
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Translation queue stopped")
+
+    async def enqueue(self, message_id: int) -> int:
+        """Encolar la traducción de un mensaje y despertar a los workers"""
+        job_id = await run_in_threadpool(self.store.enqueue, message_id)
+        if self._wakeup:
+            self._wakeup.set()
+        return job_id
+
+    async def get_status(self, message_id: int) -> Optional[dict]:
+        return await run_in_threadpool(self.store.get_status, message_id)
+
+    def _retry_delay(self, attempts: int) -> float:
+        return min(self.retry_base_delay * (2 ** (attempts - 1)), self.retry_max_delay)
+
+    async def _worker(self, worker_id: int):
+        while not self._stopping:
+            try:
+                job = await run_in_threadpool(self.store.claim, self.lease_seconds)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Translation worker {worker_id} could not claim a job: {e}")
+                job = None
+
+            if job is None:
+                # Esperar a un nuevo trabajo o al siguiente sondeo (reintentos diferidos, otros procesos)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                    # Limpiar solo después de despertar: un enqueue durante el claim
+                    # deja el evento activo y la siguiente espera vuelve enseguida
+                    self._wakeup.clear()
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run_job(job)
+
+    async def _run_job(self, job: ClaimedJob):
+        try:
+            await self._process(job)
+        except asyncio.CancelledError:
+            # Apagado a mitad del trabajo: liberarlo ya en lugar de esperar al lease
+            try:
+                await asyncio.shield(run_in_threadpool(self.store.mark_retry, job.id, "Worker stopped", 0))
+            except Exception as e:
+                logger.error(f"Could not release translation job {job.id}: {e}")
+            raise
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            if job.attempts >= self.max_attempts:
+                logger.error(f"Translation job {job.id} for message {job.message_id} failed permanently: {error}")
+                await run_in_threadpool(self.store.mark_failed, job.id, error)
+            else:
+                delay = self._retry_delay(job.attempts)
+                logger.warning(
+                    f"Translation job {job.id} for message {job.message_id} failed "
+                    f"(attempt {job.attempts}/{self.max_attempts}), retrying in {delay:.0f}s: {error}"
+                )
+                await run_in_threadpool(self.store.mark_retry, job.id, error, delay)
+            return
+
+        await run_in_threadpool(self.store.mark_done, job.id)
+
+    async def _process(self, job: ClaimedJob):
+        # La Session síncrona solo se usa desde el threadpool: el worker comparte
+        # el event loop con las peticiones y los websockets
+        db = SessionLocal()
+        try:
+            message, translated_message = await run_in_threadpool(_load_job_message, db, job.message_id)
+            if not message:
+                logger.info(f"Message {job.message_id} no longer exists, dropping translation job {job.id}")
+                return
+
+            if not translated_message:
+                translated_message_id = await TranslationService.create_translated_message(db, message)
+                if not translated_message_id:
+                    # Nada que traducir (mismo idioma, sin idioma destino, etc.)
+                    return
+                translated_message = await run_in_threadpool(translated_message_crud.get_by_id, db, translated_message_id)
+
+            await manager.send_to_conversation(
+                translation_ready_event(translated_message, message.conversation_id),
+                str(message.conversation_id)
+            )
+        finally:
+            await run_in_threadpool(db.close)
+
+
+def _load_job_message(db, message_id: int):
+    """Mensaje del trabajo (con su remitente) y su traducción si ya existe.
+
+    El mensaje se desconecta de la sesión para que los commits posteriores no lo
+    expiren y leerlo en el event loop no lance consultas.
+    """
+    message = db.query(Message).options(joinedload(Message.sender)).filter(Message.id == message_id).first()
+    if not message:
+        return None, None
+    translated_message = translated_message_crud.get_by_original_message_id(db, message.id)
+    if message.sender is not None:
+        db.expunge(message.sender)
+    db.expunge(message)
+    return message, translated_message
+
+
+def _build_store() -> TranslationJobStore:
+    if settings.TRANSLATION_QUEUE_BACKEND == "memory":
+        return InMemoryTranslationJobStore()
+    return DatabaseTranslationJobStore()
+
+
+# Global instance
+translation_queue = TranslationQueue(
+    store=_build_store(),
+    workers=settings.TRANSLATION_WORKERS,
+    max_attempts=settings.TRANSLATION_MAX_ATTEMPTS,
+    retry_base_delay=settings.TRANSLATION_RETRY_BASE_DELAY,
+    retry_max_delay=settings.TRANSLATION_RETRY_MAX_DELAY,
+    lease_seconds=settings.TRANSLATION_JOB_LEASE_SECONDS,
+    poll_interval=settings.TRANSLATION_QUEUE_POLL_INTERVAL
+)
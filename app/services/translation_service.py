@@ -1,4 +1,5 @@
 import httpx
+from fastapi.concurrency import run_in_threadpool
 import os
 import aiofiles
 from sqlalchemy.orm import Session
@@ -6,20 +7,116 @@ from app.models.message import Message, ContentType
 from app.models.participant import Participant
 from app.models.user import User
 from app.crud.translated_message import translated_message_crud
-from app.schemas.translated_message import TranslatedMessageCreate, TranslateRequest
+from app.schemas.translated_message import (
+    TranslatedMessageCreate, TranslateRequest, TranslateBatchRequest, TranslateBatchResponse
+)
 from app.services.file_storage import FileStorageService
-from typing import Optional
+from app.services.translation_cache import translation_cache
+from app.services.translation_batcher import TranslationBatcher
+from app.core.config import settings
+from typing import List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class TranslationFailedError(Exception):
+    """La API de traducción no devolvió resultado; el intento puede reintentarse"""
+    pass
+
+
 class TranslationService:
-    TRANSLATION_API_URL = "http://127.0.0.1:8000/translate/"
-    AUDIO_TRANSLATION_API_URL = "http://localhost:8000/translate-audio/"
+    TRANSLATION_API_URL = settings.TRANSLATION_API_URL
+    AUDIO_TRANSLATION_API_URL = settings.AUDIO_TRANSLATION_API_URL
+    
+    # Cliente HTTP compartido (pool de conexiones con keep-alive), creado en el
+    # startup de la aplicación y cerrado en el shutdown
+    _http_client: Optional[httpx.AsyncClient] = None
+    
+    @classmethod
+    async def start_http_client(cls) -> httpx.AsyncClient:
+        """Create the shared HTTP client used for the translation backends"""
+        if cls._http_client is None or cls._http_client.is_closed:
+            cls._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.TRANSLATION_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.TRANSLATION_HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=settings.TRANSLATION_HTTP_KEEPALIVE_EXPIRY
+                ),
+                timeout=httpx.Timeout(settings.TRANSLATION_TIMEOUT, connect=settings.TRANSLATION_CONNECT_TIMEOUT)
+            )
+        return cls._http_client
+    
+    @classmethod
+    async def close_http_client(cls):
+        """Close the shared HTTP client and its pooled connections"""
+        if cls._http_client is not None:
+            await cls._http_client.aclose()
+            cls._http_client = None
+    
+    # Etapa de micro-batching; None si no hay TRANSLATION_BATCH_API_URL configurada
+    _batcher: Optional[TranslationBatcher] = None
+    
+    @classmethod
+    def get_batcher(cls) -> Optional[TranslationBatcher]:
+        """Return the batching stage, creating it from settings on first use"""
+        if cls._batcher is None and settings.TRANSLATION_BATCH_API_URL:
+            cls._batcher = TranslationBatcher(
+                send_batch=cls._send_translation_batch,
+                max_batch_size=settings.TRANSLATION_BATCH_MAX_SIZE,
+                max_wait_ms=settings.TRANSLATION_BATCH_MAX_WAIT_MS
+            )
+        return cls._batcher
+    
+    @classmethod
+    def configure_batcher(cls, batcher: Optional[TranslationBatcher]):
+        """Replace the batching stage (e.g. with a local stand-in batch API in tests)"""
+        cls._batcher = batcher
+    
+    @classmethod
+    async def get_http_client(cls) -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating it lazily outside the app lifespan"""
+        if cls._http_client is None or cls._http_client.is_closed:
+            return await cls.start_http_client()
+        return cls._http_client
     
     @staticmethod
     async def translate_text(text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        """Translate text, going through the translation cache when enabled"""
+        if not settings.TRANSLATION_CACHE_ENABLED:
+            return await TranslationService._call_translation_api(text, source_lang, target_lang)
+        return await translation_cache.get_or_translate(
+            text, source_lang, target_lang,
+            lambda: TranslationService._call_translation_api(text, source_lang, target_lang)
+        )
+    
+    @staticmethod
+    async def _call_translation_api(text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        """Call the translation API, batching concurrent requests when enabled"""
+        batcher = TranslationService.get_batcher()
+        if batcher is not None:
+            return await batcher.translate(text, source_lang, target_lang)
+        return await TranslationService._post_translation(text, source_lang, target_lang)
+    
+    @staticmethod
+    async def _send_translation_batch(texts: List[str], source_lang: str, target_lang: str) -> List[Optional[str]]:
+        """Send a batch of texts to the batch translation endpoint in a single request"""
+        batch_request = TranslateBatchRequest(
+            texts=texts,
+            source_lang=source_lang,
+            target_lang=target_lang
+        )
+        client = await TranslationService.get_http_client()
+        response = await client.post(
+            settings.TRANSLATION_BATCH_API_URL,
+            json=batch_request.dict(),
+            timeout=httpx.Timeout(settings.TRANSLATION_TIMEOUT, connect=settings.TRANSLATION_CONNECT_TIMEOUT)
+        )
+        response.raise_for_status()
+        return TranslateBatchResponse(**response.json()).translated_texts
+    
+    @staticmethod
+    async def _post_translation(text: str, source_lang: str, target_lang: str) -> Optional[str]:
         """Call the translation API"""
         translate_request = TranslateRequest(
             text=text,
@@ -28,17 +125,17 @@ class TranslationService:
         )
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    TranslationService.TRANSLATION_API_URL,
-                    json=translate_request.dict(),
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                
-                result = response.json()
-                return result.get("translated_text")
-                
+            client = await TranslationService.get_http_client()
+            response = await client.post(
+                TranslationService.TRANSLATION_API_URL,
+                json=translate_request.dict(),
+                timeout=httpx.Timeout(settings.TRANSLATION_TIMEOUT, connect=settings.TRANSLATION_CONNECT_TIMEOUT)
+            )
+            response.raise_for_status()
+            
+            result = response.json()
+            return result.get("translated_text")
+            
         except httpx.RequestError as e:
             logger.error(f"Translation API request failed: {e}")
             return None
@@ -53,29 +150,30 @@ class TranslationService:
     async def translate_audio(audio_file_path: str, source_lang: str, target_lang: str, voice_reference_path: str, model: str = "F5TTS_v1_Base") -> Optional[bytes]:
         """Call the audio translation API"""
         try:
-            async with httpx.AsyncClient() as client:
-                # Preparar los archivos para multipart/form-data
-                with open(audio_file_path, 'rb') as audio_file, open(voice_reference_path, 'rb') as voice_file:
-                    files = {
-                        'audio_file': ('audio.wav', audio_file, 'audio/wav'),
-                        'voice_reference_file': ('voice_ref.wav', voice_file, 'audio/wav')
-                    }
-                    data = {
-                        'source_lang': source_lang,
-                        'target_lang': target_lang,
-                        'model': model
-                    }
-                    
-                    response = await client.post(
-                        TranslationService.AUDIO_TRANSLATION_API_URL,
-                        files=files,
-                        data=data,
-                        timeout=60.0  # Timeout más largo para audio
-                    )
-                    response.raise_for_status()
-                    
-                    return response.content
-                    
+            client = await TranslationService.get_http_client()
+            # Preparar los archivos para multipart/form-data
+            with open(audio_file_path, 'rb') as audio_file, open(voice_reference_path, 'rb') as voice_file:
+                files = {
+                    'audio_file': ('audio.wav', audio_file, 'audio/wav'),
+                    'voice_reference_file': ('voice_ref.wav', voice_file, 'audio/wav')
+                }
+                data = {
+                    'source_lang': source_lang,
+                    'target_lang': target_lang,
+                    'model': model
+                }
+                
+                response = await client.post(
+                    TranslationService.AUDIO_TRANSLATION_API_URL,
+                    files=files,
+                    data=data,
+                    # Timeout más largo para audio
+                    timeout=httpx.Timeout(settings.AUDIO_TRANSLATION_TIMEOUT, connect=settings.TRANSLATION_CONNECT_TIMEOUT)
+                )
+                response.raise_for_status()
+                
+                return response.content
+                
         except httpx.RequestError as e:
             logger.error(f"Audio translation API request failed: {e}")
             return None
@@ -102,7 +200,13 @@ class TranslationService:
     
     @staticmethod
     async def create_translated_message(db: Session, message: Message) -> Optional[int]:
-        """Create a translated message for the given original message (text or audio)"""
+        """Create a translated message for the given original message (text or audio).
+
+        Returns None when there is nothing to translate. Raises
+        TranslationFailedError when the backend, the database or the file save
+        fails, so the caller (the translation queue) can retry later. The sync
+        Session is only used from the threadpool; message.sender must be loaded.
+        """
         if not message.sender:
             logger.warning(f"Message {message.id} has no sender, skipping translation")
             return None
@@ -114,8 +218,8 @@ class TranslationService:
             return None
         
         # Get the other participant's language
-        target_language = TranslationService.get_other_participant_language(
-            db, message.conversation_id, message.sender_id
+        target_language = await run_in_threadpool(
+            TranslationService.get_other_participant_language, db, message.conversation_id, message.sender_id
         )
         
         if not target_language:
@@ -149,7 +253,7 @@ class TranslationService:
         
         if not translated_content:
             logger.error(f"Failed to translate text message {message.id}")
-            return None
+            raise TranslationFailedError(f"Text translation failed for message {message.id}")
         
         # Create the translated message record
         translated_message_data = TranslatedMessageCreate(
@@ -160,12 +264,12 @@ class TranslationService:
         )
         
         try:
-            translated_message = translated_message_crud.create(db, translated_message_data)
+            translated_message = await run_in_threadpool(translated_message_crud.create, db, translated_message_data)
             logger.info(f"Created translated text message {translated_message.id} for original message {message.id}")
             return translated_message.id
         except Exception as e:
             logger.error(f"Failed to create translated text message for message {message.id}: {e}")
-            return None
+            raise TranslationFailedError(f"Could not store the translation of message {message.id}: {e}") from e
     
     @staticmethod
     async def _create_audio_translation(db: Session, message: Message, sender_language: str, target_language: str) -> Optional[int]:
@@ -198,6 +302,22 @@ class TranslationService:
             logger.error(f"Voice reference file not found: {voice_reference_path}")
             return None
         
+        # Reutilizar la traducción de un audio idéntico (mismo hash, idioma y voz)
+        if message.media_hash:
+            previous = await run_in_threadpool(
+                translated_message_crud.get_audio_by_source_hash,
+                db, message.media_hash, target_language, message.sender_id
+            )
+            if previous:
+                translated_message = await run_in_threadpool(translated_message_crud.create, db, TranslatedMessageCreate(
+                    original_message_id=message.id,
+                    target_language=target_language,
+                    media_url=previous.media_url,
+                    content_type="AUDIO"
+                ))
+                logger.info(f"Reused translated audio {previous.id} for message {message.id} (same source audio)")
+                return translated_message.id
+        
         logger.info(f"Translating audio from {sender_language} to {target_language}")
         logger.info(f"Audio file: {audio_file_path}")
         logger.info(f"Voice reference file: {voice_reference_path}")
@@ -209,7 +329,7 @@ class TranslationService:
         
         if not translated_audio_bytes:
             logger.error(f"Failed to translate audio message {message.id}")
-            return None
+            raise TranslationFailedError(f"Audio translation failed for message {message.id}")
         
         # Save the translated audio file
         try:
@@ -237,10 +357,10 @@ class TranslationService:
                 content_type="AUDIO"
             )
             
-            translated_message = translated_message_crud.create(db, translated_message_data)
+            translated_message = await run_in_threadpool(translated_message_crud.create, db, translated_message_data)
             logger.info(f"Created translated audio message {translated_message.id} for original message {message.id}")
             return translated_message.id
             
         except Exception as e:
             logger.error(f"Failed to save translated audio or create translated message for message {message.id}: {e}")
-            return None
+            raise TranslationFailedError(f"Could not store the translated audio of message {message.id}: {e}") from e
@@ -0,0 +1,292 @@
+import abc
+import asyncio
+import json
+import logging
+import uuid
+from typing import Awaitable, Callable, List, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.websockets.events import EncodedEvent
+from app.websockets.replay import load_event
+
+logger = logging.getLogger(__name__)
+
+# Identificador de este proceso: cada worker ignora lo que él mismo publicó,
+# porque ya lo entregó a sus sockets locales
+WORKER_ID = uuid.uuid4().hex
+
+# Recibe (conversation_id, evento, exclude_user) publicados por otro worker
+BackplaneHandler = Callable[[str, EncodedEvent, Optional[int]], Awaitable[None]]
+
+
+class Backplane(abc.ABC):
+    """Canal pub/sub entre workers para los eventos de WebSocket.
+
+    ConnectionManager entrega cada evento a sus sockets locales y lo publica aquí;
+    los demás workers lo reciben y lo entregan a los suyos.
+    """
+
+    origin = WORKER_ID
+
+    def encode_envelope(self, conversation_id: str, event: EncodedEvent, exclude_user: Optional[int] = None) -> str:
+        # Cabecera JSON en la primera línea y el frame ya serializado detrás, sin
+        # volver a codificarlo (un JSON serializado nunca contiene saltos de línea)
+        header = json.dumps({
+            "origin": self.origin,
+            "conversation_id": conversation_id,
+            "exclude_user": exclude_user,
+            "type": event.type,
+            "coalesce_key": event.coalesce_key,
+            "seq": event.seq,
+        })
+        return header + "\n" + event.text
+
+    def encode_reference(self, conversation_id: str, event: EncodedEvent, exclude_user: Optional[int] = None) -> str:
+        """Solo la cabecera: el receptor carga el evento de la base de datos por su seq"""
+        header = json.dumps({
+            "origin": self.origin,
+            "conversation_id": conversation_id,
+            "exclude_user": exclude_user,
+            "seq": event.seq,
+            "ref": True,
+        })
+        return header + "\n"
+
+    async def start(self, handler: BackplaneHandler):
+        self.handler = handler
+
+    async def stop(self):
+        pass
+
+    @abc.abstractmethod
+    async def publish(self, conversation_id: str, event: EncodedEvent, exclude_user: Optional[int] = None):
+        """Enviar el evento a los demás workers"""
+
+    async def _dispatch(self, raw):
+        try:
+            if isinstance(raw, bytes):
+                raw = raw.decode("utf-8")
+            header, text = raw.split("\n", 1)
+            envelope = json.loads(header)
+        except (TypeError, ValueError):
+            logger.warning("Ignoring invalid backplane payload")
+            return
+        if envelope.get("origin") == self.origin:
+            return
+        if envelope.get("ref"):
+            event = await self._load_reference(envelope)
+            if event is None:
+                return
+        else:
+            key = envelope.get("coalesce_key")
+            event = EncodedEvent(envelope.get("type"), text, tuple(key) if key is not None else None, envelope.get("seq"))
+        try:
+            await self.handler(envelope["conversation_id"], event, envelope.get("exclude_user"))
+        except Exception as e:
+            logger.error(f"Error delivering backplane message: {e}")
+
+    async def _load_reference(self, envelope: dict) -> Optional[EncodedEvent]:
+        conversation_id, seq = envelope.get("conversation_id"), envelope.get("seq")
+        try:
+            event = await run_in_threadpool(load_event, int(conversation_id), seq)
+        except Exception as e:
+            logger.error(f"Could not load referenced event {seq} of conversation {conversation_id}: {e}")
+            return None
+        if event is None:
+            logger.warning(f"Referenced event {seq} of conversation {conversation_id} not found")
+        return event
+
+
+class InMemoryBroker:
+    """Bus en memoria que comparten varios InMemoryBackplane (tests con varios managers)"""
+
+    def __init__(self):
+        self.subscribers: List["InMemoryBackplane"] = []
+
+
+class InMemoryBackplane(Backplane):
+    """Un solo proceso: sin broker no hay nadie más a quien publicar"""
+
+    def __init__(self, broker: Optional[InMemoryBroker] = None):
+        self.broker = broker
+        # Varios managers en el mismo proceso: cada uno hace de worker distinto
+        self.origin = uuid.uuid4().hex
+
+    async def start(self, handler: BackplaneHandler):
+        await super().start(handler)
+        if self.broker is not None:
+            self.broker.subscribers.append(self)
+
+    async def stop(self):
+        if self.broker is not None and self in self.broker.subscribers:
+            self.broker.subscribers.remove(self)
+
+    async def publish(self, conversation_id: str, event: EncodedEvent, exclude_user: Optional[int] = None):
+        if self.broker is None:
+            return
+        raw = self.encode_envelope(conversation_id, event, exclude_user)
+        for subscriber in list(self.broker.subscribers):
+            await subscriber._dispatch(raw)
+
+
+class RedisBackplane(Backplane):
+    """Pub/sub de Redis (requiere el paquete redis >= 4.2)"""
+
+    def __init__(self, url: str, channel: str = "myvoicechat:ws"):
+        self.url = url
+        self.channel = channel
+        self._client = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, handler: BackplaneHandler):
+        await super().start(handler)
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:
+            raise RuntimeError("WS_BACKPLANE=redis requires the 'redis' package (>= 4.2)")
+        self._client = aioredis.from_url(self.url)
+        self._listener = asyncio.ensure_future(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    async def publish(self, conversation_id: str, event: EncodedEvent, exclude_user: Optional[int] = None):
+        try:
+            await self._client.publish(self.channel, self.encode_envelope(conversation_id, event, exclude_user))
+        except Exception as e:
+            logger.error(f"Failed to publish to Redis backplane: {e}")
+
+    async def _listen(self):
+        while True:
+            pubsub = self._client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                async for item in pubsub.listen():
+                    if item.get("type") == "message":
+                        await self._dispatch(item["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis backplane listener error, reconnecting: {e}")
+                await asyncio.sleep(1.0)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+
+class PostgresBackplane(Backplane):
+    """LISTEN/NOTIFY de PostgreSQL con asyncpg (payload máximo ~8000 bytes).
+
+    Un evento persistente que no cabe en el payload se publica como referencia
+    (conversation_id, seq) y cada receptor lo carga de la base de datos.
+    """
+
+    MAX_PAYLOAD_BYTES = 7999
+
+    def __init__(self, dsn: str, channel: str = "ws_events"):
+        self.dsn = dsn
+        self.channel = channel
+        self._pool = None
+        self._listener: Optional[asyncio.Task] = None
+        self._dispatches: Set[asyncio.Task] = set()
+
+    async def start(self, handler: BackplaneHandler):
+        await super().start(handler)
+        import asyncpg
+
+        self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=2)
+        self._listener = asyncio.ensure_future(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        for task in self._dispatches:
+            task.cancel()
+        self._dispatches.clear()
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    async def publish(self, conversation_id: str, event: EncodedEvent, exclude_user: Optional[int] = None):
+        raw = self.encode_envelope(conversation_id, event, exclude_user)
+        if len(raw.encode("utf-8")) > self.MAX_PAYLOAD_BYTES:
+            if event.seq is None:
+                logger.warning(
+                    f"Event for conversation {conversation_id} exceeds the NOTIFY payload limit; "
+                    f"delivered to local sockets only"
+                )
+                return
+            raw = self.encode_reference(conversation_id, event, exclude_user)
+        try:
+            async with self._pool.acquire() as conn:
+                await conn.execute("SELECT pg_notify($1, $2)", self.channel, raw)
+        except Exception as e:
+            logger.error(f"Failed to publish to Postgres backplane: {e}")
+
+    def _on_notify(self, connection, pid, channel, payload):
+        task = asyncio.ensure_future(self._dispatch(payload))
+        self._dispatches.add(task)
+        task.add_done_callback(self._on_dispatch_done)
+
+    def _on_dispatch_done(self, task: asyncio.Task):
+        self._dispatches.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Error dispatching Postgres backplane notification: {task.exception()}")
+
+    async def _listen(self):
+        import asyncpg
+
+        while True:
+            conn = None
+            try:
+                # Conexión dedicada: LISTEN ocupa la conexión mientras dure
+                conn = await asyncpg.connect(self.dsn)
+                await conn.add_listener(self.channel, self._on_notify)
+                while not conn.is_closed():
+                    await asyncio.sleep(5.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Postgres backplane listener error, reconnecting: {e}")
+                await asyncio.sleep(1.0)
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+
+
+def _postgres_dsn(url: str) -> str:
+    """asyncpg solo acepta postgresql:// sin el driver de SQLAlchemy"""
+    scheme, rest = url.split("://", 1)
+    return "postgresql://" + rest
+
+
+def create_backplane() -> Backplane:
+    """Backplane configurado en WS_BACKPLANE ("memory", "redis" o "postgres")"""
+    backend = settings.WS_BACKPLANE
+    if backend == "redis":
+        return RedisBackplane(settings.WS_BACKPLANE_URL or "redis://localhost:6379/0")
+    if backend == "postgres":
+        from app.db.database import DATABASE_URL
+
+        return PostgresBackplane(_postgres_dsn(settings.WS_BACKPLANE_URL or DATABASE_URL))
+    if backend != "memory":
+        logger.warning(f"Unknown WS_BACKPLANE '{backend}', using the in-memory backplane")
+    return InMemoryBackplane()
@@ -1,13 +1,18 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, HTTPException, status
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, HTTPException, status, Depends
 from sqlalchemy.orm import Session
 from app.websockets.manager import manager
-from app.api.dependencies import get_db
+from app.websockets.events import ErrorEvent, SubscribedEvent, UnsubscribedEvent, UserLeftEvent
+from app.websockets.throttle import TokenBucket
+from app.api.dependencies import get_db, get_user_from_token_payload, require_ops_token
 from app.services.participants_service import ParticipantsService
+from typing import Optional
 import logging
 import json
 import asyncio
 from jose import JWTError, jwt
 from app.core.config import settings
+from app.db.database import SessionLocal
+from fastapi.concurrency import run_in_threadpool
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -25,22 +30,38 @@ def decode_websocket_token(token: str) -> dict:
 
 def get_user_id_from_token(db: Session, token_payload: dict) -> int:
     """Get user_id from JWT token payload"""
-    # The token contains username in 'sub' field, we need to get user_id
-    username = token_payload.get("sub")
-    if not username:
+    if not token_payload.get("sub"):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido")
     
-    # Look up user by username to get user_id
-    from app.crud.user import get_user_by_username
-    user = get_user_by_username(db, username)
+    # Resolve the user through the shared principal cache (no DB lookup on a hit)
+    user = get_user_from_token_payload(db, token_payload)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario no encontrado")
     
     return user.id
 
+async def _rate_limited(bucket: TokenBucket, websocket: WebSocket) -> bool:
+    """True if the inbound frame must be dropped; the client is told once per burst"""
+    already_throttled = bucket.throttled
+    if bucket.allow():
+        return False
+    if not already_throttled:
+        await manager.send_personal_message(ErrorEvent(detail="Rate limited"), websocket)
+    return True
+
 @router.websocket("/ws/{conversation_id}")
-async def websocket_endpoint(websocket: WebSocket, conversation_id: int, token: str = Query(...)):
-    """WebSocket endpoint for real-time chat"""
+async def websocket_endpoint(
+    websocket: WebSocket, conversation_id: int, token: str = Query(...), since_seq: Optional[int] = Query(None)
+):
+    """
+    WebSocket endpoint for real-time chat.
+
+    new_message and translation_ready events carry a per-conversation `seq`;
+    reconnecting with ?since_seq=N replays the ones after N, followed by a
+    {"type": "resumed", "last_seq": M} frame. Frames can arrive out of order, so
+    N must be the highest seq up to which every event was received (not simply
+    the highest seen) and M is the value to resume from next time.
+    """
     
     user_id = None
     conversation_id_str = str(conversation_id)
@@ -75,8 +96,9 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: int, token:
             db.close()
         
         # Register connection with manager
-        await manager.connect(websocket, conversation_id_str, user_id)
+        await manager.connect(websocket, conversation_id_str, user_id, since_seq=since_seq)
         logger.info(f"User {user_id} successfully connected to conversation {conversation_id}")
+        bucket = TokenBucket(settings.WS_INBOUND_RATE, settings.WS_INBOUND_BURST)
         
         # Message loop
         while True:
@@ -93,6 +115,9 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: int, token:
                         logger.info(f"Connection timed out for user {user_id}")
                         break
                 
+                if await _rate_limited(bucket, websocket):
+                    continue
+                
                 if data == "ping":
                     await manager.send_personal_message("pong", websocket)
                 elif data.startswith("{"):
@@ -102,12 +127,10 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: int, token:
                         message_type = message_data.get("type")
                         
                         if message_type == "typing":
-                            # Broadcast typing indicator to other users
-                            await manager.broadcast_to_conversation({
-                                "type": "typing",
-                                "user_id": user_id,
-                                "is_typing": message_data.get("is_typing", False)
-                            }, conversation_id_str, exclude_user=user_id)
+                            # Only typing start/stop transitions reach the other users
+                            await manager.typing.update(
+                                conversation_id_str, user_id, bool(message_data.get("is_typing", False))
+                            )
                         
                     except json.JSONDecodeError:
                         logger.warning(f"Invalid JSON received from user {user_id}: {data}")
@@ -129,10 +152,153 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: int, token:
             if user_id:
                 disconnected_user = manager.disconnect(websocket, conversation_id_str)
                 if disconnected_user:
-                    await manager.broadcast_to_conversation({
-                        "type": "user_left",
-                        "user_id": disconnected_user,
-                        "conversation_id": conversation_id
-                    }, conversation_id_str)
+                    await manager.broadcast_to_conversation(
+                        UserLeftEvent(user_id=disconnected_user, conversation_id=conversation_id),
+                        conversation_id_str
+                    )
+        except Exception as e:
+            logger.error(f"Error during WebSocket cleanup: {e}")
+
+
+
+def _authenticate(token: str) -> int:
+    """Resolve the user id of a WebSocket token (raises on invalid tokens)"""
+    db = SessionLocal()
+    try:
+        payload = decode_websocket_token(token)
+        return get_user_id_from_token(db, payload)
+    finally:
+        db.close()
+
+
+def _has_access(user_id: int, conversation_id: int) -> bool:
+    db = SessionLocal()
+    try:
+        return ParticipantsService.user_has_access_to_conversation(db, user_id, conversation_id)
+    finally:
+        db.close()
+
+
+@router.websocket("/ws")
+async def multiplexed_websocket_endpoint(websocket: WebSocket, token: str = Query(...)):
+    """
+    One WebSocket per user for all of their conversations.
+
+    Client frames:
+      {"type": "subscribe", "conversation_id": 1, "since_seq": 42}  (since_seq optional)
+      {"type": "unsubscribe", "conversation_id": 1}
+      {"type": "typing", "conversation_id": 1, "is_typing": true}
+      "ping"
+    since_seq follows the same rules as in /ws/{conversation_id} and is answered
+    with a "resumed" frame. Every event pushed by the server carries its conversation_id. Inbound
+    frames are limited per socket (WS_INBOUND_RATE / WS_INBOUND_BURST).
+    """
+    user_id = None
+    
+    try:
+        await websocket.accept()
+        
+        # Authenticate once for the lifetime of the socket
+        try:
+            user_id = await run_in_threadpool(_authenticate, token)
+        except Exception as e:
+            logger.error(f"Token validation error: {e}")
+            await websocket.close(code=4001)
+            return
+        
+        subscriptions = set()
+        bucket = TokenBucket(settings.WS_INBOUND_RATE, settings.WS_INBOUND_BURST)
+        
+        while True:
+            try:
+                try:
+                    data = await asyncio.wait_for(websocket.receive_text(), timeout=60.0)
+                except asyncio.TimeoutError:
+                    await manager.send_personal_message("ping", websocket)
+                    continue
+                
+                if await _rate_limited(bucket, websocket):
+                    continue
+                
+                if data == "ping":
+                    await manager.send_personal_message("pong", websocket)
+                    continue
+                
+                try:
+                    frame = json.loads(data)
+                    frame_type = frame.get("type")
+                    conversation_id = int(frame.get("conversation_id"))
+                except (ValueError, TypeError, AttributeError):
+                    await manager.send_personal_message(ErrorEvent(detail="Invalid frame"), websocket)
+                    continue
+                conversation_id_str = str(conversation_id)
+                
+                if frame_type == "subscribe":
+                    if conversation_id in subscriptions:
+                        continue
+                    if len(subscriptions) >= settings.WS_MAX_SUBSCRIPTIONS:
+                        await manager.send_personal_message(ErrorEvent(
+                            conversation_id=conversation_id, detail="Too many subscriptions"
+                        ), websocket)
+                        continue
+                    since_seq = frame.get("since_seq")
+                    if since_seq is not None:
+                        try:
+                            since_seq = int(since_seq)
+                        except (ValueError, TypeError):
+                            await manager.send_personal_message(ErrorEvent(
+                                conversation_id=conversation_id, detail="Invalid since_seq"
+                            ), websocket)
+                            continue
+                    if not await run_in_threadpool(_has_access, user_id, conversation_id):
+                        await manager.send_personal_message(ErrorEvent(
+                            conversation_id=conversation_id, detail="Forbidden"
+                        ), websocket)
+                        continue
+                    await manager.connect(websocket, conversation_id_str, user_id, since_seq=since_seq)
+                    subscriptions.add(conversation_id)
+                    await manager.send_personal_message(SubscribedEvent(conversation_id=conversation_id), websocket)
+                
+                elif frame_type == "unsubscribe":
+                    if conversation_id not in subscriptions:
+                        continue
+                    subscriptions.discard(conversation_id)
+                    # The socket stays registered (and keeps its writer) with no subscriptions
+                    manager.unsubscribe(websocket, conversation_id_str)
+                    await manager.send_personal_message(UnsubscribedEvent(conversation_id=conversation_id), websocket)
+                    await manager.broadcast_to_conversation(
+                        UserLeftEvent(user_id=user_id, conversation_id=conversation_id),
+                        conversation_id_str
+                    )
+                
+                elif frame_type == "typing":
+                    if conversation_id not in subscriptions:
+                        continue
+                    await manager.typing.update(conversation_id_str, user_id, bool(frame.get("is_typing", False)))
+                
+            except WebSocketDisconnect:
+                logger.info(f"User {user_id} disconnected from the multiplexed socket")
+                break
+            except Exception as e:
+                logger.error(f"Error in multiplexed WebSocket loop for user {user_id}: {e}")
+                break
+    
+    except WebSocketDisconnect:
+        logger.info(f"User {user_id} disconnected during handshake")
+    except Exception as e:
+        logger.error(f"WebSocket connection error for user {user_id}: {e}")
+    finally:
+        try:
+            for conversation_id_str in manager.disconnect_all(websocket):
+                await manager.broadcast_to_conversation(
+                    UserLeftEvent(user_id=user_id, conversation_id=int(conversation_id_str)),
+                    conversation_id_str
+                )
         except Exception as e:
             logger.error(f"Error during WebSocket cleanup: {e}")
+
+
+@router.get("/ws/stats", dependencies=[Depends(require_ops_token)])
+def get_websocket_stats():
+    """Aggregate connection and outbound queue metrics of this worker (X-Ops-Token)"""
+    return manager.get_stats()
@@ -0,0 +1,191 @@
+import json
+from datetime import datetime
+from typing import Hashable, Literal, Optional, Union
+
+from pydantic import BaseModel
+from pydantic.json import pydantic_encoder
+
+from app.schemas.user import UserBasic
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+
+def dumps(payload: dict) -> str:
+    """Serializar un evento: orjson si está instalado, si no la librería estándar"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=pydantic_encoder).decode("utf-8")
+    return json.dumps(payload, default=pydantic_encoder, separators=(",", ":"))
+
+
+# --- Eventos que envía el servidor (un schema por tipo) ---
+
+class WSEvent(BaseModel):
+    type: str
+
+
+class MessageEventData(BaseModel):
+    id: int
+    conversation_id: int
+    sender_id: int
+    content_type: str
+    content: Optional[str] = None
+    media_url: Optional[str] = None
+    created_at: Optional[datetime] = None
+    sender: Optional[UserBasic] = None
+
+
+class NewMessageEvent(WSEvent):
+    type: Literal["new_message"] = "new_message"
+    seq: Optional[int] = None
+    data: MessageEventData
+
+
+class TranslationEventData(BaseModel):
+    id: int
+    original_message_id: int
+    conversation_id: int
+    target_language: str
+    translated_content: Optional[str] = None
+    media_url: Optional[str] = None
+    content_type: str
+    created_at: Optional[datetime] = None
+
+
+class TranslationReadyEvent(WSEvent):
+    type: Literal["translation_ready"] = "translation_ready"
+    seq: Optional[int] = None
+    data: TranslationEventData
+
+
+class MessagesReadData(BaseModel):
+    conversation_id: int
+    user_id: int
+    last_read_message_id: int
+
+
+class MessagesReadEvent(WSEvent):
+    type: Literal["messages_read"] = "messages_read"
+    data: MessagesReadData
+
+
+class UserJoinedEvent(WSEvent):
+    type: Literal["user_joined"] = "user_joined"
+    user_id: int
+    conversation_id: int
+
+
+class UserLeftEvent(WSEvent):
+    type: Literal["user_left"] = "user_left"
+    user_id: int
+    conversation_id: int
+
+
+class TypingEvent(WSEvent):
+    type: Literal["typing"] = "typing"
+    user_id: int
+    conversation_id: int
+    is_typing: bool = False
+
+
+class ResyncEvent(WSEvent):
+    """Faltan más eventos de los que se reenvían: el cliente debe recargar el historial"""
+    type: Literal["resync"] = "resync"
+    conversation_id: int
+
+
+class ResumedEvent(WSEvent):
+    """Fin del reenvío: el cliente tiene todos los eventos hasta last_seq"""
+    type: Literal["resumed"] = "resumed"
+    conversation_id: int
+    last_seq: int
+
+
+class SubscribedEvent(WSEvent):
+    type: Literal["subscribed"] = "subscribed"
+    conversation_id: int
+
+
+class UnsubscribedEvent(WSEvent):
+    type: Literal["unsubscribed"] = "unsubscribed"
+    conversation_id: int
+
+
+class ErrorEvent(WSEvent):
+    type: Literal["error"] = "error"
+    detail: str
+    conversation_id: Optional[int] = None
+
+
+def new_message_event(message, sender=None) -> NewMessageEvent:
+    """Evento new_message de un mensaje recién creado (texto o audio)"""
+    return NewMessageEvent(seq=message.seq, data=MessageEventData(
+        id=message.id,
+        conversation_id=message.conversation_id,
+        sender_id=message.sender_id,
+        content_type=message.content_type,
+        content=message.content,
+        media_url=message.media_url,
+        created_at=message.created_at,
+        sender=UserBasic(id=sender.id, username=sender.username) if sender is not None else None
+    ))
+
+
+def translation_ready_event(translated_message, conversation_id: int) -> TranslationReadyEvent:
+    return TranslationReadyEvent(seq=translated_message.seq, data=TranslationEventData(
+        id=translated_message.id,
+        original_message_id=translated_message.original_message_id,
+        conversation_id=conversation_id,
+        target_language=translated_message.target_language,
+        translated_content=translated_message.translated_content,
+        media_url=translated_message.media_url,
+        content_type=translated_message.content_type,
+        created_at=translated_message.created_at
+    ))
+
+
+def messages_read_event(conversation_id: int, user_id: int, last_read_message_id: int) -> MessagesReadEvent:
+    return MessagesReadEvent(data=MessagesReadData(
+        conversation_id=conversation_id,
+        user_id=user_id,
+        last_read_message_id=last_read_message_id
+    ))
+
+
+# --- Frames ya serializados ---
+
+class EncodedEvent:
+    """Un evento serializado una sola vez.
+
+    El mismo texto se encola para todos los destinatarios y viaja tal cual por el
+    backplane, así que el coste de serializar no depende del número de sockets.
+    Los eventos persistentes (mensajes y traducciones) llevan su seq en la
+    conversación y se guardan para reenviarlos tras una reconexión.
+    """
+    __slots__ = ("type", "text", "coalesce_key", "seq")
+
+    def __init__(self, type: str, text: str, coalesce_key: Optional[Hashable] = None, seq: Optional[int] = None):
+        self.type = type
+        self.text = text
+        self.coalesce_key = coalesce_key
+        self.seq = seq
+
+
+def coalesce_key(payload: dict) -> Optional[Hashable]:
+    """Eventos que solo importan en su último estado pueden reemplazar uno pendiente"""
+    event_type = payload.get("type")
+    if event_type == "typing":
+        return ("typing", payload.get("conversation_id"), payload.get("user_id"))
+    if event_type == "messages_read":
+        data = payload.get("data") or {}
+        return ("messages_read", data.get("conversation_id"), data.get("user_id"))
+    return None
+
+
+def encode_event(event: Union[WSEvent, dict, EncodedEvent]) -> EncodedEvent:
+    if isinstance(event, EncodedEvent):
+        return event
+    payload = event.dict() if isinstance(event, BaseModel) else event
+    return EncodedEvent(payload.get("type"), dumps(payload), coalesce_key(payload), payload.get("seq"))
@@ -1,56 +1,186 @@
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, List
-import json
+from fastapi.concurrency import run_in_threadpool
+from typing import Dict, List, Optional, Set, Union
 import logging
 import asyncio
+import time
+from app.core.config import settings
+from app.websockets.backplane import Backplane, InMemoryBackplane, create_backplane
+from app.websockets.events import EncodedEvent, ResumedEvent, UserJoinedEvent, WSEvent, encode_event
+from app.websockets.replay import ReplayBuffer, load_missed_events
+from app.websockets.throttle import TypingCoalescer
+from app.websockets.writer import ConnectionWriter
 
 logger = logging.getLogger(__name__)
 
+
+class Connection:
+    """A live websocket held by this worker and the conversations it receives"""
+    __slots__ = ("websocket", "user_id", "conversations", "writer", "connected_at")
+
+    def __init__(self, websocket: WebSocket, user_id: int, writer: ConnectionWriter):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.conversations: Set[str] = set()
+        self.writer = writer
+        self.connected_at = time.time()
+
+
 class ConnectionManager:
-    def __init__(self):
-        # conversation_id -> list of websockets
-        self.active_connections: Dict[str, List[WebSocket]] = {}
-        
-    async def connect(self, websocket: WebSocket, conversation_id: str, user_id: int):
-        """Connect a websocket to a conversation"""
+    def __init__(self, backplane: Optional[Backplane] = None):
+        # Registry of the sockets held by this worker, indexed three ways so that
+        # lookups, presence and cleanup are O(1). Starlette's WebSocket is not
+        # hashable, so sockets are keyed by identity:
+        #   id(websocket) -> Connection
+        #   conversation_id -> user_id -> connections
+        #   user_id -> connections
+        self.connections: Dict[int, Connection] = {}
+        self.by_conversation: Dict[str, Dict[int, Set[Connection]]] = {}
+        self.by_user: Dict[int, Set[Connection]] = {}
+        # Pub/sub between workers; the in-memory one keeps everything in-process
+        self.backplane = backplane or InMemoryBackplane()
+        # Typing indicators: only state changes are broadcast
+        self.typing = TypingCoalescer(self.broadcast_to_conversation, settings.WS_TYPING_TIMEOUT)
+        # Recent message/translation events per conversation, to resume with ?since_seq=N
+        self.replay = ReplayBuffer(settings.WS_REPLAY_BUFFER_SIZE, settings.WS_REPLAY_MAX_CONVERSATIONS)
+        self.replayed = 0
+        self.replay_db_fallbacks = 0
+
+    async def start(self):
+        """Subscribe to the backplane to deliver events published by other workers"""
+        await self.backplane.start(self._deliver_from_backplane)
+
+    async def stop(self):
+        self.typing.clear()
+        await self.backplane.stop()
+
+    async def _deliver_from_backplane(self, conversation_id: str, event: EncodedEvent, exclude_user: Optional[int]):
+        self.replay.record(conversation_id, event)
+        await self._send_local(event, conversation_id, exclude_user)
+
+    async def connect(self, websocket: WebSocket, conversation_id: str, user_id: int, since_seq: Optional[int] = None):
+        """Connect a websocket to a conversation, replaying the events after since_seq if given"""
         # Don't accept here - should already be accepted in endpoint
-        
-        if conversation_id not in self.active_connections:
-            self.active_connections[conversation_id] = []
-        
-        # Store websocket with user info
-        websocket.user_id = user_id
-        self.active_connections[conversation_id].append(websocket)
-        
+        missed: List[EncodedEvent] = []
+        if since_seq is not None and not self.replay.covers(conversation_id, since_seq):
+            # The ring was overrun, has a gap or this worker has no history yet:
+            # the database is authoritative up to the last seq it returns
+            self.replay_db_fallbacks += 1
+            missed, since_seq = await run_in_threadpool(
+                load_missed_events, int(conversation_id), since_seq, settings.WS_REPLAY_DB_LIMIT
+            )
+
+        connection = self.connections.get(id(websocket))
+        if connection is None:
+            writer = ConnectionWriter(
+                websocket,
+                on_dead=self._on_dead_connection,
+                max_queue=settings.WS_SEND_QUEUE_SIZE,
+                policy=settings.WS_SLOW_CONSUMER_POLICY,
+                send_timeout=settings.WS_SEND_TIMEOUT
+            )
+            writer.start()
+            connection = Connection(websocket, user_id, writer)
+            self.connections[id(websocket)] = connection
+            self.by_user.setdefault(user_id, set()).add(connection)
+
+        connection.conversations.add(conversation_id)
+        self.by_conversation.setdefault(conversation_id, {}).setdefault(user_id, set()).add(connection)
+
+        if since_seq is not None:
+            # No await since registering: later events are delivered live, earlier
+            # ones come from the ring, so nothing is lost or sent twice
+            last_seq = since_seq
+            for event in self.replay.since(conversation_id, since_seq):
+                missed.append(event)
+                # The client's watermark only advances over a contiguous run of seqs
+                if event.seq == last_seq + 1:
+                    last_seq = event.seq
+            for event in missed:
+                connection.writer.enqueue(event.text)
+            connection.writer.enqueue(encode_event(
+                ResumedEvent(conversation_id=int(conversation_id), last_seq=last_seq)
+            ).text)
+            self.replayed += len(missed)
+
         logger.info(f"User {user_id} connected to conversation {conversation_id}")
-        
+
         # Notify other participants that user joined
-        await self.broadcast_to_conversation({
-            "type": "user_joined",
-            "user_id": user_id,
-            "conversation_id": conversation_id
-        }, conversation_id, exclude_user=user_id)
-    
+        await self.broadcast_to_conversation(
+            UserJoinedEvent(user_id=user_id, conversation_id=int(conversation_id)),
+            conversation_id,
+            exclude_user=user_id
+        )
+
     def disconnect(self, websocket: WebSocket, conversation_id: str):
         """Disconnect a websocket from a conversation"""
-        if conversation_id in self.active_connections:
-            try:
-                user_id = getattr(websocket, 'user_id', None)
-                self.active_connections[conversation_id].remove(websocket)
-                
-                logger.info(f"User {user_id} disconnected from conversation {conversation_id}")
-                
-                # Clean up empty conversation lists
-                if not self.active_connections[conversation_id]:
-                    del self.active_connections[conversation_id]
-                
-                return user_id
-            except ValueError:
-                pass  # Websocket was not in the list
-        return None
-    
-    async def send_personal_message(self, message: str, websocket: WebSocket):
+        connection = self.connections.get(id(websocket))
+        if connection is None or conversation_id not in connection.conversations:
+            return None
+
+        self._remove_from_conversation(connection, conversation_id)
+        logger.info(f"User {connection.user_id} disconnected from conversation {conversation_id}")
+
+        # A socket without conversations is gone
+        if not connection.conversations:
+            self._forget(connection)
+        return connection.user_id
+
+    def unsubscribe(self, websocket: WebSocket, conversation_id: str):
+        """Stop delivering a conversation to a socket, keeping the socket registered"""
+        connection = self.connections.get(id(websocket))
+        if connection is None or conversation_id not in connection.conversations:
+            return None
+        self._remove_from_conversation(connection, conversation_id)
+        return connection.user_id
+
+    def _remove_from_conversation(self, connection: Connection, conversation_id: str):
+        connection.conversations.discard(conversation_id)
+        users = self.by_conversation.get(conversation_id)
+        if users is None:
+            return
+        user_connections = users.get(connection.user_id)
+        if user_connections is not None:
+            user_connections.discard(connection)
+            if not user_connections:
+                del users[connection.user_id]
+                self.typing.discard(conversation_id, connection.user_id)
+        # Clean up empty conversations
+        if not users:
+            del self.by_conversation[conversation_id]
+
+    def _forget(self, connection: Connection):
+        connection.writer.close()
+        self.connections.pop(id(connection.websocket), None)
+        user_connections = self.by_user.get(connection.user_id)
+        if user_connections is not None:
+            user_connections.discard(connection)
+            if not user_connections:
+                del self.by_user[connection.user_id]
+
+    def disconnect_all(self, websocket: WebSocket) -> List[str]:
+        """Remove a socket from every conversation; returns the conversations it was in"""
+        connection = self.connections.get(id(websocket))
+        if connection is None:
+            return []
+        conversations = list(connection.conversations)
+        for conversation_id in conversations:
+            self._remove_from_conversation(connection, conversation_id)
+        self._forget(connection)
+        return conversations
+
+    async def _on_dead_connection(self, websocket: WebSocket):
+        self.disconnect_all(websocket)
+
+    async def send_personal_message(self, message: Union[str, WSEvent], websocket: WebSocket):
         """Send a message to a specific websocket"""
+        if not isinstance(message, str):
+            message = encode_event(message).text
+        connection = self.connections.get(id(websocket))
+        if connection is not None:
+            # Through the connection's queue, to keep ordering with broadcasts
+            connection.writer.enqueue(message)
+            return
         try:
             if hasattr(websocket, 'client_state') and websocket.client_state.value == 1:  # CONNECTED
                 await websocket.send_text(message)
@@ -58,91 +188,64 @@ class ConnectionManager:
                 await websocket.send_text(message)
         except Exception as e:
             logger.error(f"Error sending personal message: {e}")
-            # Remove dead connection
-            for conv_id, connections in self.active_connections.items():
-                if websocket in connections:
-                    self.disconnect(websocket, conv_id)
-                    break
-    
-    async def broadcast_to_conversation(self, message: dict, conversation_id: str, exclude_user: int = None):
-        """Broadcast a message to all connections in a conversation"""
-        if conversation_id not in self.active_connections:
+
+    async def broadcast_to_conversation(self, message: Union[WSEvent, dict], conversation_id: str, exclude_user: int = None):
+        """Broadcast a message to all connections in a conversation, on every worker"""
+        # Serialized once: the same frame goes to every socket and to the backplane
+        event = encode_event(message)
+        self.replay.record(conversation_id, event)
+        await self._send_local(event, conversation_id, exclude_user)
+        await self.backplane.publish(conversation_id, event, exclude_user)
+
+    async def send_to_conversation(self, message: Union[WSEvent, dict], conversation_id: str):
+        """Send a message to all connections in a conversation (including sender), on every worker"""
+        event = encode_event(message)
+        self.replay.record(conversation_id, event)
+        await self._send_local(event, conversation_id)
+        await self.backplane.publish(conversation_id, event)
+
+    async def _send_local(self, event: EncodedEvent, conversation_id: str, exclude_user: int = None):
+        """Queue a frame for the connections of a conversation held by this worker (never waits on a socket)"""
+        users = self.by_conversation.get(conversation_id)
+        if not users:
             return
-        
-        message_str = json.dumps(message)
-        dead_connections = []
-        
-        for connection in self.active_connections[conversation_id]:
+
+        for user_id, user_connections in users.items():
             # Skip if this is the user we want to exclude
-            if exclude_user and getattr(connection, 'user_id', None) == exclude_user:
+            if exclude_user and user_id == exclude_user:
                 continue
-                
-            try:
-                # Check connection state more carefully
-                is_connected = False
-                if hasattr(connection, 'client_state') and connection.client_state.value == 1:
-                    is_connected = True
-                elif hasattr(connection, 'application_state') and connection.application_state.value == 2:
-                    is_connected = True
-                    
-                if is_connected:
-                    await connection.send_text(message_str)
-                else:
-                    dead_connections.append(connection)
-            except Exception as e:
-                logger.error(f"Error broadcasting message: {e}")
-                dead_connections.append(connection)
-        
-        # Clean up dead connections
-        for dead_conn in dead_connections:
-            self.disconnect(dead_conn, conversation_id)
-    
-    async def send_to_conversation(self, message: dict, conversation_id: str):
-        """Send a message to all connections in a conversation (including sender)"""
-        if conversation_id not in self.active_connections:
-            return
-        
-        message_str = json.dumps(message)
-        dead_connections = []
-        
-        for connection in self.active_connections[conversation_id]:
-            try:
-                # Check connection state more carefully
-                is_connected = False
-                if hasattr(connection, 'client_state') and connection.client_state.value == 1:
-                    is_connected = True
-                elif hasattr(connection, 'application_state') and connection.application_state.value == 2:
-                    is_connected = True
-                    
-                if is_connected:
-                    await connection.send_text(message_str)
-                else:
-                    dead_connections.append(connection)
-            except Exception as e:
-                logger.error(f"Error sending message to conversation: {e}")
-                dead_connections.append(connection)
-        
-        # Clean up dead connections
-        for dead_conn in dead_connections:
-            self.disconnect(dead_conn, conversation_id)
-    
+            for connection in user_connections:
+                connection.writer.enqueue(event.text, event.coalesce_key)
+
+    def get_stats(self) -> dict:
+        """Aggregate outbound queue metrics for this worker (no user or conversation ids)"""
+        connections = [connection.writer.stats() for connection in self.connections.values()]
+        depths = [c["depth"] for c in connections]
+        return {
+            "connections": len(connections),
+            "conversations": len(self.by_conversation),
+            "users": len(self.by_user),
+            "queued_frames": sum(depths),
+            "max_queue_depth": max(depths) if depths else 0,
+            "dropped": sum(c["dropped"] for c in connections),
+            "coalesced": sum(c["coalesced"] for c in connections),
+            **self.typing.stats(),
+            "replay_conversations": len(self.replay),
+            "replayed": self.replayed,
+            "replay_db_fallbacks": self.replay_db_fallbacks,
+        }
+
     def get_conversation_users(self, conversation_id: str) -> List[int]:
         """Get list of user IDs connected to a conversation"""
-        if conversation_id not in self.active_connections:
-            return []
-        
-        return [getattr(conn, 'user_id', None) for conn in self.active_connections[conversation_id] 
-                if hasattr(conn, 'user_id')]
-    
+        return list(self.by_conversation.get(conversation_id, {}))
+
     def is_user_online(self, conversation_id: str, user_id: int) -> bool:
         """Check if a user is online in a conversation"""
-        if conversation_id not in self.active_connections:
-            return False
-        
-        for conn in self.active_connections[conversation_id]:
-            if getattr(conn, 'user_id', None) == user_id:
-                return True
-        return False
+        return user_id in self.by_conversation.get(conversation_id, {})
+
+    def is_user_connected(self, user_id: int) -> bool:
+        """Check if a user has any socket on this worker"""
+        return user_id in self.by_user
 
 # Global instance
-manager = ConnectionManager()
+manager = ConnectionManager(backplane=create_backplane())
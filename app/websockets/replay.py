@@ -0,0 +1,131 @@
+import bisect
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional, Tuple
+
+from app.crud.loaders import loader_options
+from app.crud.message import get_messages_since_seq
+from app.crud.translated_message import TranslatedMessageCRUD
+from app.db.database import SessionLocal
+from app.schemas import MessageWithSender
+from app.websockets.events import (
+    EncodedEvent, ResyncEvent, encode_event, new_message_event, translation_ready_event
+)
+
+
+class ConversationLog:
+    """Últimos eventos persistentes de una conversación, ordenados por seq.
+
+    Cubre el rango (floor, último seq]: un cliente con since_seq >= floor se
+    recupera desde aquí; uno más antiguo necesita la base de datos.
+    """
+    __slots__ = ("events", "floor")
+
+    def __init__(self, floor: int):
+        self.events: Deque[Tuple[int, EncodedEvent]] = deque()
+        self.floor = floor
+
+
+class ReplayBuffer:
+    """Anillo acotado de eventos por conversación para reanudar con ?since_seq=N.
+
+    Se guardan los eventos que pasan por este worker (locales o recibidos por el
+    backplane), tengan o no sockets conectados, con un LRU de conversaciones.
+    """
+
+    def __init__(self, size: int = 200, max_conversations: int = 1000):
+        self.size = size
+        self.max_conversations = max_conversations
+        self._logs: "OrderedDict[str, ConversationLog]" = OrderedDict()
+
+    def record(self, conversation_id: str, event: EncodedEvent):
+        if event.seq is None:
+            return
+        seq = event.seq
+        log = self._logs.get(conversation_id)
+        if log is None:
+            log = ConversationLog(floor=seq - 1)
+            self._logs[conversation_id] = log
+            if len(self._logs) > self.max_conversations:
+                self._logs.popitem(last=False)
+        else:
+            self._logs.move_to_end(conversation_id)
+
+        if seq <= log.floor:
+            # Llegó por el backplane después de otro más reciente y ya fuera del rango
+            return
+        if len(log.events) >= self.size:
+            log.floor, _ = log.events.popleft()
+        if not log.events or seq > log.events[-1][0]:
+            log.events.append((seq, event))
+            return
+        # Fuera de orden (dos workers publicando a la vez): insertar en su sitio
+        seqs = [s for s, _ in log.events]
+        index = bisect.bisect_left(seqs, seq)
+        if index < len(seqs) and seqs[index] == seq:
+            return
+        log.events.insert(index, (seq, event))
+
+    def covers(self, conversation_id: str, since_seq: int) -> bool:
+        """True si el anillo tiene todos los eventos posteriores a since_seq, sin huecos.
+
+        Los frames se publican después del commit y pueden llegar desordenados
+        (seq N+1 antes que N); mientras falte alguno, el anillo no responde por él.
+        """
+        log = self._logs.get(conversation_id)
+        if log is None or since_seq < log.floor:
+            return False
+        expected = since_seq + 1
+        for seq, _ in log.events:
+            if seq < expected:
+                continue
+            if seq != expected:
+                return False
+            expected += 1
+        return True
+
+    def since(self, conversation_id: str, since_seq: int) -> List[EncodedEvent]:
+        """Eventos del anillo con seq > since_seq"""
+        log = self._logs.get(conversation_id)
+        if log is None:
+            return []
+        return [event for seq, event in log.events if seq > since_seq]
+
+    def clear(self):
+        self._logs.clear()
+
+    def __len__(self) -> int:
+        return len(self._logs)
+
+
+def load_missed_events(conversation_id: int, since_seq: int, limit: int) -> Tuple[List[EncodedEvent], int]:
+    """Eventos persistentes con seq > since_seq leídos de la base de datos.
+
+    Retorna los eventos en orden de secuencia y el último seq incluido. Si hay más
+    de `limit`, se termina con un evento resync para que el cliente recargue el
+    historial por la API en lugar de recibirlo todo por el socket.
+    """
+    db = SessionLocal()
+    try:
+        messages = get_messages_since_seq(
+            db, conversation_id, since_seq, limit + 1, options=loader_options(MessageWithSender)
+        )
+        translations = TranslatedMessageCRUD.get_by_conversation_since_seq(db, conversation_id, since_seq, limit + 1)
+        missed = [(m.seq, new_message_event(m, m.sender)) for m in messages]
+        missed += [(t.seq, translation_ready_event(t, conversation_id)) for t in translations]
+    finally:
+        db.close()
+
+    missed.sort(key=lambda item: item[0])
+    events = [encode_event(event) for _, event in missed[:limit]]
+    last_seq = missed[min(len(missed), limit) - 1][0] if missed else since_seq
+    if len(missed) > limit:
+        events.append(encode_event(ResyncEvent(conversation_id=conversation_id)))
+    return events, last_seq
+
+
+def load_event(conversation_id: int, seq: int) -> Optional[EncodedEvent]:
+    """Evento persistente con ese seq (referencias del backplane a eventos demasiado grandes)"""
+    events, _ = load_missed_events(conversation_id, seq - 1, 1)
+    if events and events[0].seq == seq:
+        return events[0]
+    return None
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Set, Tuple
+
+from app.websockets.events import TypingEvent
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Límite de frames entrantes de una conexión: `rate` por segundo con ráfagas de hasta `burst`"""
+    __slots__ = ("rate", "burst", "tokens", "updated_at", "dropped", "throttled")
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.dropped = 0
+        # True mientras se descartan frames seguidos (para avisar al cliente una sola vez)
+        self.throttled = False
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.throttled = False
+            return True
+        self.dropped += 1
+        self.throttled = True
+        return False
+
+
+class TypingCoalescer:
+    """Estado de "escribiendo" por usuario y conversación en este worker.
+
+    Solo se difunde el cambio de estado: el primer frame de escritura emite
+    is_typing=true y los siguientes solo renuevan el plazo. Sin frames durante
+    `timeout` segundos, o con un is_typing=false explícito, se emite is_typing=false.
+    """
+
+    def __init__(self, broadcast: Callable[..., Awaitable[None]], timeout: float = 6.0):
+        self.broadcast = broadcast
+        self.timeout = timeout
+        self._expiry: Dict[Tuple[str, int], asyncio.TimerHandle] = {}
+        # Stops lanzados desde callbacks síncronos (plazo vencido, discard)
+        self._tasks: Set[asyncio.Task] = set()
+        self.suppressed = 0
+
+    def is_typing(self, conversation_id: str, user_id: int) -> bool:
+        return (conversation_id, user_id) in self._expiry
+
+    async def update(self, conversation_id: str, user_id: int, is_typing: bool):
+        if is_typing:
+            await self.start(conversation_id, user_id)
+        else:
+            await self.stop(conversation_id, user_id)
+
+    async def start(self, conversation_id: str, user_id: int):
+        key = (conversation_id, user_id)
+        timer = self._expiry.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        self._expiry[key] = asyncio.get_event_loop().call_later(self.timeout, self._expire, conversation_id, user_id)
+        if timer is not None:
+            self.suppressed += 1
+            return
+        await self._publish(conversation_id, user_id, True)
+
+    async def stop(self, conversation_id: str, user_id: int):
+        timer = self._expiry.pop((conversation_id, user_id), None)
+        if timer is None:
+            self.suppressed += 1
+            return
+        timer.cancel()
+        await self._publish(conversation_id, user_id, False)
+
+    def discard(self, conversation_id: str, user_id: int):
+        """El usuario dejó la conversación: emitir el stop pendiente sin esperar al plazo"""
+        if (conversation_id, user_id) in self._expiry:
+            self._spawn_stop(conversation_id, user_id)
+
+    def clear(self):
+        for timer in self._expiry.values():
+            timer.cancel()
+        self._expiry.clear()
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+
+    def _expire(self, conversation_id: str, user_id: int):
+        self._spawn_stop(conversation_id, user_id)
+
+    def _spawn_stop(self, conversation_id: str, user_id: int):
+        task = asyncio.ensure_future(self.stop(conversation_id, user_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._on_stop_done)
+
+    def _on_stop_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Error broadcasting typing stop: {task.exception()}")
+
+    async def _publish(self, conversation_id: str, user_id: int, is_typing: bool):
+        await self.broadcast(
+            TypingEvent(user_id=user_id, conversation_id=int(conversation_id), is_typing=is_typing),
+            conversation_id,
+            exclude_user=user_id
+        )
+
+    def stats(self) -> Dict[str, int]:
+        return {"typing": len(self._expiry), "typing_suppressed": self.suppressed}
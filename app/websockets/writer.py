@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, Hashable, Optional, Tuple
+
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+# Qué hacer cuando la cola de salida de un cliente lento está llena
+POLICY_DROP = "drop"              # descartar el evento más antiguo pendiente
+POLICY_COALESCE = "coalesce"      # reemplazar el pendiente con la misma clave; si no hay, descartar el más antiguo
+POLICY_DISCONNECT = "disconnect"  # cerrar el socket (el cliente reconecta y recupera el historial)
+SLOW_CONSUMER_POLICIES = (POLICY_DROP, POLICY_COALESCE, POLICY_DISCONNECT)
+
+
+class ConnectionWriter:
+    """Cola de salida acotada y tarea escritora de un WebSocket.
+
+    enqueue() nunca espera: un cliente lento solo retrasa su propia cola y no la
+    entrega al resto de la conversación.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        on_dead: Callable[[WebSocket], Awaitable[None]],
+        max_queue: int = 256,
+        policy: str = POLICY_DROP,
+        send_timeout: float = 10.0
+    ):
+        self.websocket = websocket
+        self.on_dead = on_dead
+        self.max_queue = max_queue
+        self.policy = policy if policy in SLOW_CONSUMER_POLICIES else POLICY_DROP
+        self.send_timeout = send_timeout
+        self._queue: Deque[Tuple[Optional[Hashable], str]] = deque()
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closer: Optional[asyncio.Task] = None
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    def close(self):
+        """Detener la tarea escritora y descartar lo pendiente"""
+        self.closed = True
+        self._queue.clear()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._task = None
+
+    def enqueue(self, text: str, coalesce_key: Optional[Hashable] = None) -> bool:
+        """Encolar un frame; retorna False si se descartó o si la conexión se cierra"""
+        if self.closed:
+            return False
+
+        if coalesce_key is not None and self.policy == POLICY_COALESCE:
+            for index, (key, _) in enumerate(self._queue):
+                if key == coalesce_key:
+                    self._queue[index] = (coalesce_key, text)
+                    self.coalesced += 1
+                    return True
+
+        if len(self._queue) >= self.max_queue:
+            if self.policy == POLICY_DISCONNECT:
+                logger.warning(f"Closing slow WebSocket consumer ({len(self._queue)} frames pending)")
+                self.closed = True
+                self._queue.clear()
+                self._closer = asyncio.ensure_future(self._close_slow_consumer())
+                self._closer.add_done_callback(self._log_closer_error)
+                return False
+            self._queue.popleft()
+            self.dropped += 1
+
+        self._queue.append((coalesce_key, text))
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._ready.set()
+        return True
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+        }
+
+    async def _run(self):
+        while not self.closed:
+            if not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            _, text = self._queue.popleft()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(text), timeout=self.send_timeout)
+                self.sent += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error writing to WebSocket: {e}")
+                self.closed = True
+                await self.on_dead(self.websocket)
+                return
+
+    def _log_closer_error(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Error closing slow WebSocket consumer: {task.exception()}")
+
+    async def _close_slow_consumer(self):
+        try:
+            # 1013: "try again later"
+            await self.websocket.close(code=1013)
+        except Exception:
+            pass
+        await self.on_dead(self.websocket)
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import os
+from contextlib import contextmanager
+
+# Los módulos de la app crean sus motores al importarse: usar SQLite en memoria
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, StaticPool
+
+from app.api.dependencies import get_current_user, get_db
+from app.api.endpoints import api_router
+from app.core.config import settings
+from app.core.membership_cache import membership_cache
+from app.db.database import Base, get_async_db
+import app.models  # noqa: F401  (registrar todos los modelos en Base.metadata)
+
+
+class QueryCounter:
+    """Cuenta las sentencias SQL que se ejecutan en un motor"""
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine):
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # Archivo SQLite (no :memory:) para que el motor async vea los mismos datos
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    with engine.connect() as conn:
+        # Base de datos desechable: sin fsync en cada sentencia
+        conn.exec_driver_sql("PRAGMA journal_mode=MEMORY")
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def async_session_factory(engine):
+    """AsyncSession (aiosqlite) sobre la misma base de datos que `engine`.
+
+    Sin pool: cada sesión abre y cierra su conexión, así no quedan hilos de
+    aiosqlite vivos entre los bucles de eventos del TestClient y de los tests.
+    """
+    async_engine = create_async_engine(
+        str(engine.url).replace("sqlite://", "sqlite+aiosqlite://", 1), poolclass=NullPool
+    )
+    yield sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def make_client(engine, async_session_factory):
+    """Cliente de la API autenticado como el usuario dado, sobre la base de datos de prueba"""
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        session = SessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    async def override_get_async_db():
+        async with async_session_factory() as session:
+            yield session
+
+    def factory(user):
+        api = FastAPI()
+        api.include_router(api_router, prefix=settings.API_V1_STR)
+        api.dependency_overrides[get_db] = override_get_db
+        api.dependency_overrides[get_async_db] = override_get_async_db
+        api.dependency_overrides[get_current_user] = lambda: user
+        return TestClient(api)
+
+    membership_cache.clear()
+    yield factory
+    membership_cache.clear()
+
+
+@pytest.fixture
+def assert_max_queries(engine):
+    """Falla si el bloque ejecuta más de `limit` sentencias SQL (detecta N+1)"""
+
+    @contextmanager
+    def check(limit: int):
+        with count_queries(engine) as counter:
+            yield counter
+        assert counter.count <= limit, (
+            f"Expected at most {limit} SQL statements, got {counter.count}:\n"
+            + "\n".join(counter.statements)
+        )
+
+    return check
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """Ejecutar los tests `async def` en su propio bucle de eventos"""
+    if asyncio.iscoroutinefunction(pyfuncitem.obj):
+        arguments = {name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}
+        asyncio.run(pyfuncitem.obj(**arguments))
+        return True
+    return None
+
+
+class FakeWebSocket:
+    """Doble de starlette.websockets.WebSocket para ConnectionManager: guarda los frames enviados"""
+
+    class _State:
+        value = 1  # CONNECTED
+
+    client_state = _State()
+
+    # Como starlette.websockets.WebSocket (un Mapping): no es hashable
+    __hash__ = None
+
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+
+    async def send_text(self, text: str):
+        self.sent.append(text)
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+    @property
+    def events(self):
+        return [json.loads(text) for text in self.sent]
+
+
+@pytest.fixture
+def make_websocket():
+    """Fábrica de FakeWebSocket"""
+    return FakeWebSocket
@@ -0,0 +1,71 @@
+import pytest
+
+from app.models import Conversation, Message, Participant, User
+from app.services import messages_service
+from app.services.translation_queue import InMemoryTranslationJobStore
+
+
+@pytest.fixture
+def chat(db, monkeypatch):
+    """Conversación con un participante y un usuario ajeno; traducciones en una cola en memoria"""
+    store = InMemoryTranslationJobStore()
+    monkeypatch.setattr(messages_service.translation_queue, "store", store)
+    conversation = Conversation()
+    member = User(username="ana", email="ana@example.com", hashed_password="x", is_active=True)
+    outsider = User(username="luis", email="luis@example.com", hashed_password="x", is_active=True)
+    db.add_all([conversation, member, outsider])
+    db.flush()
+    db.add(Participant(user_id=member.id, conversation_id=conversation.id))
+    db.commit()
+    for user in (member, outsider):
+        db.refresh(user)
+        db.expunge(user)
+    return conversation.id, member, outsider, store
+
+
+def test_create_text_message(make_client, db, chat):
+    conversation_id, member, _, store = chat
+
+    response = make_client(member).post(
+        "/api/v1/messages/", data={"conversation_id": conversation_id, "content_type": "text", "content": "hola"}
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["content"] == "hola"
+    assert body["seq"] == 1
+    message = db.query(Message).filter(Message.id == body["id"]).one()
+    assert (message.sender_id, message.seq) == (member.id, 1)
+    assert db.query(Conversation.last_seq).filter(Conversation.id == conversation_id).scalar() == 1
+    assert store.get_status(message.id)["status"] == "pending"
+
+
+def test_create_message_requires_membership(make_client, chat):
+    conversation_id, _, outsider, _ = chat
+    client = make_client(outsider)
+
+    response = client.post(
+        "/api/v1/messages/", data={"conversation_id": conversation_id, "content_type": "text", "content": "hola"}
+    )
+    assert response.status_code == 403
+    missing = client.post("/api/v1/messages/", data={"conversation_id": 999, "content_type": "text", "content": "hola"})
+    assert missing.status_code == 404
+
+
+def test_upload_message_audio(make_client, db, chat, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conversation_id, member, _, _ = chat
+
+    response = make_client(member).post(
+        "/api/v1/audio/upload-message-audio",
+        data={"conversation_id": conversation_id},
+        files={"audio_file": ("nota.wav", b"RIFF audio", "audio/wav")}
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    message = db.query(Message).filter(Message.id == body["message_id"]).one()
+    assert message.media_url == body["audio_url"]
+    assert message.media_hash is not None
+    assert message.seq == 1
+    assert (tmp_path / "uploads" / "audio" / "messages" / f"conv_{conversation_id}").is_dir()
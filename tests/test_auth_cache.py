@@ -0,0 +1,69 @@
+import pytest
+
+from app.api.dependencies import get_user_from_token_payload
+from app.core import auth_cache
+from app.core.auth_cache import principal_cache
+from app.crud import user as user_crud
+from app.models import User
+from app.schemas.user import UserUpdate
+
+
+@pytest.fixture
+def user(db):
+    principal_cache.clear()
+    user = User(username="ana", email="ana@example.com", hashed_password="x", primary_language="es", is_active=True)
+    db.add(user)
+    db.commit()
+    yield user
+    principal_cache.clear()
+
+
+def _payload(user):
+    return {"sub": user.username, "uid": user.id}
+
+
+def test_cached_principal_skips_the_database(db, user, assert_max_queries):
+    payload = _payload(user)
+    first = get_user_from_token_payload(db, payload)
+
+    with assert_max_queries(0):
+        assert get_user_from_token_payload(db, payload) is first
+    # Los tokens antiguos (solo username) también se resuelven desde la caché
+    with assert_max_queries(0):
+        assert get_user_from_token_payload(db, {"sub": "ana"}) is first
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(auth_cache.time, "monotonic", lambda: now[0])
+    cache = auth_cache.PrincipalCache(ttl_seconds=30)
+    cached = User(id=1, username="ana")
+    cache.set(cached)
+
+    now[0] += 29
+    assert cache.get(user_id=1) is cached
+    now[0] += 2
+    assert cache.get(username="ana") is None
+    assert cache.get(user_id=1) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_update_invalidates_the_cached_principal(db, user):
+    payload = _payload(user)
+    get_user_from_token_payload(db, payload)
+
+    user_crud.update_user(db, db.query(User).get(user.id), UserUpdate(primary_language="en"))
+    assert get_user_from_token_payload(db, payload).primary_language == "en"
+
+    # Un token emitido con el nombre anterior deja de valer tras el cambio
+    user_crud.update_user(db, db.query(User).get(user.id), UserUpdate(username="ana2"))
+    assert get_user_from_token_payload(db, payload) is None
+
+
+def test_delete_invalidates_the_cached_principal(db, user):
+    payload = _payload(user)
+    assert get_user_from_token_payload(db, payload) is not None
+
+    user_crud.delete_user(db, user.id)
+    assert principal_cache.get(user_id=payload["uid"]) is None
+    assert get_user_from_token_payload(db, payload) is None
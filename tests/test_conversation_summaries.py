@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import crud
+from app.models import Conversation, Message, Participant, User
+from app.models.message import ContentType
+
+T0 = datetime(2024, 5, 1, 12, 0)
+
+
+def _user(db, name):
+    user = User(username=name, email=f"{name}@example.com", hashed_password="x", is_active=True)
+    db.add(user)
+    db.flush()
+    return user
+
+
+def _message(db, conversation, sender, content, minutes):
+    message = Message(
+        conversation_id=conversation.id, sender_id=sender.id, content_type=ContentType.TEXT,
+        content=content, created_at=T0 + timedelta(minutes=minutes)
+    )
+    db.add(message)
+    db.flush()
+    return message
+
+
+@pytest.fixture
+def summaries(db):
+    """
+    - chat (ana y luis): tres mensajes, los dos últimos con el mismo created_at;
+      ana leyó hasta el primero, luis no tiene cursor
+    - solo (luis): sin mensajes, actualizada después de chat
+    """
+    ana, luis = _user(db, "ana"), _user(db, "luis")
+    chat = Conversation(updated_at=T0)
+    solo = Conversation(updated_at=T0 + timedelta(hours=1))
+    db.add_all([chat, solo])
+    db.flush()
+
+    first = _message(db, chat, luis, "hola", 0)
+    _message(db, chat, ana, "qué tal", 1)
+    last = _message(db, chat, luis, "bien", 1)
+    db.add_all([
+        Participant(user_id=ana.id, conversation_id=chat.id, last_read_message_id=first.id),
+        Participant(user_id=luis.id, conversation_id=chat.id),
+        Participant(user_id=luis.id, conversation_id=solo.id),
+    ])
+    db.commit()
+    ids = {"chat": chat.id, "solo": solo.id, "last": last.id}
+    for user in (ana, luis):
+        db.refresh(user)
+        db.expunge(user)
+    return ana, luis, ids
+
+
+def test_summaries_include_last_message_and_unread_counts(make_client, summaries, assert_max_queries):
+    ana, luis, ids = summaries
+
+    with assert_max_queries(1):
+        response = make_client(ana).get("/api/v1/conversations/summaries")
+    assert response.status_code == 200
+    [chat] = response.json()
+    assert chat["id"] == ids["chat"]
+    assert (chat["participant_count"], chat["message_count"]) == (2, 3)
+    # Empate en created_at: gana el id más alto
+    assert chat["last_message_id"] == ids["last"]
+    # Solo el último de luis está por encima del cursor; el propio no cuenta
+    assert chat["unread_count"] == 1
+
+    solo, chat = make_client(luis).get("/api/v1/conversations/summaries").json()
+    assert (solo["id"], solo["message_count"], solo["last_message_id"], solo["unread_count"]) == (ids["solo"], 0, None, 0)
+    assert chat["unread_count"] == 1
+
+
+def test_all_conversations_have_no_unread_count(db, summaries):
+    rows = crud.get_conversation_summaries(db)
+    assert [row["id"] for row in rows] == [summaries[2]["solo"], summaries[2]["chat"]]
+    assert "unread_count" not in rows[0]
+    assert rows[1]["last_message_id"] == summaries[2]["last"]
@@ -0,0 +1,51 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.db.database import engine_options, to_async_database_url
+from app.main import app
+
+
+def test_async_url_uses_the_async_driver():
+    assert to_async_database_url("postgresql://u:p@db:5432/app") == "postgresql+asyncpg://u:p@db:5432/app"
+    assert to_async_database_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+    assert to_async_database_url("postgresql+asyncpg://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+
+
+def test_sqlite_has_no_server_pool_options():
+    assert engine_options("sqlite:///./test.db") == {"connect_args": {"check_same_thread": False}}
+
+
+def test_pool_and_statement_timeout_options(monkeypatch):
+    monkeypatch.setattr(settings, "DB_PGBOUNCER_MODE", False)
+    monkeypatch.setattr(settings, "DB_STATEMENT_TIMEOUT_MS", 5000)
+
+    options = engine_options("postgresql://u:p@db/app")
+    assert options["pool_size"] == settings.DB_POOL_SIZE
+    assert options["max_overflow"] == settings.DB_MAX_OVERFLOW
+    assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
+    assert engine_options("postgresql+asyncpg://u:p@db/app")["connect_args"] == {
+        "server_settings": {"statement_timeout": "5000"}
+    }
+
+
+def test_pgbouncer_mode_disables_the_pool_and_prepared_statements(monkeypatch):
+    monkeypatch.setattr(settings, "DB_PGBOUNCER_MODE", True)
+    monkeypatch.setattr(settings, "DB_STATEMENT_TIMEOUT_MS", 5000)
+
+    options = engine_options("postgresql+asyncpg://u:p@db/app")
+    assert options["poolclass"] is NullPool
+    assert "pool_size" not in options
+    assert options["connect_args"] == {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+    # El timeout no se manda como parámetro de arranque a PgBouncer
+    assert "connect_args" not in engine_options("postgresql://u:p@db/app")
+
+
+def test_pool_status_requires_the_ops_token(monkeypatch):
+    client = TestClient(app)
+    monkeypatch.setattr(settings, "OPS_TOKEN", "s3cret")
+
+    assert client.get("/health/db").status_code == 403
+    response = client.get("/health/db", headers={"X-Ops-Token": "s3cret"})
+    assert response.status_code == 200
+    assert "sync" in response.json()
@@ -0,0 +1,84 @@
+from email.utils import formatdate
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.api.file_responses import audio_file_response
+
+CONTENT = bytes(range(100))
+
+
+@pytest.fixture
+def serve(tmp_path):
+    def serve(content: bytes = CONTENT) -> TestClient:
+        path = tmp_path / "audio.wav"
+        path.write_bytes(content)
+        app = FastAPI()
+
+        @app.get("/audio")
+        def audio(request: Request):
+            return audio_file_response(request, str(path), media_type="audio/wav")
+
+        return TestClient(app)
+
+    return serve
+
+
+def test_range_returns_partial_content(serve):
+    client = serve()
+
+    response = client.get("/audio", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == "bytes 10-19/100"
+    assert response.content == CONTENT[10:20]
+
+    suffix = client.get("/audio", headers={"Range": "bytes=-5"})
+    assert suffix.status_code == 206
+    assert suffix.content == CONTENT[-5:]
+
+
+def test_unsatisfiable_range(serve):
+    response = serve().get("/audio", headers={"Range": "bytes=200-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */100"
+
+
+def test_suffix_range_on_an_empty_file(serve):
+    response = serve(b"").get("/audio", headers={"Range": "bytes=-5"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */0"
+
+
+def test_if_none_match_uses_weak_comparison(serve):
+    client = serve()
+    etag = client.get("/audio").headers["etag"]
+
+    assert client.get("/audio", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/audio", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    assert client.get("/audio", headers={"If-None-Match": '"otro"'}).status_code == 200
+
+
+def test_if_modified_since(serve):
+    client = serve()
+    last_modified = client.get("/audio").headers["last-modified"]
+
+    assert client.get("/audio", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get("/audio", headers={"If-Modified-Since": formatdate(0, usegmt=True)}).status_code == 200
+
+
+def test_if_range_needs_a_strong_validator(serve):
+    client = serve()
+    first = client.get("/audio")
+    etag, last_modified = first.headers["etag"], first.headers["last-modified"]
+
+    def get(if_range):
+        return client.get("/audio", headers={"Range": "bytes=0-9", "If-Range": if_range})
+
+    assert get(etag).status_code == 206
+    assert get(last_modified).status_code == 206
+    # Un validador débil o distinto sirve el archivo completo
+    for stale in (f"W/{etag}", '"otro"', formatdate(0, usegmt=True)):
+        response = get(stale)
+        assert response.status_code == 200
+        assert response.content == CONTENT
@@ -0,0 +1,103 @@
+import io
+import os
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.orm import sessionmaker
+
+from app.services import file_storage
+from app.services.file_storage import FileStorageService
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return FileStorageService(base_path=str(tmp_path))
+
+
+def _upload(content: bytes) -> UploadFile:
+    upload = UploadFile("nota.wav", io.BytesIO(content))
+    upload.content_type = "audio/wav"
+    return upload
+
+
+async def test_identical_uploads_share_one_blob(storage):
+    first, content_hash = await storage.save_message_audio_file(_upload(b"audio"), 1, 1)
+    second, same_hash = await storage.save_message_audio_file(_upload(b"audio"), 2, 1)
+
+    assert content_hash == same_hash
+    assert storage.get_blob_ref_count(content_hash) == 2
+
+    storage.delete_audio_file(first, content_hash)
+    assert storage.get_blob_ref_count(content_hash) == 1
+    storage.delete_audio_file(second, content_hash)
+    assert not os.path.exists(storage.get_blob_file_path(content_hash))
+    # Sin archivos de staging olvidados
+    assert [name for name in os.listdir(storage.blob_path) if name.startswith("upload_")] == []
+
+
+async def test_blob_released_before_linking_is_stored_again(storage, monkeypatch):
+    path, content_hash = await storage.save_message_audio_file(_upload(b"audio"), 1, 1)
+    link = os.link
+
+    def link_after_release(src, dst):
+        # Otro proceso borra la última referencia justo antes del enlace
+        if os.path.exists(path):
+            os.remove(path)
+            os.remove(src)
+        link(src, dst)
+
+    monkeypatch.setattr(file_storage.os, "link", link_after_release)
+    second, _ = await storage.save_message_audio_file(_upload(b"audio"), 2, 1)
+
+    with open(second, "rb") as f:
+        assert f.read() == b"audio"
+    assert storage.get_blob_ref_count(content_hash) == 1
+
+
+async def test_oversized_upload_is_rejected_and_the_partial_file_removed(storage, tmp_path, monkeypatch):
+    monkeypatch.setattr(file_storage, "UPLOAD_CHUNK_SIZE", 2)
+    target = tmp_path / "nota.wav"
+
+    with pytest.raises(HTTPException) as error:
+        await storage._stream_to_disk(_upload(b"123456"), str(target), 4, "demasiado grande")
+    assert error.value.status_code == 413
+    # Los dos primeros bloques ya se habían escrito en el .part
+    assert not target.exists()
+    assert not (tmp_path / "nota.wav.part").exists()
+
+    size, _ = await storage._stream_to_disk(_upload(b"1234"), str(target), 4, "demasiado grande")
+    assert size == 4 and target.read_bytes() == b"1234"
+
+
+async def test_index_is_only_built_at_startup(storage, tmp_path, engine, monkeypatch):
+    monkeypatch.setattr(file_storage, "SessionLocal", sessionmaker(bind=engine))
+    conversation_dir = tmp_path / "messages" / "conv_1"
+    conversation_dir.mkdir(parents=True)
+    (conversation_dir / "viejo.wav").write_bytes(b"audio")
+
+    index = file_storage.AudioFileIndex(persist=True)
+    # Sin construir no se sabe dónde buscar: solo la tabla
+    assert await index.get_async("viejo.wav") is None
+
+    await index.add_async("nuevo.wav", "/ruta/nuevo.wav")
+    other_process = file_storage.AudioFileIndex(persist=True)
+    assert await other_process.get_async("nuevo.wav") == "/ruta/nuevo.wav"
+
+    index.build(storage.message_audio_path)
+    assert await index.get_async("viejo.wav") == str(conversation_dir / "viejo.wav")
+    await index.remove_async("nuevo.wav")
+    assert await file_storage.AudioFileIndex(persist=True).get_async("nuevo.wav") is None
+
+
+async def test_index_miss_falls_back_to_the_conversation_directories(storage, tmp_path):
+    index = file_storage.AudioFileIndex()
+    index.build(storage.message_audio_path)
+    # Guardado por otro worker después del arranque, sin índice persistido
+    conversation_dir = tmp_path / "messages" / "conv_7"
+    conversation_dir.mkdir()
+    (conversation_dir / "otro.wav").write_bytes(b"audio")
+
+    assert await index.get_async("otro.wav") == str(conversation_dir / "otro.wav")
+    assert len(index) == 1
+    assert await index.get_async("falta.wav") is None
+    assert await index.get_async("../conv_7/otro.wav") is None
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import Conversation, Message, Participant, TranslatedMessage, User
+from app.models.message import ContentType
+
+T0 = datetime(2024, 5, 1, 12, 0)
+
+
+def _user(db, name):
+    user = User(username=name, email=f"{name}@example.com", hashed_password="x", is_active=True)
+    db.add(user)
+    db.flush()
+    return user
+
+
+def _message(db, conversation, sender, content, minutes):
+    message = Message(
+        conversation_id=conversation.id, sender_id=sender.id, content_type=ContentType.TEXT,
+        content=content, created_at=T0 + timedelta(minutes=minutes)
+    )
+    db.add(message)
+    db.flush()
+    return message
+
+
+@pytest.fixture
+def inbox(db):
+    """
+    ana participa en dos conversaciones:
+    - chat (con luis): cuatro mensajes, los dos últimos con el mismo created_at;
+      ana leyó hasta el primero y el último tiene traducción
+    - empty (con eva): sin mensajes, creada después del último mensaje de chat
+    y no participa en una tercera (solo luis)
+    """
+    ana, luis, eva = _user(db, "ana"), _user(db, "luis"), _user(db, "eva")
+    chat = Conversation(created_at=T0)
+    empty = Conversation(created_at=T0 + timedelta(hours=1))
+    other = Conversation(created_at=T0 + timedelta(hours=2))
+    db.add_all([chat, empty, other])
+    db.flush()
+
+    first = _message(db, chat, luis, "hola", 0)
+    _message(db, chat, ana, "qué tal", 1)
+    _message(db, chat, luis, "bien", 2)
+    last = _message(db, chat, luis, "¿y tú?", 2)
+    db.add(TranslatedMessage(original_message_id=last.id, target_language="es", translated_content="and you?"))
+    _message(db, other, luis, "solo", 3)
+
+    db.add_all([
+        Participant(user_id=ana.id, conversation_id=chat.id, last_read_message_id=first.id),
+        Participant(user_id=luis.id, conversation_id=chat.id),
+        Participant(user_id=ana.id, conversation_id=empty.id),
+        Participant(user_id=eva.id, conversation_id=empty.id),
+        Participant(user_id=luis.id, conversation_id=other.id),
+    ])
+    db.commit()
+    ids = {"chat": chat.id, "empty": empty.id, "last": last.id, "luis": luis.id, "eva": eva.id}
+    db.refresh(ana)
+    db.expunge(ana)
+    return ana, ids
+
+
+def test_inbox_lists_last_message_and_unread_counts(make_client, inbox, assert_max_queries):
+    ana, ids = inbox
+    client = make_client(ana)
+
+    with assert_max_queries(4):
+        response = client.get("/api/v1/conversations/inbox")
+    assert response.status_code == 200
+    empty, chat = response.json()
+
+    assert empty["conversation_id"] == ids["empty"]
+    assert empty["last_message"] is None
+    assert empty["unread_count"] == 0
+    assert [p["username"] for p in empty["participants"]] == ["eva"]
+
+    assert chat["conversation_id"] == ids["chat"]
+    # Empate en created_at: gana el id más alto
+    assert chat["last_message"]["id"] == ids["last"]
+    assert chat["last_message"]["content"] == "¿y tú?"
+    assert chat["has_translation"] is True
+    # Los dos de luis después del cursor de lectura; el propio de ana no cuenta
+    assert chat["unread_count"] == 2
+    assert [p["id"] for p in chat["participants"]] == [ids["luis"]]
+
+
+def test_inbox_pages_by_last_activity(make_client, inbox):
+    ana, ids = inbox
+    client = make_client(ana)
+
+    first = client.get("/api/v1/conversations/inbox", params={"limit": 1}).json()
+    second = client.get("/api/v1/conversations/inbox", params={"limit": 1, "skip": 1}).json()
+    assert [entry["conversation_id"] for entry in first + second] == [ids["empty"], ids["chat"]]
@@ -0,0 +1,125 @@
+import pytest
+from sqlalchemy import event
+
+from app import crud
+from app.core import membership_cache as membership_cache_module
+from app.core.membership_cache import MembershipCache, PostgresInvalidationChannel, membership_cache
+from app.models import Conversation, User
+from app.schemas.participant import ParticipantCreate
+
+
+def _user(db, name):
+    user = User(username=name, email=f"{name}@example.com", hashed_password="x", is_active=True)
+    db.add(user)
+    db.flush()
+    return user
+
+
+@pytest.fixture
+def chat(db):
+    """ana está en la conversación; luis todavía no"""
+    membership_cache.clear()
+    ana, luis = _user(db, "ana"), _user(db, "luis")
+    conversation = Conversation()
+    db.add(conversation)
+    db.commit()
+    crud.create_participant(db, ParticipantCreate(user_id=ana.id, conversation_id=conversation.id))
+    yield conversation.id, ana.id, luis.id
+    membership_cache.clear()
+
+
+def test_cached_members_skip_the_database(db, chat, assert_max_queries):
+    conversation_id, ana_id, luis_id = chat
+
+    assert membership_cache.is_member(db, ana_id, conversation_id)
+    with assert_max_queries(0):
+        assert membership_cache.is_member(db, ana_id, conversation_id)
+        assert not membership_cache.is_member(db, luis_id, conversation_id)
+
+
+def test_participant_changes_are_visible_on_the_next_check(db, chat):
+    conversation_id, ana_id, luis_id = chat
+    assert not membership_cache.is_member(db, luis_id, conversation_id)
+
+    participant = crud.create_participant_if_absent(
+        db, ParticipantCreate(user_id=luis_id, conversation_id=conversation_id)
+    )
+    assert membership_cache.is_member(db, luis_id, conversation_id)
+
+    crud.delete_participant(db, participant.id)
+    assert not membership_cache.is_member(db, luis_id, conversation_id)
+
+    crud.delete_conversation(db, conversation_id)
+    assert not membership_cache.is_member(db, ana_id, conversation_id)
+
+
+def test_entries_expire_after_the_ttl(db, chat, monkeypatch):
+    conversation_id, ana_id, _ = chat
+    now = [1000.0]
+    monkeypatch.setattr(membership_cache_module.time, "monotonic", lambda: now[0])
+    cache = MembershipCache(ttl_seconds=30)
+
+    cache.is_member(db, ana_id, conversation_id)
+    now[0] += 29
+    cache.is_member(db, ana_id, conversation_id)
+    now[0] += 2
+    cache.is_member(db, ana_id, conversation_id)
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_fill_racing_an_invalidation_is_discarded(db, engine, chat):
+    conversation_id, ana_id, _ = chat
+    cache = MembershipCache()
+
+    # Un alta/baja llega mientras se consulta la tabla participants
+    pending = [True]
+
+    def invalidate(*args):
+        if pending:
+            pending.pop()
+            cache.invalidate(conversation_id)
+
+    event.listen(engine, "before_cursor_execute", invalidate)
+    try:
+        assert cache.is_member(db, ana_id, conversation_id)
+    finally:
+        event.remove(engine, "before_cursor_execute", invalidate)
+    assert cache.stats()["size"] == 0
+
+    assert cache.is_member(db, ana_id, conversation_id)
+    assert cache.stats()["size"] == 1
+
+
+def test_versions_are_bounded():
+    cache = MembershipCache(max_size=2)
+    version = cache.version(1)
+    for conversation_id in range(1, 11):
+        cache.invalidate(conversation_id)
+    assert cache.stats()["versions"] == 2
+
+    # Descartar la versión no puede dar por buena una carga anterior a la invalidación
+    cache._store(1, frozenset({1}), version)
+    assert cache.stats()["size"] == 0
+
+    cache._store(1, frozenset({1}), cache.version(1))
+    cache._store(11, frozenset({1}), cache.version(11))
+    cache._store(12, frozenset({1}), cache.version(12))
+    assert cache.stats()["size"] == 2
+
+
+def test_notifications_from_other_processes_invalidate(db, chat, monkeypatch):
+    conversation_id, ana_id, _ = chat
+    cache = MembershipCache()
+    channel = PostgresInvalidationChannel(cache)
+    published = []
+    monkeypatch.setattr(channel, "publish", published.append)
+    cache._channel = channel
+
+    cache.is_member(db, ana_id, conversation_id)
+    channel.handle_notify(str(conversation_id))
+    channel.handle_notify("not-a-number")
+    assert cache.stats()["size"] == 0
+    # Lo recibido no se vuelve a publicar; lo local sí
+    assert published == []
+    cache.invalidate(conversation_id)
+    assert published == [conversation_id]
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import Conversation, Message, Participant, User
+from app.models.message import ContentType
+
+
+@pytest.fixture
+def history(db):
+    """Siete mensajes; los tres del medio comparten created_at (desempate por id)"""
+    conversation = Conversation()
+    user = User(username="ana", email="ana@example.com", hashed_password="x", is_active=True)
+    db.add_all([conversation, user])
+    db.flush()
+    db.add(Participant(user_id=user.id, conversation_id=conversation.id))
+    start = datetime(2024, 5, 1, 12, 0)
+    offsets = [0, 1, 2, 2, 2, 3, 4]
+    for i, offset in enumerate(offsets, start=1):
+        db.add(Message(
+            conversation_id=conversation.id, sender_id=user.id, content_type=ContentType.TEXT,
+            content=f"m{i}", created_at=start + timedelta(minutes=offset)
+        ))
+    db.commit()
+    db.refresh(user)
+    db.expunge(user)
+    return conversation.id, user
+
+
+def _page(client, conversation_id, **params):
+    response = client.get(f"/api/v1/messages/conversation/{conversation_id}", params={"limit": 3, **params})
+    assert response.status_code == 200
+    return [m["content"] for m in response.json()], response.headers
+
+
+def test_pages_backwards_and_forwards(make_client, history):
+    conversation_id, user = history
+    client = make_client(user)
+
+    latest, headers = _page(client, conversation_id, latest=True)
+    assert latest == ["m5", "m6", "m7"]
+
+    older, older_headers = _page(client, conversation_id, before=headers["X-Prev-Cursor"])
+    assert older == ["m2", "m3", "m4"]
+    oldest, oldest_headers = _page(client, conversation_id, before=older_headers["X-Prev-Cursor"])
+    assert oldest == ["m1"]
+    empty, empty_headers = _page(client, conversation_id, before=oldest_headers["X-Prev-Cursor"])
+    assert empty == []
+    assert "X-Prev-Cursor" not in empty_headers
+
+    newer, newer_headers = _page(client, conversation_id, after=oldest_headers["X-Next-Cursor"])
+    assert newer == ["m2", "m3", "m4"]
+    assert _page(client, conversation_id, after=newer_headers["X-Next-Cursor"])[0] == ["m5", "m6", "m7"]
+    assert _page(client, conversation_id, after=headers["X-Next-Cursor"])[0] == []
+
+
+def test_invalid_cursor_is_rejected(make_client, history):
+    conversation_id, user = history
+    client = make_client(user)
+
+    assert client.get(f"/api/v1/messages/conversation/{conversation_id}", params={"before": "nope"}).status_code == 400
+    both = client.get(f"/api/v1/messages/conversation/{conversation_id}", params={"before": "a", "after": "b"})
+    assert both.status_code == 400
+
+
+def test_cursor_headers_are_exposed_to_browsers():
+    response = TestClient(app).get("/", headers={"Origin": "http://example.com"})
+    exposed = {header.strip().lower() for header in response.headers["access-control-expose-headers"].split(",")}
+    assert {"x-prev-cursor", "x-next-cursor"} <= exposed
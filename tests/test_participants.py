@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app import crud
+from app.models import Conversation, Participant, User
+from app.schemas.participant import ParticipantCreate
+from app.services import participants_service
+
+
+def _user(db, name):
+    user = User(username=name, email=f"{name}@example.com", hashed_password="x", is_active=True)
+    db.add(user)
+    db.flush()
+    return user
+
+
+@pytest.fixture
+def chat(db, engine):
+    """ana está en la conversación; luis no. SQLite con claves foráneas activas"""
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+    ana, luis = _user(db, "ana"), _user(db, "luis")
+    conversation = Conversation()
+    db.add(conversation)
+    db.flush()
+    db.add(Participant(user_id=ana.id, conversation_id=conversation.id))
+    db.commit()
+    for user in (ana, luis):
+        db.refresh(user)
+        db.expunge(user)
+    return conversation.id, ana, luis
+
+
+def test_create_if_absent_inserts_once(db, chat):
+    conversation_id, _, luis = chat
+    data = ParticipantCreate(user_id=luis.id, conversation_id=conversation_id)
+
+    participant = crud.create_participant_if_absent(db, data)
+    assert (participant.user_id, participant.conversation_id) == (luis.id, conversation_id)
+    assert crud.create_participant_if_absent(db, data) is None
+    assert db.query(Participant).filter(Participant.user_id == luis.id).count() == 1
+
+
+def test_create_if_absent_raises_on_foreign_key_violations(db, chat):
+    conversation_id, _, luis = chat
+
+    with pytest.raises(IntegrityError):
+        crud.create_participant_if_absent(db, ParticipantCreate(user_id=luis.id, conversation_id=conversation_id + 100))
+    with pytest.raises(IntegrityError):
+        crud.create_participant_if_absent(db, ParticipantCreate(user_id=luis.id + 100, conversation_id=conversation_id))
+    assert db.query(Participant).count() == 1
+
+
+def test_add_participant_endpoint(make_client, chat):
+    conversation_id, ana, luis = chat
+    client = make_client(ana)
+
+    response = client.post("/api/v1/participants/", json={"user_id": luis.id, "conversation_id": conversation_id})
+    assert response.status_code == 200
+    assert response.json()["user"]["username"] == "luis"
+
+    again = client.post("/api/v1/participants/", json={"user_id": luis.id, "conversation_id": conversation_id})
+    assert again.status_code == 400
+    missing = client.post("/api/v1/participants/", json={"user_id": luis.id + 100, "conversation_id": conversation_id})
+    assert missing.status_code == 404
+
+
+def test_conversation_deleted_during_add_is_not_found(make_client, chat, monkeypatch):
+    conversation_id, ana, luis = chat
+
+    def create(db, participant):
+        raise IntegrityError("INSERT", {}, Exception("FOREIGN KEY constraint failed"))
+
+    monkeypatch.setattr(participants_service, "create_participant_if_absent", create)
+    response = make_client(ana).post(
+        "/api/v1/participants/", json={"user_id": luis.id, "conversation_id": conversation_id}
+    )
+    assert response.status_code == 404
@@ -0,0 +1,89 @@
+import pytest
+
+from app.models import User, Conversation, Participant, Message
+from app.models.message import ContentType
+
+SENDERS = 10
+MESSAGES_PER_SENDER = 3
+
+
+@pytest.fixture
+def conversation(db):
+    """Conversación con varios participantes y mensajes de cada uno"""
+    conversation = Conversation()
+    db.add(conversation)
+    db.flush()
+    users = []
+    for i in range(SENDERS):
+        user = User(
+            username=f"user{i}",
+            email=f"user{i}@example.com",
+            hashed_password="not-a-real-hash",
+            primary_language="es",
+            is_active=True
+        )
+        db.add(user)
+        db.flush()
+        db.add(Participant(user_id=user.id, conversation_id=conversation.id))
+        users.append(user)
+    for _ in range(MESSAGES_PER_SENDER):
+        for user in users:
+            db.add(Message(
+                conversation_id=conversation.id,
+                sender_id=user.id,
+                content_type=ContentType.TEXT,
+                content=f"hola de {user.username}"
+            ))
+    db.commit()
+    for user in users:
+        db.refresh(user)
+        db.expunge(user)
+    return conversation.id, users
+
+
+def test_read_messages_does_not_lazy_load_senders(conversation, make_client, assert_max_queries):
+    conversation_id, users = conversation
+    client = make_client(users[0])
+
+    with assert_max_queries(8):
+        response = client.get(f"/api/v1/messages/conversation/{conversation_id}")
+
+    assert response.status_code == 200
+    messages = response.json()
+    assert len(messages) == SENDERS * MESSAGES_PER_SENDER
+    assert {m["sender"]["id"] for m in messages} == {u.id for u in users}
+
+
+def test_read_messages_page_does_not_lazy_load_senders(conversation, make_client, assert_max_queries):
+    conversation_id, users = conversation
+    client = make_client(users[0])
+
+    with assert_max_queries(8):
+        response = client.get(f"/api/v1/messages/conversation/{conversation_id}?latest=true&limit=20")
+
+    assert response.status_code == 200
+    assert len(response.json()) == 20
+
+
+def test_read_conversation_detail_loads_relationships_in_bulk(conversation, make_client, assert_max_queries):
+    conversation_id, users = conversation
+    client = make_client(users[0])
+
+    with assert_max_queries(4):
+        response = client.get(f"/api/v1/conversations/{conversation_id}")
+
+    assert response.status_code == 200
+    detail = response.json()
+    assert len(detail["participants"]) == SENDERS
+    assert len(detail["messages"]) == SENDERS * MESSAGES_PER_SENDER
+
+
+def test_read_participants_does_not_lazy_load_users(conversation, make_client, assert_max_queries):
+    conversation_id, users = conversation
+    client = make_client(users[0])
+
+    with assert_max_queries(4):
+        response = client.get(f"/api/v1/participants/conversation/{conversation_id}")
+
+    assert response.status_code == 200
+    assert len(response.json()) == SENDERS
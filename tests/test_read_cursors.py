@@ -0,0 +1,139 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+from app.models import Conversation, Message, Participant, User
+from app.models.message import ContentType
+
+MIGRATION = Path(__file__).resolve().parent.parent / "alembic" / "versions" / "d7b2f9a4c318_add_participants_read_cursor.py"
+
+
+def _user(db, name):
+    user = User(username=name, email=f"{name}@example.com", hashed_password="x", is_active=True)
+    db.add(user)
+    db.flush()
+    return user
+
+
+def _message(db, conversation_id, sender, content, is_read=False):
+    message = Message(
+        conversation_id=conversation_id, sender_id=sender.id, content_type=ContentType.TEXT,
+        content=content, is_read=is_read
+    )
+    db.add(message)
+    db.flush()
+    return message
+
+
+@pytest.fixture
+def chat(db):
+    """ana y luis conversan (luis, ana, luis); en otra conversación hay un mensaje ajeno"""
+    ana, luis, eva = _user(db, "ana"), _user(db, "luis"), _user(db, "eva")
+    conversation, other = Conversation(), Conversation()
+    db.add_all([conversation, other])
+    db.flush()
+    db.add_all([
+        Participant(user_id=ana.id, conversation_id=conversation.id),
+        Participant(user_id=luis.id, conversation_id=conversation.id),
+        Participant(user_id=eva.id, conversation_id=other.id),
+    ])
+    ids = [_message(db, conversation.id, sender, text).id for sender, text in ((luis, "hola"), (ana, "qué tal"), (luis, "bien"))]
+    foreign = _message(db, other.id, eva, "hola").id
+    db.commit()
+    for user in (ana, luis, eva):
+        db.refresh(user)
+        db.expunge(user)
+    return {"conversation": conversation.id, "ana": ana, "luis": luis, "eva": eva, "messages": ids, "foreign": foreign}
+
+
+def _read_state(client, conversation_id):
+    response = client.get(f"/api/v1/messages/conversation/{conversation_id}")
+    assert response.status_code == 200
+    return [(m["content"], m["is_read"]) for m in response.json()]
+
+
+def _cursor(db, conversation_id, user):
+    db.expire_all()
+    return db.query(Participant.last_read_message_id).filter(
+        Participant.conversation_id == conversation_id, Participant.user_id == user.id
+    ).scalar()
+
+
+def test_is_read_for_received_and_sent_messages(make_client, db, chat):
+    conversation_id = chat["conversation"]
+    ana, luis = make_client(chat["ana"]), make_client(chat["luis"])
+
+    # Leer avanza el cursor de ana: lo recibido queda leído; lo enviado, no hasta que luis lea
+    assert _read_state(ana, conversation_id) == [("hola", True), ("qué tal", False), ("bien", True)]
+    assert _cursor(db, conversation_id, chat["ana"]) == chat["messages"][-1]
+
+    _read_state(luis, conversation_id)
+    assert _read_state(ana, conversation_id) == [("hola", True), ("qué tal", True), ("bien", True)]
+
+
+def test_unread_count_ignores_own_messages(make_client, chat):
+    conversation_id = chat["conversation"]
+    ana, luis = make_client(chat["ana"]), make_client(chat["luis"])
+
+    assert ana.get(f"/api/v1/messages/conversation/{conversation_id}/unread").json()["unread_count"] == 2
+    assert luis.get(f"/api/v1/messages/conversation/{conversation_id}/unread").json()["unread_count"] == 1
+
+
+def test_read_cursor_only_moves_forward(make_client, db, chat):
+    conversation_id = chat["conversation"]
+    first, _, last = chat["messages"]
+    client = make_client(chat["ana"])
+    url = f"/api/v1/messages/conversation/{conversation_id}/read"
+
+    response = client.post(url, params={"message_id": first}).json()
+    assert response == {"conversation_id": conversation_id, "last_read_message_id": first, "unread_count": 1}
+
+    # Repetir o retroceder no cambia nada (y no notifica)
+    assert client.post(url, params={"message_id": first}).json()["last_read_message_id"] is None
+    assert client.post(url).json()["last_read_message_id"] == last
+    assert client.post(url, params={"message_id": first}).json() == {
+        "conversation_id": conversation_id, "last_read_message_id": None, "unread_count": 0
+    }
+    assert _cursor(db, conversation_id, chat["ana"]) == last
+
+
+def test_read_rejects_messages_and_users_outside_the_conversation(make_client, chat):
+    conversation_id = chat["conversation"]
+    url = f"/api/v1/messages/conversation/{conversation_id}/read"
+
+    assert make_client(chat["ana"]).post(url, params={"message_id": chat["foreign"]}).status_code == 404
+    assert make_client(chat["eva"]).post(url).status_code == 403
+    assert make_client(chat["eva"]).get(f"/api/v1/messages/conversation/{conversation_id}/unread").status_code == 403
+
+
+def test_migration_seeds_the_cursor_from_own_and_read_messages(engine, db):
+    ana, luis = _user(db, "ana"), _user(db, "luis")
+    conversation = Conversation()
+    db.add(conversation)
+    db.flush()
+    db.add_all([Participant(user_id=user.id, conversation_id=conversation.id) for user in (ana, luis)])
+    _message(db, conversation.id, luis, "hola", is_read=True)
+    ana_last = _message(db, conversation.id, ana, "qué tal").id
+    luis_last = _message(db, conversation.id, luis, "bien").id
+    db.commit()
+    ana_id, luis_id, conversation_id = ana.id, luis.id, conversation.id
+    db.close()
+
+    with engine.begin() as conn:
+        # Volver al esquema anterior a la revisión
+        conn.exec_driver_sql("DROP INDEX ix_messages_conversation_id_id")
+        conn.exec_driver_sql("ALTER TABLE participants DROP COLUMN last_read_message_id")
+        spec = importlib.util.spec_from_file_location("read_cursor_migration", MIGRATION)
+        migration = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(migration)
+        with Operations.context(MigrationContext.configure(conn)):
+            migration.upgrade()
+        cursors = dict(conn.exec_driver_sql(
+            "SELECT user_id, last_read_message_id FROM participants WHERE conversation_id = ?", (conversation_id,)
+        ).fetchall())
+
+    # ana: su propio mensaje (posterior al ya leído); el último de luis sigue sin leer para ella
+    assert cursors == {ana_id: ana_last, luis_id: luis_last}
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services.translation_batcher import TranslationBatcher
+from app.services.translation_service import TranslationService
+
+
+class FakeBatchAPI:
+    """Sustituto del endpoint de lotes: registra cada lote y traduce a mayúsculas"""
+
+    def __init__(self, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+
+    async def __call__(self, texts, source_lang, target_lang):
+        self.batches.append((list(texts), source_lang, target_lang))
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("batch API down")
+        return [f"{text.upper()}:{target_lang}" for text in texts]
+
+
+@pytest.fixture
+def batch_api(monkeypatch):
+    monkeypatch.setattr(settings, "TRANSLATION_CACHE_ENABLED", False)
+    api = FakeBatchAPI()
+    yield api
+    TranslationService.configure_batcher(None)
+
+
+def _translate(text, target_lang="en"):
+    return TranslationService.translate_text(text, "es", target_lang)
+
+
+async def test_full_batch_is_sent_without_waiting_for_the_deadline(batch_api):
+    TranslationService.configure_batcher(TranslationBatcher(batch_api, max_batch_size=3, max_wait_ms=10_000))
+
+    results = await asyncio.wait_for(asyncio.gather(*(_translate(t) for t in ("uno", "dos", "tres"))), 1)
+
+    assert batch_api.batches == [(["uno", "dos", "tres"], "es", "en")]
+    # Cada llamador recibe la traducción de su propio texto
+    assert results == ["UNO:en", "DOS:en", "TRES:en"]
+
+
+async def test_partial_batch_is_sent_at_the_deadline(batch_api):
+    TranslationService.configure_batcher(TranslationBatcher(batch_api, max_batch_size=32, max_wait_ms=20))
+
+    pending = asyncio.gather(_translate("hola"), _translate("adiós"), _translate("hola", target_lang="fr"))
+    await asyncio.sleep(0.005)
+    assert batch_api.batches == []
+
+    assert await asyncio.wait_for(pending, 1) == ["HOLA:en", "ADIÓS:en", "HOLA:fr"]
+    # Un lote por par de idiomas
+    assert sorted(batch_api.batches, key=lambda batch: batch[2]) == [
+        (["hola", "adiós"], "es", "en"), (["hola"], "es", "fr")
+    ]
+
+
+async def test_duplicate_texts_are_sent_once_and_answered_to_every_caller(batch_api):
+    batcher = TranslationBatcher(batch_api, max_batch_size=3, max_wait_ms=10_000)
+    TranslationService.configure_batcher(batcher)
+
+    results = await asyncio.gather(_translate("hola"), _translate("chau"), _translate("hola"))
+
+    assert batch_api.batches == [(["hola", "chau"], "es", "en")]
+    assert results == ["HOLA:en", "CHAU:en", "HOLA:en"]
+    assert batcher.stats() == {"batches_sent": 1, "items_sent": 2, "pending_pairs": 0}
+
+
+async def test_failed_batch_resolves_every_caller(batch_api):
+    batch_api.fail = True
+    batcher = TranslationBatcher(batch_api, max_batch_size=3, max_wait_ms=10_000)
+    TranslationService.configure_batcher(batcher)
+
+    results = await asyncio.wait_for(asyncio.gather(*(_translate(t) for t in ("uno", "dos", "tres"))), 1)
+
+    # Igual que una llamada individual fallida: sin traducción para nadie
+    assert results == [None, None, None]
+    assert not batcher._sending
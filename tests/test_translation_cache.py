@@ -0,0 +1,115 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.endpoints import translations
+from app.core.config import settings
+from app.services import translation_cache as cache_module
+from app.services.translation_cache import LRUTTLCache, TranslationCache, make_cache_key
+
+
+class FakeBackend:
+    """Traductor que cuenta las llamadas y espera a que el test lo libere"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    def __call__(self, text):
+        async def translate():
+            self.calls += 1
+            await self.release.wait()
+            return text.upper()
+        return translate
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = LRUTTLCache(ttl_seconds=60)
+    key = make_cache_key(" hola ", "ES", "en")
+    cache.set(key, "hello")
+
+    now[0] += 59
+    assert cache.get(make_cache_key("hola", "es", "EN")) == "hello"
+    now[0] += 2
+    assert cache.get(key) is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUTTLCache(max_size=2)
+    cache.set(("a", "es", "en"), "A")
+    cache.set(("b", "es", "en"), "B")
+    cache.get(("a", "es", "en"))
+    cache.set(("c", "es", "en"), "C")
+
+    assert cache.get(("b", "es", "en")) is None
+    assert cache.get(("a", "es", "en")) == "A"
+    assert cache.get(("c", "es", "en")) == "C"
+    assert cache.evictions == 1
+
+
+async def test_concurrent_requests_share_one_backend_call():
+    cache = TranslationCache(LRUTTLCache())
+    backend = FakeBackend()
+
+    callers = [asyncio.ensure_future(cache.get_or_translate("hola", "es", "en", backend("hola"))) for _ in range(3)]
+    await asyncio.sleep(0)
+    backend.release.set()
+
+    assert await asyncio.gather(*callers) == ["HOLA", "HOLA", "HOLA"]
+    assert backend.calls == 1
+    # La siguiente petición sale de la caché
+    assert await cache.get_or_translate("hola", "es", "en", backend("hola")) == "HOLA"
+    assert cache.stats()["backend_calls"] == 1
+
+
+async def test_cancelled_first_caller_does_not_cancel_the_others():
+    cache = TranslationCache(LRUTTLCache())
+    backend = FakeBackend()
+
+    first = asyncio.ensure_future(cache.get_or_translate("hola", "es", "en", backend("hola")))
+    await asyncio.sleep(0)
+    second = asyncio.ensure_future(cache.get_or_translate("hola", "es", "en", backend("hola")))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    backend.release.set()
+
+    assert await second == "HOLA"
+    assert first.cancelled()
+    assert backend.calls == 1
+
+
+async def test_failed_translation_reaches_every_caller_and_is_not_cached():
+    cache = TranslationCache(LRUTTLCache())
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0)
+        raise RuntimeError("backend down")
+
+    results = await asyncio.gather(
+        cache.get_or_translate("hola", "es", "en", failing),
+        cache.get_or_translate("hola", "es", "en", failing),
+        return_exceptions=True
+    )
+    assert [str(result) for result in results] == ["backend down", "backend down"]
+    assert len(calls) == 1
+    assert len(cache.local) == 0
+
+
+def test_stats_endpoint_requires_the_ops_token(monkeypatch):
+    api = FastAPI()
+    api.include_router(translations.router, prefix="/translations")
+    client = TestClient(api)
+    monkeypatch.setattr(settings, "OPS_TOKEN", "s3cret")
+
+    assert client.get("/translations/cache/stats").status_code == 403
+    response = client.get("/translations/cache/stats", headers={"X-Ops-Token": "s3cret"})
+    assert response.status_code == 200
+    assert "backend_calls" in response.json()
@@ -0,0 +1,184 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.models import Conversation, Participant, TranslatedMessage, User
+from app.models.message import ContentType
+from app.schemas.message import MessageCreate
+from app.services import translation_queue, translation_service
+from app.services.translation_service import TranslationService
+from app.services.translation_queue import (
+    DatabaseTranslationJobStore, InMemoryTranslationJobStore, JobStatus, TranslationQueue
+)
+
+
+def test_retry_waits_for_the_backoff_delay():
+    store = InMemoryTranslationJobStore()
+    store.enqueue(1)
+    job = store.claim(lease_seconds=600)
+    assert job.attempts == 1
+
+    store.mark_retry(job.id, "timeout", delay_seconds=60)
+    assert store.claim(lease_seconds=600) is None
+    assert store.get_status(1) == {"message_id": 1, "status": JobStatus.PENDING, "attempts": 1, "last_error": "timeout"}
+
+    queue = TranslationQueue(store, retry_base_delay=2, retry_max_delay=10)
+    assert [queue._retry_delay(attempts) for attempts in (1, 2, 3, 4)] == [2, 4, 8, 10]
+
+
+def test_expired_lease_is_claimed_again():
+    store = InMemoryTranslationJobStore()
+    store.enqueue(1)
+    first = store.claim(lease_seconds=0)
+    time.sleep(0.001)
+
+    # El worker que lo tomó murió sin marcarlo: otro lo retoma al expirar el lease
+    second = store.claim(lease_seconds=600)
+    assert second.id == first.id
+    assert second.attempts == 2
+    assert store.claim(lease_seconds=600) is None
+
+
+async def test_failing_job_is_retried_until_max_attempts():
+    store = InMemoryTranslationJobStore()
+    queue = TranslationQueue(store, workers=2, max_attempts=3, retry_base_delay=0.01, poll_interval=0.01)
+    calls = []
+
+    async def process(job):
+        calls.append(job.attempts)
+        raise RuntimeError("translation API down")
+
+    queue._process = process
+    await queue.start()
+    await queue.enqueue(1)
+    for _ in range(100):
+        if store.get_status(1)["status"] == JobStatus.FAILED:
+            break
+        await asyncio.sleep(0.01)
+    await queue.stop()
+
+    assert calls == [1, 2, 3]
+    assert store.get_status(1) == {
+        "message_id": 1, "status": JobStatus.FAILED, "attempts": 3, "last_error": "translation API down"
+    }
+
+
+async def test_enqueue_wakes_a_worker_that_is_claiming():
+    store = InMemoryTranslationJobStore()
+    # Sin sondeo: solo el aviso del enqueue puede despertar al worker
+    queue = TranslationQueue(store, workers=1, poll_interval=60)
+    done = asyncio.Event()
+
+    async def process(job):
+        done.set()
+
+    queue._process = process
+    await queue.start()
+    await asyncio.sleep(0.01)
+    await queue.enqueue(1)
+    await asyncio.wait_for(done.wait(), 1)
+    await queue.stop()
+
+
+def test_database_enqueue_is_idempotent(engine, monkeypatch):
+    monkeypatch.setattr(translation_queue, "SessionLocal", sessionmaker(bind=engine))
+    store = DatabaseTranslationJobStore()
+
+    job_id = store.enqueue(1)
+    # El segundo insert choca con el índice único y devuelve el trabajo existente
+    assert store.enqueue(1) == job_id
+    assert store.enqueue(2) != job_id
+    assert store.claim(lease_seconds=600).id == job_id
+
+
+async def test_stop_releases_the_job_in_progress():
+    store = InMemoryTranslationJobStore()
+    queue = TranslationQueue(store, workers=1, poll_interval=0.01)
+    started = asyncio.Event()
+
+    async def process(job):
+        started.set()
+        await asyncio.Event().wait()
+
+    queue._process = process
+    await queue.start()
+    await queue.enqueue(1)
+    await asyncio.wait_for(started.wait(), 1)
+    await queue.stop()
+
+    # Disponible enseguida para otro worker, sin esperar al lease
+    assert store.get_status(1)["status"] == JobStatus.PENDING
+    assert store.claim(lease_seconds=600).message_id == 1
+
+
+@pytest.fixture
+def text_message(db, engine, monkeypatch):
+    """Mensaje de ana (es) para luis (en); la API de traducción responde en mayúsculas"""
+    monkeypatch.setattr(translation_queue, "SessionLocal", sessionmaker(bind=engine))
+
+    async def translate_text(text, source_lang, target_lang):
+        return text.upper()
+
+    monkeypatch.setattr(TranslationService, "translate_text", staticmethod(translate_text))
+    conversation = Conversation()
+    ana = User(username="ana", email="ana@example.com", hashed_password="x", primary_language="es")
+    luis = User(username="luis", email="luis@example.com", hashed_password="x", primary_language="en")
+    db.add_all([conversation, ana, luis])
+    db.flush()
+    db.add_all([
+        Participant(user_id=ana.id, conversation_id=conversation.id),
+        Participant(user_id=luis.id, conversation_id=conversation.id),
+    ])
+    db.commit()
+    return crud.create_message(db, MessageCreate(
+        conversation_id=conversation.id, content_type=ContentType.TEXT, content="hola"
+    ), ana.id)
+
+
+async def test_job_stores_the_translation(db, text_message):
+    store = InMemoryTranslationJobStore()
+    queue = TranslationQueue(store)
+    store.enqueue(text_message.id)
+
+    await queue._run_job(store.claim(lease_seconds=600))
+
+    translated = db.query(TranslatedMessage).filter(TranslatedMessage.original_message_id == text_message.id).one()
+    assert (translated.translated_content, translated.target_language) == ("HOLA", "en")
+    assert translated.seq == text_message.seq + 1
+    assert store.get_status(text_message.id)["status"] == JobStatus.DONE
+
+
+async def test_failed_database_write_is_retried(db, text_message, monkeypatch):
+    def create(db, translated_message):
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(translation_service.translated_message_crud, "create", create)
+    store = InMemoryTranslationJobStore()
+    queue = TranslationQueue(store, retry_base_delay=60)
+    store.enqueue(text_message.id)
+
+    await queue._run_job(store.claim(lease_seconds=600))
+
+    status = store.get_status(text_message.id)
+    assert status["status"] == JobStatus.PENDING
+    assert "database is locked" in status["last_error"]
+    assert db.query(TranslatedMessage).count() == 0
+
+
+def test_status_endpoint(make_client, db, text_message, monkeypatch):
+    store = InMemoryTranslationJobStore()
+    monkeypatch.setattr(translation_queue.translation_queue, "store", store)
+    sender = db.query(User).filter(User.username == "ana").one()
+    db.expunge(sender)
+    client = make_client(sender)
+    url = f"/api/v1/translations/message/{text_message.id}/status"
+
+    assert client.get(url).status_code == 404
+    store.enqueue(text_message.id)
+    assert client.get(url).json() == {
+        "message_id": text_message.id, "status": JobStatus.PENDING, "attempts": 0, "last_error": None
+    }
@@ -16,9 +16,14 @@ async def test_file_service():
             self.filename = filename
             self.content = content
             self.content_type = content_type
+            self.position = 0
         
-        async def read(self):
-            return self.content
+        async def read(self, size=-1):
+            # El servicio lee por bloques hasta recibir b""
+            end = len(self.content) if size < 0 else self.position + size
+            chunk = self.content[self.position:end]
+            self.position += len(chunk)
+            return chunk
     
     mock_file = MockUploadFile("test.wav", test_audio_content, "audio/wav")
     
@@ -0,0 +1,98 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.models import Conversation, User
+from app.models.message import ContentType
+from app.schemas.message import MessageCreate
+from app.websockets import events, replay
+from app.websockets.backplane import InMemoryBackplane, InMemoryBroker, PostgresBackplane
+from app.websockets.manager import ConnectionManager
+
+
+async def test_events_reach_sockets_held_by_other_workers(make_websocket):
+    broker = InMemoryBroker()
+    worker_a = ConnectionManager(backplane=InMemoryBackplane(broker))
+    worker_b = ConnectionManager(backplane=InMemoryBackplane(broker))
+    await worker_a.start()
+    await worker_b.start()
+
+    socket_a, socket_b = make_websocket(), make_websocket()
+    await worker_a.connect(socket_a, "1", user_id=1)
+    await worker_b.connect(socket_b, "1", user_id=2)
+
+    await worker_a.send_to_conversation({"type": "new_message", "data": {"id": 10}}, "1")
+    await worker_b.broadcast_to_conversation({"type": "typing", "user_id": 2}, "1", exclude_user=2)
+    # Los envíos salen de la cola de cada conexión en su tarea escritora
+    await asyncio.sleep(0.01)
+
+    await worker_a.stop()
+    await worker_b.stop()
+
+    # Cada evento se entrega una sola vez, también al socket del propio worker
+    assert [event["type"] for event in socket_a.events] == ["user_joined", "new_message", "typing"]
+    assert [event["type"] for event in socket_b.events] == ["new_message"]
+
+
+class FakePool:
+    """Pool de asyncpg que guarda los payloads de pg_notify"""
+
+    def __init__(self):
+        self.notified = []
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self
+
+    async def execute(self, query, channel, payload):
+        self.notified.append(payload)
+
+
+async def test_oversized_events_are_published_as_a_reference(db, engine, monkeypatch):
+    monkeypatch.setattr(replay, "SessionLocal", sessionmaker(bind=engine))
+    conversation = Conversation()
+    user = User(username="ana", email="ana@example.com", hashed_password="x", is_active=True)
+    db.add_all([conversation, user])
+    db.commit()
+    message = crud.create_message(db, MessageCreate(
+        conversation_id=conversation.id, content_type=ContentType.TEXT, content="hola " * 50
+    ), user.id)
+    event = events.encode_event(events.new_message_event(message, user))
+
+    sender, receiver = PostgresBackplane("postgresql://"), PostgresBackplane("postgresql://")
+    sender._pool = FakePool()
+    sender.MAX_PAYLOAD_BYTES = 200
+    delivered = []
+
+    async def handler(conversation_id, event, exclude_user):
+        delivered.append((conversation_id, event, exclude_user))
+
+    # Otro worker; sin start(): no hay servidor PostgreSQL al que escuchar
+    receiver.origin = "worker-b"
+    receiver.handler = handler
+    await sender.publish(str(conversation.id), event, exclude_user=user.id)
+    [payload] = sender._pool.notified
+    assert len(payload) <= 200
+    assert json.loads(payload.split("\n", 1)[0])["ref"] is True
+
+    receiver._on_notify(None, 0, receiver.channel, payload)
+    assert len(receiver._dispatches) == 1
+    await asyncio.wait(list(receiver._dispatches))
+
+    [(conversation_id, loaded, exclude_user)] = delivered
+    assert (conversation_id, exclude_user) == (str(conversation.id), user.id)
+    assert (loaded.type, loaded.seq) == ("new_message", message.seq)
+    assert json.loads(loaded.text)["data"]["content"] == message.content
+    assert not receiver._dispatches
+
+
+async def test_oversized_transient_events_stay_local():
+    backplane = PostgresBackplane("postgresql://")
+    backplane._pool = FakePool()
+    backplane.MAX_PAYLOAD_BYTES = 10
+
+    await backplane.publish("1", events.encode_event({"type": "typing", "user_id": 1}))
+    assert backplane._pool.notified == []
@@ -0,0 +1,66 @@
+import asyncio
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.models.message import ContentType
+from app.websockets import events
+from app.websockets.backplane import InMemoryBackplane, InMemoryBroker
+from app.websockets.manager import ConnectionManager
+
+
+def _message(content_type, content=None, media_url=None):
+    return SimpleNamespace(
+        id=10, seq=4, conversation_id=1, sender_id=7, content_type=content_type,
+        content=content, media_url=media_url, created_at=datetime(2024, 5, 1, 12, 30)
+    )
+
+
+def test_new_message_payload_is_the_same_for_text_and_audio():
+    sender = SimpleNamespace(id=7, username="ana")
+    text = json.loads(events.encode_event(events.new_message_event(_message(ContentType.TEXT, "hola"), sender)).text)
+    audio = json.loads(events.encode_event(
+        events.new_message_event(_message(ContentType.AUDIO, media_url="/audio/1.wav"), sender)
+    ).text)
+
+    assert text["type"] == audio["type"] == "new_message"
+    assert set(text["data"]) == set(audio["data"])
+    assert audio["data"]["content_type"] == "audio"
+    assert audio["data"]["created_at"] == "2024-05-01T12:30:00"
+    assert audio["data"]["sender"] == {"id": 7, "username": "ana"}
+
+
+def test_stdlib_fallback_matches_orjson(monkeypatch):
+    event = events.new_message_event(_message(ContentType.TEXT, "¿qué tal?"))
+    fast = events.encode_event(event).text
+    monkeypatch.setattr(events, "orjson", None)
+    assert json.loads(events.encode_event(event).text) == json.loads(fast)
+
+
+async def test_frame_is_encoded_once_for_every_recipient_and_worker(make_websocket):
+    broker = InMemoryBroker()
+    worker_a = ConnectionManager(backplane=InMemoryBackplane(broker))
+    worker_b = ConnectionManager(backplane=InMemoryBackplane(broker))
+    await worker_a.start()
+    await worker_b.start()
+
+    sockets = [make_websocket() for _ in range(3)]
+    await worker_a.connect(sockets[0], "1", user_id=1)
+    await worker_a.connect(sockets[1], "1", user_id=2)
+    await worker_b.connect(sockets[2], "1", user_id=3)
+    await asyncio.sleep(0.01)
+    for socket in sockets:
+        socket.sent.clear()
+
+    await worker_a.send_to_conversation(events.UserJoinedEvent(user_id=9, conversation_id=1), "1")
+    await asyncio.sleep(0.01)
+
+    await worker_a.stop()
+    await worker_b.stop()
+
+    sent = [socket.sent for socket in sockets]
+    assert all(len(frames) == 1 for frames in sent)
+    # Los sockets locales comparten el mismo objeto; el otro worker recibe el mismo texto
+    assert sent[0][0] is sent[1][0]
+    assert sent[2][0] == sent[0][0]
+    assert json.loads(sent[0][0]) == {"type": "user_joined", "user_id": 9, "conversation_id": 1}
@@ -0,0 +1,58 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.websockets import endpoints
+from app.websockets.manager import ConnectionManager
+
+
+async def test_registry_indexes_presence_and_cleanup(make_websocket):
+    manager = ConnectionManager()
+    phone, laptop, other = make_websocket(), make_websocket(), make_websocket()
+    await manager.connect(phone, "1", user_id=7)
+    await manager.connect(laptop, "1", user_id=7)
+    await manager.connect(other, "2", user_id=8)
+
+    assert manager.is_user_online("1", 7)
+    assert not manager.is_user_online("1", 8)
+    assert manager.get_conversation_users("1") == [7]
+
+    assert manager.disconnect(phone, "1") == 7
+    # Sigue conectado desde el otro dispositivo
+    assert manager.is_user_online("1", 7)
+
+    assert manager.disconnect(laptop, "1") == 7
+    assert manager.disconnect(laptop, "1") is None
+    assert not manager.is_user_online("1", 7)
+    assert not manager.is_user_connected(7)
+
+    await manager._on_dead_connection(other)
+    assert manager.connections == {}
+    assert manager.by_conversation == {}
+    assert manager.by_user == {}
+
+
+async def test_stats_are_aggregate(make_websocket):
+    manager = ConnectionManager()
+    await manager.connect(make_websocket(), "1", user_id=7)
+
+    stats = manager.get_stats()
+    assert stats["connections"] == stats["users"] == stats["conversations"] == 1
+    assert "per_connection" not in stats
+    assert "user_id" not in repr(stats)
+
+
+def test_stats_endpoint_requires_the_ops_token(monkeypatch):
+    api = FastAPI()
+    api.include_router(endpoints.router)
+    client = TestClient(api)
+
+    monkeypatch.setattr(settings, "OPS_TOKEN", None)
+    assert client.get("/ws/stats", headers={"X-Ops-Token": ""}).status_code == 403
+
+    monkeypatch.setattr(settings, "OPS_TOKEN", "s3cret")
+    assert client.get("/ws/stats").status_code == 403
+    assert client.get("/ws/stats", headers={"X-Ops-Token": "wrong"}).status_code == 403
+    response = client.get("/ws/stats", headers={"X-Ops-Token": "s3cret"})
+    assert response.status_code == 200
+    assert "connections" in response.json()
@@ -0,0 +1,56 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.websockets import endpoints as websocket_endpoints
+from app.websockets.manager import manager
+
+
+def make_client(monkeypatch):
+    # El token es el id de usuario; solo las conversaciones 1 y 3 son accesibles
+    monkeypatch.setattr(websocket_endpoints, "_authenticate", lambda token: int(token))
+    monkeypatch.setattr(websocket_endpoints, "_has_access", lambda user_id, conversation_id: conversation_id in (1, 3))
+    api = FastAPI()
+    api.include_router(websocket_endpoints.router, prefix=settings.API_V1_STR)
+    return TestClient(api)
+
+
+def test_one_socket_subscribes_to_several_conversations(monkeypatch):
+    client = make_client(monkeypatch)
+
+    with client.websocket_connect("/api/v1/ws?token=1") as websocket:
+        websocket.send_json({"type": "subscribe", "conversation_id": 1})
+        assert websocket.receive_json() == {"type": "subscribed", "conversation_id": 1}
+
+        websocket.send_json({"type": "subscribe", "conversation_id": 3})
+        assert websocket.receive_json() == {"type": "subscribed", "conversation_id": 3}
+
+        websocket.send_json({"type": "subscribe", "conversation_id": 2})
+        assert websocket.receive_json() == {"type": "error", "conversation_id": 2, "detail": "Forbidden"}
+
+        assert manager.is_user_online("1", 1)
+        assert manager.is_user_online("3", 1)
+        assert len(manager.by_user[1]) == 1
+
+        websocket.send_json({"type": "unsubscribe", "conversation_id": 1})
+        assert websocket.receive_json() == {"type": "unsubscribed", "conversation_id": 1}
+        assert not manager.is_user_online("1", 1)
+
+        websocket.send_text("ping")
+        assert websocket.receive_text() == "pong"
+
+    assert not manager.is_user_connected(1)
+
+
+def test_invalid_since_seq_is_rejected_without_closing_the_socket(monkeypatch):
+    client = make_client(monkeypatch)
+
+    with client.websocket_connect("/api/v1/ws?token=1") as websocket:
+        websocket.send_json({"type": "subscribe", "conversation_id": 1, "since_seq": "abc"})
+        assert websocket.receive_json() == {"type": "error", "conversation_id": 1, "detail": "Invalid since_seq"}
+        assert not manager.is_user_online("1", 1)
+
+        websocket.send_json({"type": "subscribe", "conversation_id": 1})
+        assert websocket.receive_json() == {"type": "subscribed", "conversation_id": 1}
+
+    assert not manager.is_user_connected(1)
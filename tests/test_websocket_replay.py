@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.models import Conversation, User
+from app.models.message import ContentType
+from app.schemas.message import MessageCreate
+from app.websockets import events, replay
+from app.websockets.manager import ConnectionManager
+from app.websockets.replay import ReplayBuffer
+
+
+def _new_message(seq: int) -> dict:
+    return {"type": "new_message", "seq": seq, "data": {"id": seq, "conversation_id": 1}}
+
+
+def test_ring_keeps_the_latest_events_in_sequence_order():
+    buffer = ReplayBuffer(size=3)
+    for seq in (1, 2, 4, 3, 5):
+        buffer.record("1", events.encode_event(_new_message(seq)))
+    # Eventos efímeros no tienen seq y no se guardan
+    buffer.record("1", events.encode_event(events.TypingEvent(user_id=1, conversation_id=1)))
+
+    assert buffer.covers("1", 2)
+    assert not buffer.covers("1", 1)
+    assert not buffer.covers("2", 0)
+    assert [json.loads(e.text)["seq"] for e in buffer.since("1", 2)] == [3, 4, 5]
+
+
+def test_ring_does_not_cover_a_gap():
+    buffer = ReplayBuffer()
+    for seq in (1, 2, 4):
+        buffer.record("1", events.encode_event(_new_message(seq)))
+
+    # Falta el 3 (publicado después que el 4): solo se cubre desde el 4
+    assert not buffer.covers("1", 1)
+    assert not buffer.covers("1", 2)
+    assert buffer.covers("1", 4)
+
+    buffer.record("1", events.encode_event(_new_message(3)))
+    assert buffer.covers("1", 1)
+
+
+async def test_reconnect_replays_only_the_missed_events(make_websocket):
+    manager = ConnectionManager()
+    for seq in range(1, 6):
+        await manager.send_to_conversation(_new_message(seq), "1")
+
+    socket = make_websocket()
+    await manager.connect(socket, "1", user_id=1, since_seq=3)
+    await manager.send_to_conversation(_new_message(6), "1")
+    await asyncio.sleep(0.01)
+
+    assert [event.get("seq") for event in socket.events] == [4, 5, None, 6]
+    assert socket.events[2] == {"type": "resumed", "conversation_id": 1, "last_seq": 5}
+    assert manager.replay_db_fallbacks == 0
+
+
+def _seed_messages(db, count):
+    conversation = Conversation()
+    user = User(username="ana", email="ana@example.com", hashed_password="x", is_active=True)
+    db.add_all([conversation, user])
+    db.commit()
+    for i in range(count):
+        crud.create_message(db, MessageCreate(
+            conversation_id=conversation.id, content_type=ContentType.TEXT, content=f"hola {i}"
+        ), user.id)
+    messages = crud.get_messages_by_conversation_id(db, conversation.id)
+    assert [m.seq for m in messages] == list(range(1, count + 1))
+    return conversation.id, user, messages
+
+
+async def test_overrun_ring_falls_back_to_the_database(db, engine, monkeypatch, make_websocket):
+    conversation_id, user, messages = _seed_messages(db, 5)
+    monkeypatch.setattr(replay, "SessionLocal", sessionmaker(bind=engine))
+
+    manager = ConnectionManager()
+    manager.replay.size = 2
+    # El worker solo vio los dos últimos eventos
+    for message in messages[3:]:
+        await manager.send_to_conversation(events.new_message_event(message, user), str(conversation_id))
+
+    socket = make_websocket()
+    await manager.connect(socket, str(conversation_id), user_id=user.id, since_seq=1)
+    await asyncio.sleep(0.01)
+
+    sent = socket.events
+    assert [event.get("seq") for event in sent] == [2, 3, 4, 5, None]
+    assert sent[0]["data"]["sender"] == {"id": user.id, "username": "ana"}
+    assert sent[-1]["last_seq"] == 5
+    assert manager.replay_db_fallbacks == 1
+
+
+async def test_gap_in_the_ring_falls_back_to_the_database(db, engine, monkeypatch, make_websocket):
+    conversation_id, user, messages = _seed_messages(db, 5)
+    monkeypatch.setattr(replay, "SessionLocal", sessionmaker(bind=engine))
+
+    manager = ConnectionManager()
+    # El frame del seq 4 aún no llegó a este worker
+    for message in (messages[2], messages[4]):
+        await manager.send_to_conversation(events.new_message_event(message, user), str(conversation_id))
+
+    socket = make_websocket()
+    await manager.connect(socket, str(conversation_id), user_id=user.id, since_seq=2)
+    await asyncio.sleep(0.01)
+
+    assert [event.get("seq") for event in socket.events] == [3, 4, 5, None]
+    assert socket.events[-1]["last_seq"] == 5
+    assert manager.replay_db_fallbacks == 1
@@ -0,0 +1,78 @@
+import asyncio
+
+from app.websockets.manager import ConnectionManager
+from app.websockets.throttle import TokenBucket, TypingCoalescer
+
+
+async def test_typing_is_broadcast_only_on_start_and_stop(make_websocket):
+    manager = ConnectionManager()
+    manager.typing.timeout = 0.05
+    typist, reader = make_websocket(), make_websocket()
+    await manager.connect(typist, "1", user_id=1)
+    await manager.connect(reader, "1", user_id=2)
+
+    # Un frame por tecla: solo el primero se difunde
+    for _ in range(10):
+        await manager.typing.update("1", 1, True)
+    await asyncio.sleep(0.01)
+    await manager.typing.update("1", 1, False)
+    await manager.typing.update("1", 1, False)
+    # Deja salir cada evento antes del siguiente (en cola se combinarían)
+    await asyncio.sleep(0.01)
+
+    # Sin stop explícito, el estado caduca tras el plazo
+    await manager.typing.update("1", 1, True)
+    await asyncio.sleep(0.1)
+
+    typing_events = [(e["user_id"], e["is_typing"]) for e in reader.events if e["type"] == "typing"]
+    assert typing_events == [(1, True), (1, False), (1, True), (1, False)]
+    assert not any(e["type"] == "typing" for e in typist.events)
+
+
+async def test_leaving_the_conversation_stops_typing(make_websocket):
+    manager = ConnectionManager()
+    typist, reader = make_websocket(), make_websocket()
+    await manager.connect(typist, "1", user_id=1)
+    await manager.connect(reader, "1", user_id=2)
+    await manager.typing.update("1", 1, True)
+
+    manager.disconnect(typist, "1")
+    await asyncio.sleep(0.01)
+
+    assert [e["is_typing"] for e in reader.events if e["type"] == "typing"] == [True, False]
+    assert not manager.typing.is_typing("1", 1)
+
+
+async def test_pending_stops_are_tracked_and_cancelled_on_clear():
+    published = []
+
+    async def broadcast(event, conversation_id, exclude_user=None):
+        await asyncio.sleep(0)
+        published.append(event.is_typing)
+
+    coalescer = TypingCoalescer(broadcast)
+    await coalescer.start("1", 1)
+    await coalescer.start("1", 2)
+    coalescer.discard("1", 1)
+    assert len(coalescer._tasks) == 1
+    await asyncio.sleep(0.01)
+    assert published == [True, True, False]
+    assert not coalescer._tasks
+
+    coalescer.discard("1", 2)
+    coalescer.clear()
+    await asyncio.sleep(0.01)
+    assert published == [True, True, False]
+    assert not coalescer._tasks
+
+
+def test_token_bucket_allows_a_burst_then_the_rate():
+    bucket = TokenBucket(rate=0.0, burst=3)
+    assert [bucket.allow() for _ in range(5)] == [True, True, True, False, False]
+    assert bucket.dropped == 2
+    assert bucket.throttled
+
+    bucket.rate = 1000.0
+    bucket.updated_at -= 1
+    assert bucket.allow()
+    assert not bucket.throttled
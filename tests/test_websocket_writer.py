@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from app.websockets.writer import ConnectionWriter, POLICY_COALESCE, POLICY_DISCONNECT, POLICY_DROP
+
+
+class SlowWebSocket:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent = []
+        self.closed_with = None
+        self.release = asyncio.Event()
+
+    async def send_text(self, text: str):
+        await self.release.wait()
+        self.sent.append(json.loads(text))
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+
+async def run_writer(policy: str, frames, max_queue: int = 3):
+    websocket = SlowWebSocket()
+    dead = []
+
+    async def on_dead(ws):
+        dead.append(ws)
+
+    writer = ConnectionWriter(websocket, on_dead=on_dead, max_queue=max_queue, policy=policy)
+    writer.start()
+    await asyncio.sleep(0)
+    for frame, key in frames:
+        writer.enqueue(json.dumps(frame), key)
+    stats = writer.stats()
+    websocket.release.set()
+    await asyncio.sleep(0.01)
+    writer.close()
+    return websocket, stats, dead
+
+
+async def test_enqueue_never_blocks_and_drops_oldest_when_full():
+    frames = [({"n": n}, None) for n in range(6)]
+    websocket, stats, dead = await run_writer(POLICY_DROP, frames)
+
+    assert stats["dropped"] == 3
+    assert [f["n"] for f in websocket.sent] == [3, 4, 5]
+    assert not dead
+
+
+async def test_coalesce_replaces_pending_frame_with_same_key():
+    frames = [
+        ({"n": 0}, None),
+        ({"typing": True}, ("typing", 1)),
+        ({"n": 1}, None),
+        ({"typing": False}, ("typing", 1)),
+    ]
+    websocket, stats, _ = await run_writer(POLICY_COALESCE, frames)
+
+    assert stats["coalesced"] == 1
+    assert websocket.sent == [{"n": 0}, {"typing": False}, {"n": 1}]
+
+
+async def test_disconnect_policy_closes_slow_consumer():
+    frames = [({"n": n}, None) for n in range(6)]
+    websocket, _, dead = await run_writer(POLICY_DISCONNECT, frames)
+
+    assert websocket.closed_with == 1013
+    assert dead == [websocket]
+
+
+async def test_slow_consumer_close_errors_are_logged(caplog):
+    async def on_dead(ws):
+        raise RuntimeError("manager gone")
+
+    writer = ConnectionWriter(SlowWebSocket(), on_dead=on_dead, max_queue=1, policy=POLICY_DISCONNECT)
+    writer.enqueue("{}")
+    writer.enqueue("{}")
+    await asyncio.wait([writer._closer])
+    await asyncio.sleep(0)
+
+    assert "manager gone" in caplog.text